@@ -0,0 +1,166 @@
+# backend/attendance_history.py
+import csv
+import io
+import json
+import base64
+from datetime import datetime, date, timedelta
+
+# --- RIWAYAT ABSENSI: PAGINASI KEYSET & EKSPOR STREAMING ---
+# Halaman berikutnya dicari dengan "seek" pada (absent_epoch, log_id), bukan OFFSET,
+# sehingga biaya satu halaman tetap O(limit) seberapa jauh pun posisinya.
+# Cursor adalah token opaque base64 dari "epoch:log_id" baris terakhir halaman sebelumnya.
+#
+# Ekspor NDJSON/CSV memakai paginasi yang sama per potongan (EXPORT_CHUNK_SIZE baris):
+# memori konstan, dan tidak ada transaksi baca panjang yang menahan checkpoint WAL.
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+EXPORT_CHUNK_SIZE = 1000
+EXPORT_COLUMNS = ("log_id", "intern_name", "instansi", "absent_at", "log_date", "image_url")
+
+
+def encode_cursor(absent_epoch: int, log_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{absent_epoch}:{log_id}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """Token cursor -> (absent_epoch, log_id). ValueError jika token tidak valid."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        epoch, log_id = base64.urlsafe_b64decode(padded.encode()).decode().split(":")
+        return int(epoch), int(log_id)
+    except Exception:
+        raise ValueError("Cursor paginasi tidak valid.")
+
+
+def day_epoch_range(start_date: str, end_date: str = None) -> tuple:
+    """
+    Rentang absent_epoch [awal, akhir) untuk tanggal lokal start_date s/d end_date (inklusif).
+    absent_epoch disimpan dari waktu lokal, jadi batas harinya juga dihitung dari tengah malam lokal.
+    """
+    start = date.fromisoformat(start_date)
+    end = date.fromisoformat(end_date) if end_date else start
+    if end < start:
+        raise ValueError("Tanggal akhir lebih awal dari tanggal mulai.")
+    start_epoch = int(datetime.combine(start, datetime.min.time()).timestamp())
+    end_epoch = int(datetime.combine(end + timedelta(days=1), datetime.min.time()).timestamp())
+    return start_epoch, end_epoch
+
+
+def fetch_page(conn, start_epoch: int, end_epoch: int, limit: int = DEFAULT_PAGE_SIZE, cursor: str = None) -> tuple:
+    """
+    Satu halaman log (terbaru dulu) dalam rentang epoch.
+    Returns (rows, next_cursor); next_cursor None jika sudah halaman terakhir.
+    Setiap row: (log_id, intern_name, instansi, absent_at, log_date, image_url, absent_epoch).
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    if cursor:
+        # Batas atas rentang indeks = epoch cursor, supaya SQLite langsung seek ke posisinya
+        last_epoch, last_id = decode_cursor(cursor)
+        sql = """
+            SELECT log_id, intern_name, instansi, absent_at, log_date, image_url, absent_epoch
+            FROM attendance_logs
+            WHERE absent_epoch >= ? AND absent_epoch <= ? AND absent_epoch < ?
+              AND (absent_epoch < ? OR log_id < ?)
+            ORDER BY absent_epoch DESC, log_id DESC LIMIT ?
+        """
+        params = [start_epoch, last_epoch, end_epoch, last_epoch, last_id]
+    else:
+        sql = """
+            SELECT log_id, intern_name, instansi, absent_at, log_date, image_url, absent_epoch
+            FROM attendance_logs
+            WHERE absent_epoch >= ? AND absent_epoch < ?
+            ORDER BY absent_epoch DESC, log_id DESC LIMIT ?
+        """
+        params = [start_epoch, end_epoch]
+    # Ambil satu baris ekstra untuk mengetahui apakah masih ada halaman berikutnya
+    params.append(limit + 1)
+
+    rows = conn.execute(sql, params).fetchall()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(last[6], last[0])
+
+
+def fetch_grouped_page(conn, log_date: str, limit: int = DEFAULT_PAGE_SIZE, cursor: str = None) -> tuple:
+    """
+    Satu halaman absensi per intern untuk satu tanggal, dengan pengelompokan yang sama seperti
+    /api/attendance-by-date tanpa paginasi (per intern_name, instansi, image_url; terbaru dulu).
+    Keyset pada kunci urut kelompok (MAX(absent_epoch), MAX(log_id)); MAX(log_id) unik per kelompok.
+    Returns (rows, next_cursor); setiap row: (intern_name, instansi, absent_at, image_url, last_epoch, last_id).
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    having, params = "", [log_date]
+    if cursor:
+        last_epoch, last_id = decode_cursor(cursor)
+        having = "HAVING MAX(absent_epoch) < ? OR (MAX(absent_epoch) = ? AND MAX(log_id) < ?)"
+        params += [last_epoch, last_epoch, last_id]
+    sql = f"""
+        SELECT intern_name, instansi, MAX(absent_at), image_url, MAX(absent_epoch) AS last_epoch, MAX(log_id) AS last_id
+        FROM attendance_logs
+        WHERE log_date = ?
+        GROUP BY intern_name, instansi, image_url
+        {having}
+        ORDER BY last_epoch DESC, last_id DESC LIMIT ?
+    """
+    params.append(limit + 1)
+
+    rows = conn.execute(sql, params).fetchall()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(last[4], last[5])
+
+
+def iter_rows(connect, start_epoch: int, end_epoch: int, chunk_size: int = EXPORT_CHUNK_SIZE):
+    """
+    Generator semua log dalam rentang, per potongan keyset.
+    `connect` dipanggil ulang per potongan (mis. SQLITE_POOL.getconn), karena StreamingResponse
+    bisa melanjutkan generator dari thread yang berbeda.
+    """
+    cursor = None
+    while True:
+        conn = connect()
+        try:
+            rows, cursor = fetch_page(conn, start_epoch, end_epoch, chunk_size, cursor)
+        finally:
+            conn.close()
+        yield from rows
+        if cursor is None:
+            return
+
+
+def row_to_dict(row) -> dict:
+    return dict(zip(EXPORT_COLUMNS, row[:len(EXPORT_COLUMNS)]))
+
+
+def stream_ndjson(rows):
+    """Iterable row -> potongan bytes NDJSON (satu objek JSON per baris)."""
+    buffer = []
+    for row in rows:
+        buffer.append(json.dumps(row_to_dict(row), ensure_ascii=False))
+        if len(buffer) >= EXPORT_CHUNK_SIZE:
+            yield ("\n".join(buffer) + "\n").encode("utf-8")
+            buffer.clear()
+    if buffer:
+        yield ("\n".join(buffer) + "\n").encode("utf-8")
+
+
+def stream_csv(rows):
+    """Iterable row -> potongan bytes CSV dengan header."""
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(EXPORT_COLUMNS)
+    count = 0
+    for row in rows:
+        writer.writerow(row[:len(EXPORT_COLUMNS)])
+        count += 1
+        if count % EXPORT_CHUNK_SIZE == 0:
+            yield output.getvalue().encode("utf-8")
+            output.seek(0)
+            output.truncate()
+    if output.tell():
+        yield output.getvalue().encode("utf-8")
@@ -0,0 +1,134 @@
+# backend/attendance_rollup.py
+import sys
+import sqlite3
+from pathlib import Path
+
+# --- TABEL ROLLUP ABSENSI (HARIAN & BULANAN) ---
+# Diperbarui secara inkremental di transaksi yang sama dengan INSERT attendance_logs,
+# sehingga laporan historis membaca O(jumlah hari) baris, bukan O(jumlah log).
+#   attendance_daily_attendees : satu baris per (tanggal, intern) -> peserta unik per hari
+#   attendance_daily_rollup    : satu baris per tanggal -> total check-in & peserta unik
+#   attendance_monthly_rollup  : satu baris per bulan  -> total check-in & hari aktif
+#
+# Bangun ulang dari log mentah (mis. setelah impor data manual):
+#     python backend/attendance_rollup.py
+
+ROLLUP_DDL = (
+    """
+    CREATE TABLE IF NOT EXISTS attendance_daily_attendees (
+        log_date TEXT NOT NULL,
+        intern_name TEXT NOT NULL,
+        instansi TEXT,
+        checkins INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (log_date, intern_name)
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS attendance_daily_rollup (
+        log_date TEXT PRIMARY KEY,
+        total_checkins INTEGER NOT NULL DEFAULT 0,
+        unique_attendees INTEGER NOT NULL DEFAULT 0
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS attendance_monthly_rollup (
+        month TEXT PRIMARY KEY,
+        total_checkins INTEGER NOT NULL DEFAULT 0,
+        unique_days INTEGER NOT NULL DEFAULT 0
+    );
+    """,
+)
+
+
+def create_rollup_tables(conn):
+    """Membuat tabel rollup; jika masih kosong sementara log sudah ada, langsung dibangun dari log."""
+    cursor = conn.cursor()
+    for statement in ROLLUP_DDL:
+        cursor.execute(statement)
+    conn.commit()
+
+    has_rollup = cursor.execute("SELECT 1 FROM attendance_daily_rollup LIMIT 1").fetchone()
+    has_logs = cursor.execute("SELECT 1 FROM attendance_logs LIMIT 1").fetchone()
+    if has_logs and not has_rollup:
+        return rebuild_rollups(conn)
+    return 0
+
+
+def record_attendance_rollup(cursor, log_date: str, intern_name: str, instansi: str):
+    """
+    Memperbarui ketiga tabel rollup untuk satu check-in.
+    Harus dipanggil dengan cursor yang sama (transaksi yang sama) dengan INSERT attendance_logs.
+    """
+    cursor.execute(
+        "INSERT OR IGNORE INTO attendance_daily_attendees (log_date, intern_name, instansi, checkins) VALUES (?, ?, ?, 0)",
+        (log_date, intern_name, instansi)
+    )
+    new_attendee = cursor.rowcount
+    cursor.execute(
+        "UPDATE attendance_daily_attendees SET checkins = checkins + 1 WHERE log_date = ? AND intern_name = ?",
+        (log_date, intern_name)
+    )
+
+    cursor.execute(
+        "INSERT OR IGNORE INTO attendance_daily_rollup (log_date, total_checkins, unique_attendees) VALUES (?, 0, 0)",
+        (log_date,)
+    )
+    new_day = cursor.rowcount
+    cursor.execute(
+        "UPDATE attendance_daily_rollup SET total_checkins = total_checkins + 1, unique_attendees = unique_attendees + ? WHERE log_date = ?",
+        (new_attendee, log_date)
+    )
+
+    month = log_date[:7]
+    cursor.execute(
+        "INSERT OR IGNORE INTO attendance_monthly_rollup (month, total_checkins, unique_days) VALUES (?, 0, 0)",
+        (month,)
+    )
+    cursor.execute(
+        "UPDATE attendance_monthly_rollup SET total_checkins = total_checkins + 1, unique_days = unique_days + ? WHERE month = ?",
+        (new_day, month)
+    )
+
+
+def rebuild_rollups(conn) -> int:
+    """Menghapus dan menghitung ulang semua tabel rollup dari attendance_logs. Mengembalikan jumlah hari."""
+    cursor = conn.cursor()
+    for statement in ROLLUP_DDL:
+        cursor.execute(statement)
+    cursor.execute("DELETE FROM attendance_daily_attendees")
+    cursor.execute("DELETE FROM attendance_daily_rollup")
+    cursor.execute("DELETE FROM attendance_monthly_rollup")
+
+    cursor.execute("""
+        INSERT INTO attendance_daily_attendees (log_date, intern_name, instansi, checkins)
+        SELECT log_date, intern_name, MIN(instansi), COUNT(*)
+        FROM attendance_logs
+        WHERE log_date IS NOT NULL
+        GROUP BY log_date, intern_name
+    """)
+    cursor.execute("""
+        INSERT INTO attendance_daily_rollup (log_date, total_checkins, unique_attendees)
+        SELECT log_date, SUM(checkins), COUNT(*)
+        FROM attendance_daily_attendees
+        GROUP BY log_date
+    """)
+    cursor.execute("""
+        INSERT INTO attendance_monthly_rollup (month, total_checkins, unique_days)
+        SELECT SUBSTR(log_date, 1, 7), SUM(total_checkins), COUNT(*)
+        FROM attendance_daily_rollup
+        GROUP BY SUBSTR(log_date, 1, 7)
+    """)
+    conn.commit()
+    return cursor.execute("SELECT COUNT(*) FROM attendance_daily_rollup").fetchone()[0]
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    from backend.attendance_schema import migrate_attendance_logs
+
+    db_path = sys.argv[1] if len(sys.argv) > 1 else Path(__file__).resolve().parent / "attendance.db"
+    conn = sqlite3.connect(db_path)
+    migrate_attendance_logs(conn)
+    days = rebuild_rollups(conn)
+    conn.close()
+    print(f"✅ Rollup absensi dibangun ulang: {days} hari.")
@@ -0,0 +1,81 @@
+# backend/attendance_schema.py
+from datetime import datetime
+
+# --- SKEMA & MIGRASI attendance_logs ---
+# absent_at (TEXT 'YYYY-MM-DD HH:MM:SS', waktu lokal) dipertahankan untuk kompatibilitas.
+# Kolom turunan yang dimaterialisasi:
+#   log_date     TEXT    'YYYY-MM-DD' -> filter per hari/bulan sebagai range scan ber-indeks
+#   absent_epoch INTEGER detik Unix   -> urutan waktu & rentang waktu numerik
+#   write_id     TEXT    ID unik dari pipeline write-behind -> replay journal tidak menggandakan log
+# Semua endpoint laporan memfilter log_date dengan '=' atau '>= ... <' (bukan LIKE/SUBSTR);
+# riwayat/ekspor berpaginasi keyset pada (absent_epoch, log_id).
+
+ATTENDANCE_LOGS_DDL = """
+    CREATE TABLE IF NOT EXISTS attendance_logs (
+        log_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        intern_id INTEGER,
+        intern_name TEXT NOT NULL,
+        instansi TEXT,
+        image_url TEXT,
+        absent_at TEXT,
+        log_date TEXT,
+        absent_epoch INTEGER,
+        write_id TEXT,
+        FOREIGN KEY (intern_id) REFERENCES interns(id)
+    );
+"""
+
+ATTENDANCE_LOGS_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_attendance_date_intern ON attendance_logs (log_date, intern_id)",
+    "CREATE INDEX IF NOT EXISTS idx_attendance_intern_date ON attendance_logs (intern_id, log_date)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_attendance_write_id ON attendance_logs (write_id)",
+    # Paginasi keyset riwayat: (absent_epoch, rowid) -> seek langsung ke halaman berikutnya
+    "CREATE INDEX IF NOT EXISTS idx_attendance_epoch ON attendance_logs (absent_epoch)",
+)
+
+
+def migrate_attendance_logs(conn) -> int:
+    """
+    Membuat/memigrasi tabel attendance_logs ke skema ber-indeks.
+    Aman dijalankan berulang. Mengembalikan jumlah baris lama yang di-backfill.
+    """
+    cursor = conn.cursor()
+    cursor.execute(ATTENDANCE_LOGS_DDL)
+
+    columns = {row[1] for row in cursor.execute("PRAGMA table_info(attendance_logs)")}
+    if "log_date" not in columns:
+        cursor.execute("ALTER TABLE attendance_logs ADD COLUMN log_date TEXT")
+    if "absent_epoch" not in columns:
+        cursor.execute("ALTER TABLE attendance_logs ADD COLUMN absent_epoch INTEGER")
+    if "write_id" not in columns:
+        cursor.execute("ALTER TABLE attendance_logs ADD COLUMN write_id TEXT")
+
+    # Backfill baris lama. absent_at adalah waktu lokal, 'utc' mengonversinya ke epoch yang benar.
+    cursor.execute("""
+        UPDATE attendance_logs
+        SET log_date = SUBSTR(absent_at, 1, 10),
+            absent_epoch = CAST(strftime('%s', absent_at, 'utc') AS INTEGER)
+        WHERE log_date IS NULL AND absent_at IS NOT NULL
+    """)
+    backfilled = cursor.rowcount
+
+    for statement in ATTENDANCE_LOGS_INDEXES:
+        cursor.execute(statement)
+    conn.commit()
+    return backfilled
+
+
+def attendance_timestamp(now: datetime = None) -> tuple:
+    """
+    Nilai waktu untuk satu baris log baru: (absent_at, log_date, absent_epoch).
+    Format absent_at sama dengan datetime('now', 'localtime') SQLite.
+    """
+    now = now or datetime.now()
+    return now.strftime("%Y-%m-%d %H:%M:%S"), now.date().isoformat(), int(now.timestamp())
+
+
+def month_range(year: int, month: int) -> tuple:
+    """Rentang log_date [awal, akhir) untuk satu bulan, mis. ('2025-10-01', '2025-11-01')."""
+    start = f"{year:04d}-{month:02d}-01"
+    end = f"{year + 1:04d}-01-01" if month == 12 else f"{year:04d}-{month + 1:02d}-01"
+    return start, end
@@ -0,0 +1,65 @@
+# backend/attendance_tracker.py
+import threading
+from datetime import date
+
+# --- SET "SUDAH ABSEN HARI INI" DI MEMORI ---
+# Pengganti query COUNT(*) ... LIKE 'YYYY-MM-DD%' per wajah. Set dibangun ulang dari
+# attendance_logs saat startup dan otomatis saat tanggal berganti (rollover tengah malam).
+# try_claim() memeriksa dan menandai dalam satu langkah di bawah lock, sehingga dua
+# capture yang hampir bersamaan dari kiosk berbeda tidak bisa sama-sama tercatat.
+
+
+class DailyAttendanceSet:
+    """Set nama intern yang sudah absen pada hari berjalan (thread-safe)."""
+
+    def __init__(self, loader, today=date.today):
+        """
+        Args:
+            loader: fungsi date -> iterable nama intern yang sudah absen pada tanggal tsb.
+            today: fungsi penyedia tanggal hari ini (bisa diganti untuk pengujian).
+        """
+        self._loader = loader
+        self._today = today
+        self._lock = threading.Lock()
+        self._day = None
+        self._names = set()
+
+    def rebuild(self, day: date = None):
+        """Membangun ulang set dari database untuk tanggal tertentu (default: hari ini)."""
+        day = day or self._today()
+        names = set(self._loader(day))
+        with self._lock:
+            self._day, self._names = day, names
+        return len(names)
+
+    def _rollover_if_needed(self):
+        # Dipanggil di bawah lock
+        today = self._today()
+        if self._day != today:
+            self._names = set(self._loader(today))
+            self._day = today
+
+    def contains(self, name: str) -> bool:
+        with self._lock:
+            self._rollover_if_needed()
+            return name in self._names
+
+    def try_claim(self, name: str) -> bool:
+        """
+        Menandai intern sebagai sudah absen hari ini.
+        Returns True jika berhasil (belum absen), False jika sudah absen (duplikat).
+        """
+        with self._lock:
+            self._rollover_if_needed()
+            if name in self._names:
+                return False
+            self._names.add(name)
+            return True
+
+    def release(self, name: str):
+        """Membatalkan klaim (mis. jika penulisan log ke database gagal)."""
+        with self._lock:
+            self._names.discard(name)
+
+    def __len__(self):
+        return len(self._names)
@@ -0,0 +1,82 @@
+# backend/batcher.py
+import asyncio
+
+# --- MICRO-BATCHING UNTUK MODEL EMBEDDING ---
+# Saat beberapa kiosk mengirim /recognize bersamaan, crop wajah dikumpulkan
+# selama maksimal `max_wait_ms` atau sampai `max_batch_size` item, lalu model
+# dijalankan sekali untuk seluruh batch. Hasil dikembalikan ke masing-masing
+# request yang menunggu.
+
+
+class MicroBatcher:
+    """Mengumpulkan item dari banyak coroutine dan memprosesnya sebagai satu batch."""
+
+    def __init__(self, process_batch, max_batch_size: int = 8, max_wait_ms: float = 10.0, runner=None):
+        """
+        Args:
+            process_batch: fungsi sinkron list[item] -> list[hasil] (urutan sama).
+            runner: coroutine opsional runner(fn, items) untuk mengeksekusi batch
+                    di luar event loop (mis. InferencePool.run).
+        """
+        self.process_batch = process_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_ms = max_wait_ms
+        self._runner = runner
+        self._queue = None
+        self._worker = None
+        self._batches = 0
+        self._items = 0
+
+    def _ensure_worker(self):
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def submit(self, item):
+        """Menitipkan satu item ke batch berikutnya dan menunggu hasilnya."""
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait_ms / 1000
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            items = [item for item, _ in batch]
+            try:
+                if self._runner is not None:
+                    results = await self._runner(self.process_batch, items)
+                else:
+                    results = self.process_batch(items)
+                self._batches += 1
+                self._items += len(items)
+                for (_, future), result in zip(batch, results):
+                    if not future.done():
+                        future.set_result(result)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def stats(self) -> dict:
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "batches": self._batches,
+            "items": self._items,
+            "avg_batch_size": round(self._items / self._batches, 2) if self._batches else 0.0,
+        }
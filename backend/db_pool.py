@@ -0,0 +1,202 @@
+# backend/db_pool.py
+import time
+import sqlite3
+import weakref
+import threading
+from collections import deque
+import psycopg2
+from psycopg2 import pool as pg_pool
+from psycopg2 import errors as pg_errors
+
+# --- POOL KONEKSI DATABASE ---
+# Menghilangkan biaya connect/close per request:
+#   - PostgreSQL: ThreadedConnectionPool bersama + prepared statement per koneksi.
+#   - SQLite: satu koneksi jangka panjang per thread worker (WAL + pragma yang disetel).
+# Helper lama (connect_vector_db / connect_sqlite_db + conn.close()) tetap dipakai:
+# objek yang dikembalikan adalah proxy, dan close() mengembalikan koneksi ke pool.
+
+
+class CheckoutStats:
+    """Mencatat durasi checkout koneksi (ms) agar overhead pool bisa diukur."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._samples = deque(maxlen=1000)
+        self.checkouts = 0
+
+    def record(self, elapsed_ms: float):
+        with self._lock:
+            self._samples.append(elapsed_ms)
+            self.checkouts += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return {"checkouts": self.checkouts, "avg_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+        return {
+            "checkouts": self.checkouts,
+            "avg_ms": round(sum(samples) / len(samples), 3),
+            "p99_ms": round(samples[int(0.99 * (len(samples) - 1))], 3),
+            "max_ms": round(samples[-1], 3),
+        }
+
+
+class PoolTimeoutError(pg_pool.PoolError):
+    """Semua koneksi sedang dipakai dan tidak ada yang kembali dalam batas waktu checkout."""
+
+
+class PooledConnection:
+    """Proxy koneksi: semua atribut diteruskan, close() mengembalikan koneksi ke pool."""
+
+    def __init__(self, conn, release):
+        self._conn = conn
+        self._release = release
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def close(self):
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            self._release(conn)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class PostgresPool:
+    """
+    Pool koneksi PostgreSQL thread-safe. Checkout menunggu jika semua koneksi sedang dipakai,
+    paling lama `checkout_timeout` detik (lalu PoolTimeoutError, agar pemanggil tidak membeku).
+    `prepare_statements` dijalankan sekali per koneksi baru.
+    Pool dibuat saat checkout pertama, sehingga server tetap bisa start walau PostgreSQL mati.
+    """
+
+    def __init__(self, minconn: int, maxconn: int, prepare_statements=(), checkout_timeout: float = 5.0, **connect_kwargs):
+        self._pool = None
+        self._init_lock = threading.Lock()
+        self._minconn = minconn
+        self._connect_kwargs = connect_kwargs
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._prepare_statements = prepare_statements
+        self.checkout_timeout = checkout_timeout
+        # Koneksi yang semua prepared statement-nya sudah siap. WeakSet (bukan id()) agar koneksi
+        # baru yang kebetulan mendapat alamat memori koneksi lama tidak dianggap sudah disiapkan.
+        self._prepared = weakref.WeakSet()
+        self.maxconn = maxconn
+        self.stats = CheckoutStats()
+
+    def _prepare(self, conn):
+        if conn in self._prepared:
+            return
+        # Satu transaksi per statement: rollback karena satu statement gagal tidak membuang yang lain.
+        # Koneksi baru ditandai jika semuanya berhasil; jika tidak, dicoba lagi di checkout berikutnya.
+        cursor = conn.cursor()
+        complete = True
+        for statement in self._prepare_statements:
+            try:
+                cursor.execute(statement)
+                conn.commit()
+            except pg_errors.DuplicatePreparedStatement:
+                # Sudah disiapkan pada percobaan sebelumnya di koneksi ini
+                conn.rollback()
+            except psycopg2.Error as e:
+                conn.rollback()
+                complete = False
+                print(f"⚠️ Gagal menyiapkan prepared statement: {e}")
+        cursor.close()
+        if complete:
+            self._prepared.add(conn)
+
+    def _ensure_pool(self):
+        if self._pool is None:
+            with self._init_lock:
+                if self._pool is None:
+                    self._pool = pg_pool.ThreadedConnectionPool(self._minconn, self.maxconn, **self._connect_kwargs)
+
+    def getconn(self) -> PooledConnection:
+        start = time.perf_counter()
+        if not self._slots.acquire(timeout=self.checkout_timeout):
+            raise PoolTimeoutError(
+                f"Semua {self.maxconn} koneksi PostgreSQL sedang dipakai (menunggu > {self.checkout_timeout} detik)."
+            )
+        try:
+            self._ensure_pool()
+            conn = self._pool.getconn()
+            if conn.closed:
+                # Koneksi putus (mis. server PostgreSQL restart): buang dan buat baru
+                self._prepared.discard(conn)
+                self._pool.putconn(conn, close=True)
+                conn = self._pool.getconn()
+            self._prepare(conn)
+        except Exception:
+            self._slots.release()
+            raise
+        self.stats.record((time.perf_counter() - start) * 1000)
+        return PooledConnection(conn, self._putconn)
+
+    def _putconn(self, conn):
+        try:
+            if conn.closed:
+                self._prepared.discard(conn)
+            self._pool.putconn(conn, close=bool(conn.closed))
+        finally:
+            self._slots.release()
+
+    def closeall(self):
+        if self._pool is not None:
+            self._pool.closeall()
+
+
+class SqlitePool:
+    """Satu koneksi SQLite jangka panjang per thread, dengan WAL dan pragma yang disetel."""
+
+    PRAGMAS = (
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",
+        "PRAGMA temp_store=MEMORY",
+        "PRAGMA cache_size=-16000",
+        "PRAGMA mmap_size=134217728",
+        "PRAGMA busy_timeout=5000",
+    )
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._all = []
+        self._lock = threading.Lock()
+        self.stats = CheckoutStats()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path)
+        for pragma in self.PRAGMAS:
+            conn.execute(pragma)
+        with self._lock:
+            self._all.append(conn)
+        return conn
+
+    def getconn(self) -> PooledConnection:
+        start = time.perf_counter()
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        self.stats.record((time.perf_counter() - start) * 1000)
+        return PooledConnection(conn, self._putconn)
+
+    def _putconn(self, conn):
+        # Transaksi yang tidak di-commit oleh pemanggil dibatalkan, sama seperti close() biasa
+        if conn.in_transaction:
+            conn.rollback()
+
+    def closeall(self):
+        with self._lock:
+            for conn in self._all:
+                try:
+                    conn.close()
+                except sqlite3.ProgrammingError:
+                    pass
+            self._all.clear()
@@ -0,0 +1,254 @@
+# backend/embedding_cache.py
+import os
+import fcntl
+import struct
+import hashlib
+import threading
+from pathlib import Path
+from collections import OrderedDict
+
+import numpy as np
+
+from .model_registry import get_model_spec
+
+# --- CACHE EMBEDDING BERBASIS HASH ISI GAMBAR ---
+# Byte gambar yang identik (retry kiosk, foto yang sama di /upload_dataset lalu /api/register-face,
+# train.py dijalankan ulang) tidak perlu melewati model lagi. Kunci = SHA-256 dari
+# (model, detektor, varian crop, SHA-256 isi gambar), sehingga embedding model lain tidak pernah tertukar.
+#
+# Dua tingkat:
+#   1. Memori: LRU (OrderedDict) per proses.
+#   2. Disk: satu file per model yang di-np.memmap, dipakai bersama oleh server, pool proses,
+#      dan train.py. Slot ditulis melingkar (ring buffer); penulisan antar-proses dikunci flock.
+#      Slot yang ditulis proses lain dipetakan saat lookup meleset (lihat DiskTier._refresh).
+#
+# Layout file disk:
+#   header 64 byte: magic, dim, capacity, next_write (penghitung tulis monotonik; slot = next_write % capacity)
+#   keys:    capacity x 32 byte (digest; nol = slot kosong)
+#   boxes:   capacity x 4 int32 (region wajah x, y, w, h di gambar asli; -1 = tidak ada)
+#   vectors: capacity x dim float32
+# Embedding disimpan apa adanya (train.py menyimpan versi ternormalisasi L2); semua pemakai
+# membandingkan dengan jarak kosinus / normalize_embedding, jadi keduanya setara.
+
+EMBEDDING_CACHE_ENABLED = os.environ.get("EMBEDDING_CACHE", "1") != "0"
+EMBEDDING_CACHE_DIR = Path(os.environ.get("EMBEDDING_CACHE_DIR", Path(__file__).resolve().parent / "embedding_cache"))
+EMBEDDING_CACHE_MEMORY_ITEMS = int(os.environ.get("EMBEDDING_CACHE_MEMORY_ITEMS", "2048"))
+EMBEDDING_CACHE_DISK_ITEMS = int(os.environ.get("EMBEDDING_CACHE_DISK_ITEMS", "50000"))
+
+CACHE_MAGIC = b"EMBCACH2"
+HEADER_FORMAT = "<8sIIQ"
+HEADER_SIZE = 64
+KEY_SIZE = 32
+BOX_FIELDS = ("x", "y", "w", "h")
+NEXT_SLOT_OFFSET = struct.calcsize("<8sII")
+
+
+def content_hash(image_bytes: bytes) -> str:
+    """SHA-256 isi gambar (sama dengan train.file_content_hash untuk file di disk)."""
+    return hashlib.sha256(image_bytes).hexdigest()
+
+
+def cache_key(image_hash: str, model_name: str, detector_backend: str, variant: str = "") -> bytes:
+    """
+    Kunci cache 32 byte. `variant` membedakan embedding dari gambar yang sama dengan crop
+    berbeda (face_box klien / pre_cropped); kosong = deteksi wajah terbesar pada gambar penuh.
+    """
+    return hashlib.sha256(f"{model_name}|{detector_backend}|{variant}|{image_hash}".encode("utf-8")).digest()
+
+
+class DiskTier:
+    """Tier disk: slot embedding di file memmap, dibagi antar proses."""
+
+    def __init__(self, path, dim: int, capacity: int):
+        self.path = Path(path)
+        self.dim = dim
+        self.capacity = capacity
+        self._open()
+
+    def _open(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        size = HEADER_SIZE + self.capacity * (KEY_SIZE + len(BOX_FIELDS) * 4 + self.dim * 4)
+        with open(self.path, "a+b") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            f.seek(0)
+            header = f.read(struct.calcsize(HEADER_FORMAT))
+            valid = len(header) == struct.calcsize(HEADER_FORMAT)
+            if valid:
+                magic, dim, capacity, _ = struct.unpack(HEADER_FORMAT, header)
+                valid = magic == CACHE_MAGIC and dim == self.dim and capacity == self.capacity
+            if not valid:
+                # File baru atau layout berbeda (dimensi/kapasitas berubah): mulai dari kosong
+                f.truncate(0)
+                f.write(struct.pack(HEADER_FORMAT, CACHE_MAGIC, self.dim, self.capacity, 0).ljust(HEADER_SIZE, b"\0"))
+                f.truncate(size)
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+        self._next = np.memmap(self.path, dtype="<u8", mode="r+", offset=NEXT_SLOT_OFFSET, shape=(1,))
+        offset = HEADER_SIZE
+        self._keys = np.memmap(self.path, dtype=np.uint8, mode="r+", offset=offset, shape=(self.capacity, KEY_SIZE))
+        offset += self.capacity * KEY_SIZE
+        self._boxes = np.memmap(self.path, dtype="<i4", mode="r+", offset=offset, shape=(self.capacity, len(BOX_FIELDS)))
+        offset += self.capacity * len(BOX_FIELDS) * 4
+        self._vectors = np.memmap(self.path, dtype=np.float32, mode="r+", offset=offset, shape=(self.capacity, self.dim))
+        self._slots = {}
+        self._seen = 0
+        self._refresh()
+
+    def __len__(self):
+        return len(self._slots)
+
+    def _refresh(self):
+        """
+        Memetakan slot yang ditulis (oleh proses mana pun) sejak pemeriksaan terakhir: hanya
+        slot antara penghitung yang terakhir dilihat dan next_write saat ini yang dibaca.
+        """
+        current = int(self._next[0])
+        if current == self._seen:
+            return
+        if current < self._seen or current - self._seen >= self.capacity:
+            # Seluruh ring sudah ditimpa (atau file dibuat ulang): pindai semua slot
+            self._slots = {}
+            slots = np.flatnonzero(self._keys.any(axis=1))
+        else:
+            slots = np.arange(self._seen, current) % self.capacity
+        for slot in slots:
+            digest = self._keys[slot].tobytes()
+            if any(digest):
+                self._slots[digest] = int(slot)
+        self._seen = current
+
+    def get(self, key: bytes):
+        """Mengembalikan (vektor, box) atau None. box = dict region wajah atau None."""
+        slot = self._slots.get(key)
+        if slot is None:
+            self._refresh()
+            slot = self._slots.get(key)
+            if slot is None:
+                return None
+        # Slot bisa sudah ditimpa proses lain; digest diperiksa sebelum dan sesudah menyalin vektor
+        if self._keys[slot].tobytes() != key:
+            self._slots.pop(key, None)
+            return None
+        vector = np.array(self._vectors[slot])
+        box = self._boxes[slot].tolist()
+        if self._keys[slot].tobytes() != key:
+            return None
+        return vector, (dict(zip(BOX_FIELDS, box)) if box[2] > 0 else None)
+
+    def put(self, key: bytes, vector: np.ndarray, box: dict = None):
+        with open(self.path, "r+b") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                self._refresh()
+                counter = int(self._next[0])
+                slot = counter % self.capacity
+                self._slots.pop(self._keys[slot].tobytes(), None)
+                self._keys[slot] = 0
+                self._vectors[slot] = vector
+                self._boxes[slot] = [int(box[field]) for field in BOX_FIELDS] if box else -1
+                self._keys[slot] = np.frombuffer(key, dtype=np.uint8)
+                self._next[0] = counter + 1
+                self._seen = counter + 1
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+        self._slots[key] = slot
+
+    def flush(self):
+        for array in (self._next, self._keys, self._boxes, self._vectors):
+            array.flush()
+
+
+class EmbeddingCache:
+    """Cache embedding dua tingkat (LRU memori + memmap disk) dengan statistik hit & byte yang dihemat."""
+
+    def __init__(self, dim: int, disk_path=None, memory_items: int = EMBEDDING_CACHE_MEMORY_ITEMS,
+                 disk_items: int = EMBEDDING_CACHE_DISK_ITEMS):
+        self.dim = dim
+        self.memory_items = memory_items
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk = None
+        if disk_path is not None and disk_items > 0:
+            try:
+                self._disk = DiskTier(disk_path, dim, disk_items)
+            except OSError as e:
+                print(f"⚠️ Tier disk cache embedding tidak tersedia ({e}); hanya memakai memori.")
+        self._memory_hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._bytes_saved = 0
+
+    def get(self, key: bytes, source_bytes: int = 0, with_box: bool = False):
+        """
+        Mengembalikan embedding (float32) atau None. source_bytes = ukuran gambar, untuk statistik.
+        with_box=True mengembalikan (embedding, box) / (None, None); box = region wajah yang
+        disimpan bersama embedding (untuk thumbnail), None jika tidak ada.
+        """
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self._memory_hits += 1
+                self._bytes_saved += source_bytes
+            else:
+                entry = self._disk.get(key) if self._disk is not None else None
+                if entry is None:
+                    self._misses += 1
+                    return (None, None) if with_box else None
+                self._remember(key, entry)
+                self._disk_hits += 1
+                self._bytes_saved += source_bytes
+        return entry if with_box else entry[0]
+
+    def put(self, key: bytes, embedding, box: dict = None):
+        vector = np.asarray(embedding, dtype=np.float32).ravel()
+        if vector.shape[0] != self.dim:
+            return
+        with self._lock:
+            self._remember(key, (vector, box))
+            if self._disk is not None:
+                try:
+                    self._disk.put(key, vector, box)
+                except OSError as e:
+                    print(f"⚠️ Gagal menulis cache embedding ke disk: {e}")
+
+    def _remember(self, key: bytes, entry: tuple):
+        # Dipanggil di bawah self._lock; entry = (vektor, box)
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def flush(self):
+        with self._lock:
+            if self._disk is not None:
+                self._disk.flush()
+
+    def stats(self) -> dict:
+        lookups = self._memory_hits + self._disk_hits + self._misses
+        return {
+            "memory_entries": len(self._memory),
+            "disk_entries": len(self._disk) if self._disk is not None else 0,
+            "memory_hits": self._memory_hits,
+            "disk_hits": self._disk_hits,
+            "misses": self._misses,
+            "hit_rate": round((self._memory_hits + self._disk_hits) / lookups, 4) if lookups else 0.0,
+            "bytes_saved": self._bytes_saved,
+        }
+
+
+_SHARED_CACHES = {}
+_SHARED_LOCK = threading.Lock()
+
+
+def shared_cache(model_name: str = None):
+    """Cache bersama per model untuk proses ini (None jika EMBEDDING_CACHE=0)."""
+    if not EMBEDDING_CACHE_ENABLED:
+        return None
+    spec = get_model_spec(model_name)
+    with _SHARED_LOCK:
+        if spec["model_name"] not in _SHARED_CACHES:
+            _SHARED_CACHES[spec["model_name"]] = EmbeddingCache(
+                spec["embedding_dim"], disk_path=EMBEDDING_CACHE_DIR / f"{spec['model_name']}.bin"
+            )
+        return _SHARED_CACHES[spec["model_name"]]
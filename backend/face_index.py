@@ -0,0 +1,246 @@
+# backend/face_index.py
+import threading
+import numpy as np
+
+from .prototypes import build_prototypes
+from .ivf_index import IVFIndex
+from .vector_codec import read_rows_binary
+
+# Kandidat baris IVF per identitas yang diminta (cukup untuk best-of-N walau satu intern punya banyak foto)
+IVF_CANDIDATES_PER_IDENTITY = 16
+
+# --- INDEKS EMBEDDING DI MEMORI ---
+# PostgreSQL (tabel intern_embeddings) tetap menjadi penyimpanan permanen.
+# Indeks ini hanya salinan di memori agar pencarian /recognize tidak perlu
+# membuka koneksi dan melakukan sequential scan untuk setiap wajah.
+#
+# Mode prototipe (opsional): galeri ringkas per identitas (centroid + k medoid, lihat
+# prototypes.py) dicari lebih dulu. Galeri penuh hanya dipindai jika jarak terbaik ke
+# prototipe jatuh di dalam fallback_band (sekitar DISTANCE_THRESHOLD), yaitu daerah di mana
+# keputusan terima/tolak bisa berubah, atau jika runner-up prototipe terlalu dekat sehingga
+# keputusan margin (match_decision.py) bisa berubah pada galeri penuh.
+#
+# Pencarian mengembalikan top-k per identitas (best-of-N: jarak terbaik dari semua embedding
+# seorang intern) dalam satu pass: satu perkalian matriks, lalu np.maximum.reduceat pada
+# similaritas yang dikelompokkan per identitas (urutan kelompok disiapkan sekali saat _swap).
+#
+# Mode ANN (opsional): jika galeri mencapai ann_min_vectors, pemindaian galeri penuh memakai
+# indeks IVF (ivf_index.py) sehingga hanya ann_nprobe cluster terdekat yang dibandingkan.
+
+
+def normalize_rows(vectors) -> np.ndarray:
+    """Mengubah vektor (1D atau 2D) menjadi matriks float32 yang sudah dinormalisasi L2."""
+    matrix = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def group_by_identity(names, instansi) -> tuple:
+    """
+    Menyiapkan agregasi per identitas untuk satu snapshot.
+
+    Returns:
+        tuple (label_ids, label_names, label_instansi, order, starts): order mengurutkan baris per
+        identitas dan starts adalah awal tiap kelompok, untuk np.maximum.reduceat(sims[order], starts).
+    """
+    if len(names) == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, np.empty(0, dtype=object), np.empty(0, dtype=object), empty, empty
+    label_names, first, label_ids = np.unique(np.asarray(names, dtype=object), return_index=True, return_inverse=True)
+    order = np.argsort(label_ids, kind="stable")
+    starts = np.searchsorted(label_ids[order], np.arange(label_names.shape[0]))
+    return label_ids, label_names, np.asarray(instansi, dtype=object)[first], order, starts
+
+
+def top_identities(similarities, groups, k: int) -> list:
+    """Top-k identitas dari similaritas per baris (best-of-N). Returns list (name, instansi, distance)."""
+    _, label_names, label_instansi, order, starts = groups
+    best = np.maximum.reduceat(similarities[order], starts)
+    top = np.argpartition(-best, k - 1)[:k] if k < best.shape[0] else np.arange(best.shape[0])
+    top = top[np.argsort(-best[top])]
+    return [(label_names[i], label_instansi[i], float(1.0 - best[i])) for i in top]
+
+
+class FaceIndex:
+    """
+    Indeks nearest-neighbour berbasis jarak kosinus untuk embedding wajah.
+
+    Data disimpan sebagai snapshot (matriks, names, instansi) yang tidak pernah
+    diubah di tempat. Setiap perubahan membangun array baru lalu menukarnya
+    di bawah lock, sehingga pembaca tidak perlu lock dan tidak pernah melihat
+    indeks yang setengah jadi. Setiap penukaran menaikkan `generation`.
+    """
+
+    def __init__(self, dim: int = 512, prototype_medoids: int = None, fallback_band: tuple = (0.3, 0.5),
+                 runner_up_margin: float = 0.0, ann_min_vectors: int = None, ann_nlist: int = None, ann_nprobe: int = 8):
+        """
+        Args:
+            prototype_medoids: None = mode prototipe nonaktif; 0 = hanya centroid; k = centroid + k medoid.
+            fallback_band: (bawah, atas) jarak prototipe yang memicu pemindaian galeri penuh.
+            runner_up_margin: margin keputusan ke runner-up (MATCH_MARGIN); hasil prototipe yang diterima
+                dengan runner-up lebih dekat dari margin + setengah lebar band tetap memindai galeri penuh.
+            ann_min_vectors: None = selalu brute-force; n = pakai IVF jika galeri >= n vektor.
+            ann_nlist: jumlah cluster IVF (None = otomatis, lihat ivf_index.default_nlist).
+            ann_nprobe: jumlah cluster yang diperiksa per query (recall vs latensi).
+        """
+        self.dim = dim
+        self.prototype_medoids = prototype_medoids
+        self.fallback_band = fallback_band
+        self.runner_up_margin = runner_up_margin
+        self.ann_min_vectors = ann_min_vectors
+        self.ann_nlist = ann_nlist
+        self.ann_nprobe = ann_nprobe
+        self._lock = threading.Lock()
+        self._matrix = np.empty((0, dim), dtype=np.float32)
+        self._names = np.empty(0, dtype=object)
+        self._instansi = np.empty(0, dtype=object)
+        # (matrix, kelompok identitas, prototipe, ivf) dari generasi yang sama, dibaca tanpa lock oleh search_topk
+        self._snapshot = (self._matrix, group_by_identity(self._names, self._instansi), None, None)
+        self.generation = 0
+        self._prototype_hits = 0
+        self._full_scans = 0
+
+    def __len__(self):
+        return self._matrix.shape[0]
+
+    def names(self) -> list:
+        """Daftar nama unik yang ada di indeks."""
+        return self._snapshot[1][1].tolist()
+
+    def _swap(self, matrix, names, instansi):
+        prototypes = None
+        if self.prototype_medoids is not None and matrix.shape[0]:
+            proto_matrix, proto_names, proto_instansi = build_prototypes(matrix, names, instansi, self.prototype_medoids)
+            prototypes = (proto_matrix, group_by_identity(proto_names, proto_instansi))
+        ivf = None
+        if self.ann_min_vectors is not None and matrix.shape[0] >= self.ann_min_vectors:
+            ivf = IVFIndex(self.ann_nlist, self.ann_nprobe).build(matrix, previous=self._snapshot[3])
+        self._snapshot = (matrix, group_by_identity(names, instansi), prototypes, ivf)
+        self._matrix, self._names, self._instansi = matrix, names, instansi
+        self.generation += 1
+
+    def load(self, rows):
+        """Mengganti seluruh isi indeks dari iterable (name, instansi, embedding)."""
+        rows = list(rows)
+        if rows:
+            names = np.array([r[0] for r in rows], dtype=object)
+            instansi = np.array([r[1] for r in rows], dtype=object)
+            matrix = normalize_rows([r[2] for r in rows])
+        else:
+            names = np.empty(0, dtype=object)
+            instansi = np.empty(0, dtype=object)
+            matrix = np.empty((0, self.dim), dtype=np.float32)
+        self.load_arrays(matrix, names, instansi)
+
+    def load_arrays(self, matrix, names, instansi):
+        """
+        Mengganti isi indeks dengan array yang sudah jadi (matrix sudah dinormalisasi L2), tanpa salinan.
+        Dipakai untuk snapshot np.memmap read-only (gallery_snapshot.py): aman karena snapshot
+        indeks tidak pernah diubah di tempat; add/remove_name selalu membangun array baru.
+        """
+        with self._lock:
+            self._swap(matrix, names, instansi)
+
+    def arrays(self) -> tuple:
+        """Snapshot saat ini (matrix, names, instansi), mis. untuk ditulis ke file galeri."""
+        return self._matrix, self._names, self._instansi
+
+    def load_from_db(self, conn, table: str = "intern_embeddings", metadata: tuple = None):
+        """
+        Memuat embedding dari PostgreSQL/pgvector ke memori.
+
+        Jika metadata (model_name, embedding_dim, normalization) diberikan, hanya
+        vektor dari model yang sama yang dimuat; vektor model lain tidak pernah dibandingkan.
+        """
+        cursor = conn.cursor()
+        # COPY biner: embedding dibaca sebagai float32 langsung dari buffer, tanpa parsing teks
+        query = f"SELECT name, instansi, embedding FROM {table}"
+        if metadata:
+            query += " WHERE model_name = %s AND embedding_dim = %s AND normalization = %s"
+        rows = read_rows_binary(cursor, query, metadata, kinds=("text", "text", "vector"))
+        cursor.close()
+        self.load(rows)
+        return len(rows)
+
+    def add(self, name: str, instansi: str, embedding):
+        """Menambahkan satu embedding (dipanggil setelah /api/register-face berhasil)."""
+        vector = normalize_rows(embedding)
+        with self._lock:
+            self._swap(
+                np.vstack([self._matrix, vector]),
+                np.append(self._names, np.array([name], dtype=object)),
+                np.append(self._instansi, np.array([instansi], dtype=object)),
+            )
+
+    def remove_name(self, name: str) -> int:
+        """Menghapus semua embedding milik nama tertentu. Mengembalikan jumlah yang dihapus."""
+        with self._lock:
+            keep = self._names != name
+            removed = int(len(keep) - keep.sum())
+            if removed:
+                self._swap(self._matrix[keep], self._names[keep], self._instansi[keep])
+        return removed
+
+    def search(self, embedding):
+        """
+        Mencari tetangga terdekat (identitas terbaik).
+
+        Returns:
+            tuple (name, instansi, distance) atau None jika indeks kosong.
+            distance adalah jarak kosinus (1 - similarity), sama seperti operator <=> pgvector.
+        """
+        matches = self.search_topk(embedding, k=1)
+        return matches[0] if matches else None
+
+    def search_topk(self, embedding, k: int = 3) -> list:
+        """
+        Top-k identitas terdekat, diagregasi per intern (jarak terbaik dari semua embedding-nya).
+
+        Returns:
+            list (name, instansi, distance) terurut dari yang terdekat; kosong jika indeks kosong.
+        """
+        matrix, groups, prototypes, ivf = self._snapshot
+        if matrix.shape[0] == 0:
+            return []
+        query = normalize_rows(embedding)[0]
+
+        if prototypes is not None:
+            proto_matrix, proto_groups = prototypes
+            matches = top_identities(proto_matrix @ query, proto_groups, k)
+            low, high = self.fallback_band
+            best = matches[0][2]
+            decided = best < low or best > high
+            if decided and best < low and len(matches) > 1:
+                # Jarak prototipe hanya aproksimasi (galat hingga setengah lebar band): runner-up yang
+                # dekat bisa membalik keputusan margin, jadi hanya dipercaya jika jaraknya cukup jauh
+                decided = matches[1][2] - best >= self.runner_up_margin + (high - low) / 2
+            if decided:
+                self._prototype_hits += 1
+                return matches
+            self._full_scans += 1
+
+        if ivf is not None:
+            ids, similarities = ivf.search(query, k=k * IVF_CANDIDATES_PER_IDENTITY)
+            if ids.shape[0]:
+                # Kandidat sudah terurut menurun: kemunculan pertama tiap identitas = best-of-N-nya
+                label_ids, label_names, label_instansi, _, _ = groups
+                _, first = np.unique(label_ids[ids], return_index=True)
+                first = np.sort(first)[:k]
+                return [(label_names[label_ids[ids[i]]], label_instansi[label_ids[ids[i]]], float(1.0 - similarities[i]))
+                        for i in first]
+
+        return top_identities(matrix @ query, groups, k)
+
+    def stats(self) -> dict:
+        _, groups, prototypes, ivf = self._snapshot
+        return {
+            "vectors": len(self),
+            "identities": groups[1].shape[0],
+            "prototypes": prototypes[0].shape[0] if prototypes is not None else 0,
+            "prototype_hits": self._prototype_hits,
+            "full_scans": self._full_scans,
+            "ann_lists": ivf.nlist if ivf is not None else 0,
+            "ann_nprobe": self.ann_nprobe if ivf is not None else 0,
+            "generation": self.generation,
+        }
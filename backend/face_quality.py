@@ -0,0 +1,110 @@
+# backend/face_quality.py
+import os
+import math
+
+import cv2
+import numpy as np
+
+# --- GERBANG KUALITAS WAJAH (SEBELUM EMBEDDING) ---
+# Pemeriksaan OpenCV murah (< beberapa ms) pada area wajah hasil deteksi, dijalankan
+# sebelum forward pass ArcFace. Frame yang pasti gagal (buram, terlalu kecil, gelap/silau,
+# menyamping) ditolak dengan kode alasan sehingga klien bisa langsung meminta ulang,
+# dan foto registrasi/dataset yang buruk tidak pernah masuk ke indeks.
+#
+# Kode alasan: too_small, blurry, too_dark, too_bright, pose
+
+MIN_FACE_SIZE = int(os.environ.get("QUALITY_MIN_FACE_SIZE", "60"))         # sisi terpendek box (piksel, gambar asli)
+BLUR_THRESHOLD = float(os.environ.get("QUALITY_BLUR_THRESHOLD", "40"))     # varians Laplacian minimal
+MIN_BRIGHTNESS = float(os.environ.get("QUALITY_MIN_BRIGHTNESS", "40"))     # rata-rata grayscale 0..255
+MAX_BRIGHTNESS = float(os.environ.get("QUALITY_MAX_BRIGHTNESS", "225"))
+# Blur diukur pada crop wajah yang di-resize ke lebar tetap agar tidak bergantung pada jarak ke kamera
+BLUR_SAMPLE_WIDTH = 128
+
+MAX_EYE_TILT_DEGREES = 20.0
+MAX_EYE_CENTER_OFFSET = 0.2  # proporsi lebar box
+MIN_EYE_DISTANCE = 0.25      # proporsi lebar box (wajah menyamping -> jarak mata menyempit)
+
+QUALITY_MESSAGES = {
+    "too_small": "Wajah terlalu kecil. Silakan mendekat ke kamera.",
+    "blurry": "Gambar wajah buram. Silakan diam sejenak lalu coba lagi.",
+    "too_dark": "Wajah terlalu gelap. Pastikan pencahayaan cukup.",
+    "too_bright": "Wajah terlalu terang atau silau. Hindari cahaya langsung.",
+    "pose": "Wajah tidak menghadap kamera. Silakan menghadap lurus ke kamera.",
+}
+
+
+class FaceQualityError(ValueError):
+    """Wajah terdeteksi tetapi kualitasnya tidak layak untuk di-embed."""
+
+    def __init__(self, reason: str, metrics: dict = None):
+        super().__init__(QUALITY_MESSAGES.get(reason, reason))
+        self.reason = reason
+        self.metrics = metrics or {}
+
+    def __reduce__(self):
+        # args hanya berisi pesan; tanpa ini reason/metrics hilang saat dikirim balik dari pool proses
+        return FaceQualityError, (self.reason, self.metrics)
+
+
+def is_frontal(box: dict, eyes) -> bool:
+    """Perkiraan kasar wajah menghadap kamera dari posisi mata; True jika landmark mata tidak tersedia."""
+    if not eyes or box["w"] <= 0:
+        return True
+    (lx, ly), (rx, ry) = eyes
+    eye_distance = math.hypot(rx - lx, ry - ly)
+    if eye_distance < MIN_EYE_DISTANCE * box["w"]:
+        return False
+    tilt = abs(math.degrees(math.atan2(ry - ly, rx - lx)))
+    tilt = min(tilt, 180 - tilt)
+    if tilt > MAX_EYE_TILT_DEGREES:
+        return False
+    center_offset = abs((lx + rx) / 2 - (box["x"] + box["w"] / 2))
+    return center_offset <= MAX_EYE_CENTER_OFFSET * box["w"]
+
+
+def assess_face(face_bgr, face_size: int = None, box: dict = None, eyes=None) -> dict:
+    """
+    Menilai kualitas satu crop wajah (BGR uint8 atau float [0,1]).
+
+    Args:
+        face_size: sisi terpendek wajah pada gambar asli (default: ukuran crop).
+        box, eyes: opsional, untuk pemeriksaan pose dari landmark mata.
+
+    Returns:
+        dict: {'ok': bool, 'reason': kode alasan atau None, 'metrics': {...}}
+    """
+    face = np.asarray(face_bgr)
+    if face.dtype != np.uint8:
+        face = np.clip(face * 255.0 if face.max() <= 1.0 else face, 0, 255).astype(np.uint8)
+    gray = cv2.cvtColor(face, cv2.COLOR_BGR2GRAY) if face.ndim == 3 else face
+    height, width = gray.shape[:2]
+    face_size = face_size if face_size is not None else min(height, width)
+
+    metrics = {"face_size": int(face_size)}
+    if face_size < MIN_FACE_SIZE or width == 0 or height == 0:
+        return {"ok": False, "reason": "too_small", "metrics": metrics}
+
+    brightness = float(gray.mean())
+    metrics["brightness"] = round(brightness, 1)
+    if brightness < MIN_BRIGHTNESS:
+        return {"ok": False, "reason": "too_dark", "metrics": metrics}
+    if brightness > MAX_BRIGHTNESS:
+        return {"ok": False, "reason": "too_bright", "metrics": metrics}
+
+    sample = cv2.resize(gray, (BLUR_SAMPLE_WIDTH, max(1, int(height * BLUR_SAMPLE_WIDTH / width))), interpolation=cv2.INTER_AREA)
+    sharpness = float(cv2.Laplacian(sample, cv2.CV_64F).var())
+    metrics["sharpness"] = round(sharpness, 1)
+    if sharpness < BLUR_THRESHOLD:
+        return {"ok": False, "reason": "blurry", "metrics": metrics}
+
+    if box is not None and not is_frontal(box, eyes):
+        return {"ok": False, "reason": "pose", "metrics": metrics}
+    return {"ok": True, "reason": None, "metrics": metrics}
+
+
+def check_face(face_bgr, face_size: int = None, box: dict = None, eyes=None) -> dict:
+    """Seperti assess_face, tetapi melempar FaceQualityError jika wajah ditolak."""
+    result = assess_face(face_bgr, face_size, box, eyes)
+    if not result["ok"]:
+        raise FaceQualityError(result["reason"], result["metrics"])
+    return result
@@ -0,0 +1,130 @@
+# backend/face_tracker.py
+
+# --- TRACKING WAJAH UNTUK MODE STREAMING ---
+# Mode streaming (/ws/recognize) mendeteksi wajah di setiap frame, tetapi embedding ArcFace
+# (bagian termahal) hanya dijalankan sekali per track: saat wajah baru sudah stabil
+# (beberapa frame berturut-turut di posisi yang hampir sama) dan menghadap kamera.
+# Identitas hasil pencocokan dipakai ulang selama track masih terlihat. Frame yang gagal
+# gerbang kualitas (face_quality: buram, kecil, gelap/silau, menyamping) tidak di-embed.
+#
+# Pencocokan antar-frame memakai IoU bounding box (greedy), cukup untuk kiosk
+# dengan satu-dua orang di depan kamera.
+
+TRACK_IOU_THRESHOLD = 0.3   # IoU minimal agar deteksi dianggap wajah yang sama
+STABLE_IOU = 0.6            # IoU antar-frame berturut-turut agar dianggap "diam"
+MIN_STABLE_FRAMES = 3       # frame stabil berturut-turut sebelum embedding
+MAX_MISSED_FRAMES = 5       # track dihapus jika tidak terlihat selama N frame
+MAX_ATTEMPTS = 3            # percobaan embedding per track sebelum dinyatakan tidak dikenal
+RETRY_INTERVAL_FRAMES = 5   # jeda antar-percobaan untuk track yang belum dikenali
+
+# Status track yang sudah final (identitas tidak dicari lagi)
+FINAL_STATUSES = ("success", "duplicate", "unrecognized")
+
+
+def iou(a: dict, b: dict) -> float:
+    ax1, ay1 = a["x"] + a["w"], a["y"] + a["h"]
+    bx1, by1 = b["x"] + b["w"], b["y"] + b["h"]
+    inter_w = max(0, min(ax1, bx1) - max(a["x"], b["x"]))
+    inter_h = max(0, min(ay1, by1) - max(a["y"], b["y"]))
+    inter = inter_w * inter_h
+    union = a["w"] * a["h"] + b["w"] * b["h"] - inter
+    return inter / union if union > 0 else 0.0
+
+
+class Track:
+    """Satu wajah yang diikuti antar-frame."""
+
+    def __init__(self, track_id: int, detection: dict, frame: int):
+        self.track_id = track_id
+        self.box = detection["box"]
+        self.detection = detection
+        self.stable_frames = 1
+        self.missed = 0
+        self.status = "tracking"
+        self.result = None
+        self.attempts = 0
+        self.last_attempt_frame = -RETRY_INTERVAL_FRAMES
+        self.last_seen_frame = frame
+
+    def update(self, detection: dict, frame: int):
+        overlap = iou(self.box, detection["box"])
+        self.stable_frames = self.stable_frames + 1 if overlap >= STABLE_IOU else 1
+        self.box = detection["box"]
+        self.detection = detection
+        self.missed = 0
+        self.last_seen_frame = frame
+
+    def to_dict(self) -> dict:
+        body = {"track_id": self.track_id, "box": self.box, "status": self.status}
+        quality = self.detection.get("quality")
+        if quality and not quality["ok"] and self.status == "tracking":
+            body["quality"] = quality["reason"]
+        if self.result:
+            body.update({key: self.result.get(key) for key in ("name", "instansi", "distance")})
+        return body
+
+
+class FaceTracker:
+    """Tracker IoU per koneksi streaming; menentukan track mana yang perlu di-embed."""
+
+    def __init__(self):
+        self.tracks = []
+        self.frame = 0
+        self._next_id = 1
+
+    def update(self, detections: list) -> list:
+        """Mencocokkan deteksi frame baru ke track yang ada. Mengembalikan track yang terlihat di frame ini."""
+        self.frame += 1
+        pairs = sorted(
+            ((iou(track.box, det["box"]), t_idx, d_idx)
+             for t_idx, track in enumerate(self.tracks)
+             for d_idx, det in enumerate(detections)),
+            reverse=True
+        )
+        used_tracks, used_dets = set(), set()
+        for overlap, t_idx, d_idx in pairs:
+            if overlap < TRACK_IOU_THRESHOLD:
+                break
+            if t_idx in used_tracks or d_idx in used_dets:
+                continue
+            self.tracks[t_idx].update(detections[d_idx], self.frame)
+            used_tracks.add(t_idx)
+            used_dets.add(d_idx)
+
+        for t_idx, track in enumerate(self.tracks):
+            if t_idx not in used_tracks:
+                track.missed += 1
+        self.tracks = [track for track in self.tracks if track.missed <= MAX_MISSED_FRAMES]
+
+        for d_idx, det in enumerate(detections):
+            if d_idx not in used_dets:
+                self.tracks.append(Track(self._next_id, det, self.frame))
+                self._next_id += 1
+        return [track for track in self.tracks if track.last_seen_frame == self.frame]
+
+    def tracks_to_embed(self) -> list:
+        """Track terlihat, belum final, stabil, lolos gerbang kualitas, dan sudah lewat jeda percobaan."""
+        return [
+            track for track in self.tracks
+            if track.last_seen_frame == self.frame
+            and track.status not in FINAL_STATUSES
+            and track.stable_frames >= MIN_STABLE_FRAMES
+            and self.frame - track.last_attempt_frame >= RETRY_INTERVAL_FRAMES
+            and track.detection.get("quality", {}).get("ok", True)
+        ]
+
+    def record_result(self, track: Track, result: dict) -> bool:
+        """
+        Menyimpan hasil pencocokan untuk track. Returns True jika track menjadi final
+        (hasil perlu diteruskan ke klien: absen berhasil, duplikat, atau menyerah setelah MAX_ATTEMPTS).
+        """
+        track.attempts += 1
+        track.last_attempt_frame = self.frame
+        status = result.get("status")
+        if status in ("success", "duplicate"):
+            track.status, track.result = status, result
+            return True
+        if track.attempts >= MAX_ATTEMPTS:
+            track.status, track.result = "unrecognized", result
+            return True
+        return False
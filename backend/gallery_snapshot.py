@@ -0,0 +1,137 @@
+# backend/gallery_snapshot.py
+import os
+import json
+import time
+import struct
+from pathlib import Path
+
+import numpy as np
+
+# --- SNAPSHOT GALERI DI DISK (np.memmap) ---
+# Setiap worker uvicorn/gunicorn yang memuat galeri dari PostgreSQL menyimpan salinannya sendiri,
+# dan restart harus membaca ulang seluruh intern_embeddings. Snapshot ini menyimpan galeri
+# (sudah dinormalisasi L2) dalam satu file yang dibuka read-only dengan np.memmap: startup
+# hanya membaca header, dan halaman matriks berada di page cache OS yang dibagi semua proses.
+#
+# Layout file:
+#   magic 8 byte "FACEGAL1" + uint32 panjang header
+#   header JSON: format, model_name, embedding_dim, normalization, count, source_version,
+#                created_at, matrix_offset, label_ids_offset, labels [[name, instansi], ...]
+#   matrix:    count x dim float32 (little-endian, offset rata ke halaman 4096 byte)
+#   label_ids: count x int32, indeks ke tabel labels
+#
+# File ditulis ke file sementara lalu os.replace, sehingga pembaca tidak pernah melihat snapshot setengah jadi.
+
+SNAPSHOT_MAGIC = b"FACEGAL1"
+SNAPSHOT_FORMAT = 1
+PAGE_SIZE = 4096
+GALLERY_SNAPSHOT_DIR = Path(os.environ.get("GALLERY_SNAPSHOT_DIR", Path(__file__).resolve().parent / "gallery"))
+
+
+def snapshot_path(model_name: str) -> Path:
+    """Lokasi snapshot untuk model tertentu (satu file per model)."""
+    return GALLERY_SNAPSHOT_DIR / f"{model_name}.gallery"
+
+
+def _align(offset: int) -> int:
+    return (offset + PAGE_SIZE - 1) // PAGE_SIZE * PAGE_SIZE
+
+
+def gallery_version(cursor, metadata: tuple, table: str = "intern_embeddings") -> str:
+    """
+    Sidik jari murah isi galeri di PostgreSQL (jumlah baris + id terbesar untuk model aktif).
+    Dibandingkan dengan source_version di header untuk menentukan apakah snapshot masih segar.
+    """
+    cursor.execute(
+        f"SELECT COUNT(*), COALESCE(MAX(id), 0) FROM {table} "
+        "WHERE model_name = %s AND embedding_dim = %s AND normalization = %s",
+        metadata
+    )
+    count, max_id = cursor.fetchone()
+    return f"{count}:{max_id}"
+
+
+def write_snapshot(path, matrix: np.ndarray, names, instansi, metadata: tuple, source_version: str) -> int:
+    """
+    Menulis snapshot galeri. matrix harus sudah dinormalisasi L2 (seperti FaceIndex).
+    Mengembalikan ukuran file dalam byte.
+    """
+    model_name, embedding_dim, normalization = metadata
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    matrix = np.ascontiguousarray(matrix, dtype="<f4")
+    labels, label_ids = {}, np.empty(matrix.shape[0], dtype="<i4")
+    for row, label in enumerate(zip(names, instansi)):
+        label_ids[row] = labels.setdefault(label, len(labels))
+
+    header = {
+        "format": SNAPSHOT_FORMAT,
+        "model_name": model_name,
+        "embedding_dim": embedding_dim,
+        "normalization": normalization,
+        "count": int(matrix.shape[0]),
+        "source_version": source_version,
+        "created_at": time.time(),
+        "labels": [list(label) for label in labels],
+    }
+    # Offset bergantung pada panjang header: ukur dengan placeholder terpanjang, lalu isi nilai sebenarnya
+    header.update(matrix_offset=10 ** 15, label_ids_offset=10 ** 15)
+    reserved = len(json.dumps(header, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+    matrix_offset = _align(len(SNAPSHOT_MAGIC) + 4 + reserved)
+    header.update(matrix_offset=matrix_offset, label_ids_offset=matrix_offset + matrix.nbytes)
+    header_bytes = json.dumps(header, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(SNAPSHOT_MAGIC + struct.pack("<I", len(header_bytes)) + header_bytes)
+        f.seek(header["matrix_offset"])
+        f.write(matrix.tobytes())
+        f.write(label_ids.tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return header["label_ids_offset"] + label_ids.nbytes
+
+
+def read_header(path):
+    """Membaca header snapshot saja; None jika file tidak ada atau bukan snapshot galeri."""
+    try:
+        with open(path, "rb") as f:
+            prefix = f.read(len(SNAPSHOT_MAGIC) + 4)
+            if len(prefix) < len(SNAPSHOT_MAGIC) + 4 or prefix[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+                return None
+            (length,) = struct.unpack("<I", prefix[len(SNAPSHOT_MAGIC):])
+            return json.loads(f.read(length).decode("utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def open_snapshot(path, metadata: tuple = None):
+    """
+    Membuka snapshot read-only.
+
+    Returns:
+        tuple (matrix, names, instansi, header) dengan matrix berupa np.memmap read-only,
+        atau None jika file tidak ada, formatnya lain, atau modelnya tidak sama dengan metadata.
+    """
+    header = read_header(path)
+    if header is None or header.get("format") != SNAPSHOT_FORMAT:
+        return None
+    if metadata and (header["model_name"], header["embedding_dim"], header["normalization"]) != tuple(metadata):
+        return None
+
+    count, dim = header["count"], header["embedding_dim"]
+    if count == 0:
+        matrix = np.empty((0, dim), dtype=np.float32)
+        label_ids = np.empty(0, dtype=np.int32)
+    else:
+        matrix = np.memmap(path, dtype="<f4", mode="r", offset=header["matrix_offset"], shape=(count, dim))
+        label_ids = np.memmap(path, dtype="<i4", mode="r", offset=header["label_ids_offset"], shape=(count,))
+
+    labels = header["labels"]
+    names = np.empty(len(labels), dtype=object)
+    instansi = np.empty(len(labels), dtype=object)
+    names[:] = [label[0] for label in labels]
+    instansi[:] = [label[1] for label in labels]
+    return matrix, names[label_ids], instansi[label_ids], header
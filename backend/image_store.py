@@ -0,0 +1,185 @@
+# backend/image_store.py
+import os
+import re
+import time
+import zipfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+# --- PENYIMPANAN GAMBAR ABSENSI BERTINGKAT ---
+# captured_images/
+#   <YYYYMMDD_HHMMSS_nama>.jpg              -> original (tier panas, selama ORIGINAL_RETENTION_DAYS)
+#   thumbs/<file>.jpg                       -> thumbnail wajah kecil untuk tabel data.html
+#   archive/YYYY/MM/DD/<file>.jpg           -> salinan terkompresi (permanen)
+#   packs/YYYYMM.zip                        -> original lama yang sudah dipak (tier dingin)
+# URL thumbnail/arsip diturunkan dari image_url yang sudah tersimpan di attendance_logs,
+# sehingga skema database tidak perlu berubah.
+
+THUMBNAIL_SIZE = 160
+THUMBNAIL_QUALITY = 80
+ARCHIVE_MAX_SIDE = 1280
+ARCHIVE_QUALITY = 60
+FACE_MARGIN = 0.35
+
+_DATE_PREFIX = re.compile(r"^(\d{4})(\d{2})(\d{2})_")
+
+
+def _date_parts(filename: str, fallback_mtime: float = None):
+    """('YYYY', 'MM', 'DD') dari prefix nama file, atau dari mtime jika tidak ada prefix tanggal."""
+    match = _DATE_PREFIX.match(filename)
+    if match:
+        return match.groups()
+    moment = datetime.fromtimestamp(fallback_mtime or time.time())
+    return moment.strftime("%Y"), moment.strftime("%m"), moment.strftime("%d")
+
+
+def thumbnail_url(image_url: str) -> str:
+    """'/images/x.jpg' -> '/images/thumbs/x.jpg' (string kosong jika tidak ada gambar)."""
+    if not image_url:
+        return ""
+    prefix, _, filename = image_url.rpartition("/")
+    return f"{prefix}/thumbs/{filename}"
+
+
+def archive_url(image_url: str) -> str:
+    """'/images/20251013_x.jpg' -> '/images/archive/2025/10/13/20251013_x.jpg'."""
+    if not image_url:
+        return ""
+    prefix, _, filename = image_url.rpartition("/")
+    year, month, day = _date_parts(filename)
+    return f"{prefix}/archive/{year}/{month}/{day}/{filename}"
+
+
+def _encode_jpeg(img, quality: int) -> bytes:
+    ok, buffer = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        raise ValueError("Gagal meng-encode JPEG.")
+    return buffer.tobytes()
+
+
+def _resize_max_side(img, max_side: int):
+    height, width = img.shape[:2]
+    scale = max_side / max(height, width)
+    if scale >= 1:
+        return img
+    return cv2.resize(img, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA)
+
+
+def make_thumbnail(img, face_box: dict = None):
+    """Crop wajah (dengan margin) atau crop tengah persegi, lalu resize ke THUMBNAIL_SIZE."""
+    height, width = img.shape[:2]
+    if face_box and face_box.get("w") and face_box.get("h"):
+        margin_w, margin_h = int(face_box["w"] * FACE_MARGIN), int(face_box["h"] * FACE_MARGIN)
+        x0, y0 = max(0, face_box["x"] - margin_w), max(0, face_box["y"] - margin_h)
+        x1 = min(width, face_box["x"] + face_box["w"] + margin_w)
+        y1 = min(height, face_box["y"] + face_box["h"] + margin_h)
+        crop = img[y0:y1, x0:x1]
+    else:
+        side = min(height, width)
+        y0, x0 = (height - side) // 2, (width - side) // 2
+        crop = img[y0:y0 + side, x0:x0 + side]
+    return _resize_max_side(crop, THUMBNAIL_SIZE)
+
+
+class ImageStore:
+    """Menyimpan snapshot absensi sebagai original + thumbnail + arsip, dan menegakkan retensi."""
+
+    def __init__(self, root_dir, original_retention_days: int = 30):
+        self.root = Path(root_dir)
+        self.thumbs_dir = self.root / "thumbs"
+        self.archive_dir = self.root / "archive"
+        self.packs_dir = self.root / "packs"
+        self.original_retention_days = original_retention_days
+        for directory in (self.root, self.thumbs_dir, self.archive_dir, self.packs_dir):
+            os.makedirs(directory, exist_ok=True)
+
+    def _archive_path(self, filename: str, mtime: float = None) -> Path:
+        year, month, day = _date_parts(filename, mtime)
+        return self.archive_dir / year / month / day / filename
+
+    def _write_derivatives(self, img, filename: str, face_box: dict = None, mtime: float = None):
+        thumb_path = self.thumbs_dir / filename
+        if not thumb_path.exists():
+            thumb_path.write_bytes(_encode_jpeg(make_thumbnail(img, face_box), THUMBNAIL_QUALITY))
+        archive_path = self._archive_path(filename, mtime)
+        if not archive_path.exists():
+            os.makedirs(archive_path.parent, exist_ok=True)
+            archive_path.write_bytes(_encode_jpeg(_resize_max_side(img, ARCHIVE_MAX_SIDE), ARCHIVE_QUALITY))
+
+    def save_original(self, image_bytes: bytes, filename: str) -> Path:
+        """
+        Menulis original saja (tanpa fsync) lewat file sementara + os.replace, sehingga URL
+        /images/<filename> langsung valid dan tidak pernah melayani file setengah jadi.
+        Thumbnail & arsip dibuat kemudian oleh save_snapshot.
+        """
+        original_path = self.root / filename
+        tmp_path = self.root / f".{filename}.tmp"
+        tmp_path.write_bytes(image_bytes)
+        os.replace(tmp_path, original_path)
+        return original_path
+
+    def save_snapshot(self, image_bytes: bytes, filename: str, face_box: dict = None):
+        """Menyimpan original, thumbnail wajah, dan salinan arsip terkompresi (idempoten)."""
+        original_path = self.root / filename
+        if not original_path.exists():
+            original_path.write_bytes(image_bytes)
+        img = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
+        if img is None:
+            print(f"⚠️ Snapshot {filename} tidak bisa di-decode; thumbnail/arsip dilewati.")
+            return
+        self._write_derivatives(img, filename, face_box)
+
+    def apply_retention(self) -> dict:
+        """
+        Memindahkan original yang lebih tua dari retensi ke packs/YYYYMM.zip (tier dingin).
+        Original lama yang belum punya thumbnail/arsip (data sebelum fitur ini) dibuatkan dulu.
+        """
+        cutoff = time.time() - self.original_retention_days * 86400
+        cutoff_date = (datetime.now() - timedelta(days=self.original_retention_days)).strftime("%Y%m%d")
+        packed, backfilled = 0, 0
+        expired = {}  # nama pack -> [entry], agar setiap pack dibuka (dan dibaca direktorinya) sekali
+        for entry in sorted(os.scandir(self.root), key=lambda e: e.name):
+            if not entry.is_file() or not entry.name.lower().endswith((".jpg", ".jpeg", ".png")):
+                continue
+            mtime = entry.stat().st_mtime
+            if not (self.thumbs_dir / entry.name).exists() or not self._archive_path(entry.name, mtime).exists():
+                img = cv2.imread(entry.path)
+                if img is not None:
+                    self._write_derivatives(img, entry.name, mtime=mtime)
+                    backfilled += 1
+
+            match = _DATE_PREFIX.match(entry.name)
+            is_old = "".join(match.groups()) < cutoff_date if match else mtime < cutoff
+            if not is_old:
+                continue
+            year, month, _ = _date_parts(entry.name, mtime)
+            expired.setdefault(f"{year}{month}.zip", []).append(entry)
+
+        for pack_name, entries in expired.items():
+            with zipfile.ZipFile(self.packs_dir / pack_name, "a", compression=zipfile.ZIP_STORED) as pack:
+                existing = set(pack.namelist())
+                for entry in entries:
+                    if entry.name not in existing:
+                        pack.write(entry.path, arcname=entry.name)
+            # Original baru dihapus setelah pack ditutup (direktori zip sudah tertulis)
+            for entry in entries:
+                os.remove(entry.path)
+            packed += len(entries)
+        return {"packed": packed, "backfilled": backfilled}
+
+    def stats(self) -> dict:
+        def dir_size(path: Path):
+            total = 0
+            for dirpath, _, filenames in os.walk(path):
+                total += sum(os.path.getsize(os.path.join(dirpath, f)) for f in filenames)
+            return total
+        originals = sum(e.stat().st_size for e in os.scandir(self.root) if e.is_file())
+        return {
+            "originals_bytes": originals,
+            "thumbs_bytes": dir_size(self.thumbs_dir),
+            "archive_bytes": dir_size(self.archive_dir),
+            "packs_bytes": dir_size(self.packs_dir),
+        }
@@ -0,0 +1,85 @@
+# backend/inference_pool.py
+import asyncio
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+# --- POOL INFERENSI DENGAN ANTRIAN TERBATAS ---
+# DeepFace/TensorFlow bersifat blocking. Pool ini menjalankan inferensi di luar
+# event loop sehingga endpoint lain (mis. /attendance/today) tetap responsif.
+# Maksimal `max_workers` job berjalan bersamaan; sisanya menunggu di antrian
+# berukuran `max_queue`. Permintaan di luar kapasitas langsung ditolak (busy).
+
+
+class PoolBusyError(Exception):
+    """Dilempar ketika antrian inferensi penuh."""
+    pass
+
+
+class InferencePool:
+    """Executor thread/process dengan admission queue terbatas dan metrik antrian."""
+
+    def __init__(self, max_workers: int = 2, max_queue: int = 8, mode: str = "thread"):
+        if mode not in ("thread", "process"):
+            raise ValueError("mode harus 'thread' atau 'process'.")
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.mode = mode
+        executor_cls = ProcessPoolExecutor if mode == "process" else ThreadPoolExecutor
+        self._executor = executor_cls(max_workers=max_workers)
+        self._slots = asyncio.Semaphore(max_workers)
+        self._waiting = 0
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+        self._wait_times_ms = deque(maxlen=500)
+
+    async def run(self, fn, *args, **kwargs):
+        """Menjalankan fn(*args, **kwargs) di pool. Melempar PoolBusyError jika antrian penuh."""
+        if self._waiting >= self.max_queue and self._slots.locked():
+            self._rejected += 1
+            raise PoolBusyError("Server sedang sibuk memproses wajah lain. Silakan coba lagi.")
+
+        queued_at = time.perf_counter()
+        self._waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self._waiting -= 1
+        self._wait_times_ms.append((time.perf_counter() - queued_at) * 1000)
+
+        self._running += 1
+        try:
+            loop = asyncio.get_running_loop()
+            if kwargs:
+                return await loop.run_in_executor(self._executor, _call_with_kwargs, fn, args, kwargs)
+            return await loop.run_in_executor(self._executor, fn, *args)
+        finally:
+            self._running -= 1
+            self._completed += 1
+            self._slots.release()
+
+    def stats(self) -> dict:
+        """Metrik antrian untuk menentukan ukuran server kiosk."""
+        waits = sorted(self._wait_times_ms)
+        avg_wait = sum(waits) / len(waits) if waits else 0.0
+        p95_wait = waits[int(0.95 * (len(waits) - 1))] if waits else 0.0
+        return {
+            "mode": self.mode,
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "queue_depth": self._waiting,
+            "running": self._running,
+            "completed": self._completed,
+            "rejected": self._rejected,
+            "avg_wait_ms": round(avg_wait, 2),
+            "p95_wait_ms": round(p95_wait, 2),
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+
+def _call_with_kwargs(fn, args, kwargs):
+    """Helper top-level (picklable) agar kwargs bisa dikirim ke ProcessPoolExecutor."""
+    return fn(*args, **kwargs)
@@ -0,0 +1,110 @@
+# backend/ivf_index.py
+import numpy as np
+
+# --- INDEKS IVF (INVERTED FILE) DI NUMPY ---
+# Untuk galeri besar (multi-site), pencarian brute-force O(N) diganti dengan:
+#   1. k-means sferis membagi galeri menjadi `nlist` cluster (centroid ternormalisasi),
+#   2. query hanya dibandingkan dengan isi `nprobe` cluster terdekat.
+# Vektor disusun ulang per cluster dalam satu matriks kontigu (+ offset), sehingga setiap
+# cluster yang diprobe adalah satu irisan matriks dan satu perkalian matriks-vektor.
+# nprobe lebih besar = recall lebih tinggi, latensi lebih besar (lihat benchmarks/bench_ann.py).
+
+KMEANS_ITERATIONS = 10
+TRAIN_POINTS_PER_LIST = 64  # sampel pelatihan k-means per cluster (cukup untuk centroid stabil)
+
+
+def default_nlist(size: int) -> int:
+    """Aturan umum (sama dengan panduan pgvector ivfflat): N/1000 sampai 1 juta, sqrt(N) di atasnya."""
+    if size <= 1_000_000:
+        return max(1, size // 1000)
+    return int(np.sqrt(size))
+
+
+def spherical_kmeans(vectors: np.ndarray, k: int, iterations: int = KMEANS_ITERATIONS, seed: int = 0) -> np.ndarray:
+    """k-means pada vektor ternormalisasi L2 (similaritas kosinus). Mengembalikan centroid (k, dim)."""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(vectors.shape[0], size=k, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, vectors)
+        counts = np.bincount(assignment, minlength=k)
+        empty = counts == 0
+        if empty.any():
+            # Cluster kosong diisi ulang dengan titik acak agar semua nlist terpakai
+            sums[empty] = vectors[rng.choice(vectors.shape[0], size=int(empty.sum()), replace=False)]
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        centroids = sums / norms
+    return centroids.astype(np.float32)
+
+
+class IVFIndex:
+    """Indeks IVF-Flat untuk matriks embedding yang sudah dinormalisasi L2 (jarak kosinus)."""
+
+    def __init__(self, nlist: int = None, nprobe: int = 8, seed: int = 0):
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.seed = seed
+        self.centroids = None
+        self.trained_size = 0
+        self._vectors = None
+        self._ids = None
+        self._offsets = None
+
+    def build(self, matrix: np.ndarray, previous: "IVFIndex" = None):
+        """
+        Membangun inverted list dari matrix (N, dim) ternormalisasi.
+        Jika centroid `previous` masih layak (lihat reusable_for), k-means dilewati dan vektor
+        hanya di-assign ulang, sehingga satu /api/register-face tidak melatih ulang seluruh galeri.
+        """
+        size = matrix.shape[0]
+        if previous is not None and previous.reusable_for(size):
+            self.centroids, self.trained_size = previous.centroids, previous.trained_size
+        else:
+            nlist = max(1, min(self.nlist or default_nlist(size), size))
+            rng = np.random.default_rng(self.seed)
+            train_size = min(size, nlist * TRAIN_POINTS_PER_LIST)
+            sample = matrix[rng.choice(size, size=train_size, replace=False)] if train_size < size else matrix
+            self.centroids = spherical_kmeans(sample, nlist, seed=self.seed)
+            self.trained_size = size
+        nlist = self.centroids.shape[0]
+
+        # Assign seluruh galeri per potongan agar memori sementara tetap kecil
+        assignment = np.empty(size, dtype=np.int32)
+        for start in range(0, size, 65536):
+            assignment[start:start + 65536] = np.argmax(matrix[start:start + 65536] @ self.centroids.T, axis=1)
+        order = np.argsort(assignment, kind="stable")
+        self._ids = order.astype(np.int64)
+        self._vectors = np.ascontiguousarray(matrix[order])
+        self._offsets = np.concatenate([[0], np.cumsum(np.bincount(assignment, minlength=nlist))])
+        self.nlist = nlist
+        return self
+
+    def reusable_for(self, size: int) -> bool:
+        """Centroid lama masih layak dipakai selama ukuran galeri tidak berubah lebih dari 2x."""
+        return self.centroids is not None and self.trained_size / 2 <= size <= self.trained_size * 2
+
+    def search(self, query: np.ndarray, k: int = 1, nprobe: int = None) -> tuple:
+        """
+        Top-k di dalam nprobe cluster terdekat.
+        Returns (ids, similarities) terurut menurun; ids merujuk ke baris matrix asli.
+        """
+        nprobe = min(nprobe or self.nprobe, self.nlist)
+        centroid_scores = self.centroids @ query
+        probes = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe] if nprobe < self.nlist else np.arange(self.nlist)
+
+        ids, scores = [], []
+        for cluster in probes:
+            start, end = self._offsets[cluster], self._offsets[cluster + 1]
+            if end > start:
+                ids.append(self._ids[start:end])
+                scores.append(self._vectors[start:end] @ query)
+        if not ids:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        ids, scores = np.concatenate(ids), np.concatenate(scores)
+        if k < scores.shape[0]:
+            top = np.argpartition(-scores, k - 1)[:k]
+            ids, scores = ids[top], scores[top]
+        order = np.argsort(-scores)
+        return ids[order], scores[order]
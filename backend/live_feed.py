@@ -0,0 +1,75 @@
+# backend/live_feed.py
+import asyncio
+import threading
+from collections import deque
+
+# --- FEED ABSENSI LIVE (PUSH, BUKAN POLLING) ---
+# Worker write-behind memanggil publish() setelah log absensi ter-commit. Setiap event
+# memakai log_id sebagai ID-nya, jadi klien yang tersambung ulang dengan Last-Event-ID
+# cukup menerima event dengan log_id lebih besar: dari buffer memori jika masih tercakup,
+# atau dari SQLite (range scan rowid) jika sudah lewat / server baru restart.
+
+
+class AttendanceFeed:
+    """Fan-out event absensi baru ke subscriber asyncio, dengan buffer riwayat untuk reconnect."""
+
+    def __init__(self, history_size: int = 500, subscriber_queue: int = 100):
+        self._history = deque(maxlen=history_size)
+        self._subscriber_queue = subscriber_queue
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._loop = None
+        self._published = 0
+        self._dropped = 0
+
+    def bind(self, loop: asyncio.AbstractEventLoop):
+        """Mengikat feed ke event loop server (dipanggil saat startup)."""
+        self._loop = loop
+
+    def publish(self, event: dict):
+        """Thread-safe: boleh dipanggil dari thread worker. event wajib punya kunci 'id' (log_id)."""
+        with self._lock:
+            self._history.append(event)
+            self._published += 1
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._fanout, event)
+
+    def _fanout(self, event: dict):
+        # Berjalan di event loop
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Klien terlalu lambat: putuskan agar ia reconnect dan mengejar lewat Last-Event-ID
+                self._dropped += 1
+                self._subscribers.discard(queue)
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self._subscriber_queue)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+
+    def since(self, last_id: int):
+        """
+        Event dengan id > last_id dari buffer memori.
+        Returns None jika buffer tidak lagi mencakup last_id (pemanggil harus backfill dari database).
+        """
+        with self._lock:
+            events = list(self._history)
+        if not events or last_id < events[0]["id"] - 1:
+            return None
+        return [event for event in events if event["id"] > last_id]
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": len(self._subscribers),
+            "published": self._published,
+            "dropped_subscribers": self._dropped,
+            "buffered": len(self._history),
+        }
@@ -8,20 +8,22 @@ import uuid
 from pathlib import Path
 from datetime import date, timedelta 
 import io
+import base64
+import json
 import webbrowser 
+import asyncio
 from typing import List, Optional 
 from fastapi import FastAPI, UploadFile, File, Form
 from datetime import datetime
 
-# Import gTTS library for automatic Text-to-Speech generation
-from gtts import gTTS 
 # BARU: Tambahkan Form untuk menerima data non-file dari form
 from fastapi import FastAPI, File, UploadFile, HTTPException, Form 
+from fastapi import WebSocket, WebSocketDisconnect
 from starlette.requests import Request
 from starlette.staticfiles import StaticFiles
 from starlette.status import HTTP_302_FOUND
 # BARU: Impor RedirectResponse
-from starlette.responses import RedirectResponse 
+from starlette.responses import RedirectResponse, Response, StreamingResponse
 
 # Import DeepFace (pastikan sudah terinstal: pip install deepface)
 try:
@@ -38,19 +40,94 @@ sys.path.insert(0, str(PROJECT_ROOT))
 # Impor fungsi dan konfigurasi dari file lain (asumsi sudah ada)
 # KOREKSI KRITIS 2: Menggunakan relative import karena main.py berada di dalam folder backend
 try:
-    from .utils import extract_face_features, DISTANCE_THRESHOLD
+    from .utils import extract_face_features, detect_and_align_faces, detect_faces_for_tracking, embed_face_batch, warm_up_models, embedding_cache_key, DISTANCE_THRESHOLD
 except ImportError:
     print("⚠️ Peringatan: Gagal mengimpor utilitas dari backend/utils.py. Pastikan file ini ada.")
     # Fallback/Dummy jika utilitas tidak ditemukan
     def extract_face_features(image_bytes): return []
+    def detect_and_align_faces(image_bytes, **kwargs): return []
+    def detect_faces_for_tracking(image_bytes, **kwargs): return []
+    def embed_face_batch(crops): return []
+    def warm_up_models(): return 0.0
+    def embedding_cache_key(image_bytes, **kwargs): return None
     DISTANCE_THRESHOLD = 0.5
 
+# Indeks embedding di memori (PostgreSQL tetap menjadi penyimpanan permanen)
+from .model_registry import ACTIVE_MODEL, normalize_embedding, embedding_metadata
+from .face_index import FaceIndex
+from .match_decision import decide_match, MATCH_MARGIN, MATCH_TOP_K
+from .vector_codec import Vector
+from .train import sync_directory, vector_search_settings
+# Mode galeri prototipe (opsional): GALLERY_PROTOTYPES = jumlah medoid per intern (kosong = nonaktif)
+GALLERY_PROTOTYPES = os.environ.get("GALLERY_PROTOTYPES", "")
+PROTOTYPE_FALLBACK_MARGIN = float(os.environ.get("PROTOTYPE_FALLBACK_MARGIN", "0.1"))
+# Indeks IVF di memori untuk galeri besar: aktif mulai ANN_MIN_VECTORS vektor (kosong = selalu brute-force)
+ANN_MIN_VECTORS = os.environ.get("ANN_MIN_VECTORS", "50000")
+ANN_NLIST = os.environ.get("ANN_NLIST", "")
+ANN_NPROBE = int(os.environ.get("ANN_NPROBE", "8"))
+FACE_INDEX = FaceIndex(
+    dim=ACTIVE_MODEL["embedding_dim"],
+    prototype_medoids=int(GALLERY_PROTOTYPES) if GALLERY_PROTOTYPES else None,
+    fallback_band=(DISTANCE_THRESHOLD - PROTOTYPE_FALLBACK_MARGIN, DISTANCE_THRESHOLD + PROTOTYPE_FALLBACK_MARGIN),
+    runner_up_margin=MATCH_MARGIN,
+    ann_min_vectors=int(ANN_MIN_VECTORS) if ANN_MIN_VECTORS else None,
+    ann_nlist=int(ANN_NLIST) if ANN_NLIST else None,
+    ann_nprobe=ANN_NPROBE
+)
+
+# Pool inferensi DeepFace (di luar event loop) dengan antrian terbatas
+from .inference_pool import InferencePool, PoolBusyError
+from .batcher import MicroBatcher
+from .tts_engine import build_tts_engine
+from .db_pool import PostgresPool, SqlitePool, PoolTimeoutError
+from .attendance_tracker import DailyAttendanceSet
+from .attendance_schema import migrate_attendance_logs, attendance_timestamp, month_range
+from .attendance_rollup import create_rollup_tables, record_attendance_rollup
+from .write_behind import WriteBehindQueue
+from .image_store import ImageStore, thumbnail_url, archive_url
+from .attendance_history import day_epoch_range, fetch_page, fetch_grouped_page, iter_rows, stream_ndjson, stream_csv, DEFAULT_PAGE_SIZE
+from .live_feed import AttendanceFeed
+from .face_tracker import FaceTracker
+from .face_quality import FaceQualityError, QUALITY_MESSAGES
+from .embedding_cache import shared_cache, content_hash
+from .gallery_snapshot import snapshot_path, gallery_version, open_snapshot, write_snapshot
+
 # Konfigurasi DB
 DB_HOST = "localhost"
 DB_NAME = "vector_db"
 DB_USER = "macbookpro"  
 DB_PASSWORD = "deepfacepass" 
 DB_PATH = PROJECT_ROOT / "backend" / "attendance.db" # Database SQLite untuk log
+PG_POOL_MIN = int(os.environ.get("PG_POOL_MIN", "1"))
+PG_POOL_MAX = int(os.environ.get("PG_POOL_MAX", "8"))
+# Batas tunggu (detik) checkout koneksi PostgreSQL saat semua koneksi pool sedang dipakai
+PG_POOL_CHECKOUT_TIMEOUT = float(os.environ.get("PG_POOL_CHECKOUT_TIMEOUT", "5"))
+
+# Prepared statement nearest-neighbour (disiapkan sekali per koneksi di pool):
+# NEAREST_FACE_CANDIDATES baris terdekat (memakai indeks HNSW/IVFFlat) lalu best-of-N per identitas.
+# Identitas = name (sama seperti FaceIndex); instansi NULL/berbeda tidak memecah satu intern jadi dua.
+NEAREST_FACE_CANDIDATES = 50
+NEAREST_FACE_STATEMENT = f"""
+    PREPARE nearest_faces(vector, varchar, integer, varchar, integer) AS
+    SELECT name, MIN(instansi) AS instansi, MIN(distance) AS distance
+    FROM (
+        SELECT name, instansi, embedding <=> $1 AS distance
+        FROM intern_embeddings
+        WHERE model_name = $2 AND embedding_dim = $3 AND normalization = $4
+        ORDER BY distance ASC
+        LIMIT {NEAREST_FACE_CANDIDATES}
+    ) candidates
+    GROUP BY name
+    ORDER BY distance ASC
+    LIMIT $5
+"""
+# Parameter pencarian indeks HNSW/IVFFlat (SET per sesi) ikut dijalankan sekali per koneksi baru
+VECTOR_DB_POOL = PostgresPool(
+    PG_POOL_MIN, PG_POOL_MAX, prepare_statements=(NEAREST_FACE_STATEMENT, *vector_search_settings()),
+    checkout_timeout=PG_POOL_CHECKOUT_TIMEOUT,
+    host=DB_HOST, database=DB_NAME, user=DB_USER, password=DB_PASSWORD
+)
+SQLITE_POOL = SqlitePool(DB_PATH)
 
 # FOLDER UNTUK GAMBAR
 CAPTURED_IMAGES_DIR = PROJECT_ROOT / "backend" / "captured_images" # Gambar hasil absensi
@@ -58,6 +135,32 @@ FACES_DIR = PROJECT_ROOT / "backend" / "faces" # Gambar sumber untuk indexing De
 # PERBAIKAN KRITIS: Mengacu langsung ke PROJECT_ROOT agar sesuai dengan struktur yang diinginkan (main.html, data.html, settings.html di root)
 FRONTEND_STATIC_DIR = PROJECT_ROOT / "frontend"  # Folder untuk file HTML (main.html, data.html, settings.html) di root proyek
 AUDIO_FILES_DIR = PROJECT_ROOT / "backend" / "generated_audio"
+# Journal pipeline write-behind (snapshot + log absensi yang belum tersimpan)
+WRITE_BEHIND_JOURNAL = PROJECT_ROOT / "backend" / "write_behind.journal"
+WRITE_BEHIND_BATCH_SIZE = int(os.environ.get("WRITE_BEHIND_BATCH_SIZE", "50"))
+# Original snapshot disimpan selama N hari, lalu dipak ke captured_images/packs (thumbnail & arsip tetap)
+ORIGINAL_RETENTION_DAYS = int(os.environ.get("ORIGINAL_RETENTION_DAYS", "30"))
+IMAGE_RETENTION_INTERVAL_SECONDS = 24 * 3600
+# Feed live data.html: interval heartbeat SSE (detik) dan batas event backfill per reconnect
+LIVE_FEED_HEARTBEAT_SECONDS = 15
+LIVE_FEED_BACKFILL_LIMIT = 1000
+
+# Konfigurasi pool inferensi: "thread" atau "process", jumlah worker, dan panjang antrian
+INFERENCE_POOL_MODE = os.environ.get("INFERENCE_POOL_MODE", "thread")
+INFERENCE_WORKERS = int(os.environ.get("INFERENCE_WORKERS", "2"))
+INFERENCE_MAX_QUEUE = int(os.environ.get("INFERENCE_MAX_QUEUE", "8"))
+INFERENCE_POOL = InferencePool(max_workers=INFERENCE_WORKERS, max_queue=INFERENCE_MAX_QUEUE, mode=INFERENCE_POOL_MODE)
+
+# Konfigurasi micro-batching embedding: jendela tunggu (ms) dan ukuran batch maksimal
+BATCH_MAX_WAIT_MS = float(os.environ.get("BATCH_MAX_WAIT_MS", "10"))
+BATCH_MAX_SIZE = int(os.environ.get("BATCH_MAX_SIZE", "8"))
+# Konfigurasi TTS: urutan backend (online dulu, lalu offline) dan batas ukuran cache audio
+TTS_BACKEND_NAMES = os.environ.get("TTS_BACKENDS", "gtts,espeak,pyttsx3").split(",")
+TTS_CACHE_MAX_MB = int(os.environ.get("TTS_CACHE_MAX_MB", "50"))
+
+# Cache embedding berbasis hash isi gambar (sama dengan extract_face_features & train.py); None jika EMBEDDING_CACHE=0
+EMBEDDING_CACHE = shared_cache(ACTIVE_MODEL["model_name"])
+EMBEDDING_BATCHER = MicroBatcher(embed_face_batch, max_batch_size=BATCH_MAX_SIZE, max_wait_ms=BATCH_MAX_WAIT_MS, runner=INFERENCE_POOL.run)
 
 # --- INISIALISASI APLIKASI ---
 app = FastAPI(title="DeepFace Absensi API")
@@ -72,31 +175,43 @@ app.mount("/images", StaticFiles(directory=str(CAPTURED_IMAGES_DIR), check_dir=T
 app.mount("/faces_data", StaticFiles(directory=str(FACES_DIR), check_dir=True), name="faces_data")
 
 
-# --- FUNGSI AUDIO GENERATION ---
+# --- FUNGSI AUDIO (TTS DENGAN CACHE, TIDAK PERNAH MEMBLOKIR /recognize) ---
 
-def generate_audio_file(filename: str, text: str):
-    """Menghasilkan dan menyimpan file audio MP3 menggunakan gTTS jika belum ada."""
-    audio_path = AUDIO_FILES_DIR / filename
-    os.makedirs(AUDIO_FILES_DIR, exist_ok=True)
-    
-    if audio_path.exists():
-        return
+TTS_ENGINE = build_tts_engine(TTS_BACKEND_NAMES, AUDIO_FILES_DIR / "cache", TTS_CACHE_MAX_MB * 1024 * 1024)
 
-    try:
-        print(f"   -> 🔊 Generating TTS file: {filename} for text: '{text}'...")
-        tts = gTTS(text=text, lang='id')
-        tts.save(str(audio_path))
-        print(f"   -> ✅ TTS file {filename} successfully generated.")
-    except Exception as e:
-        # Gagal generate audio jika tidak ada koneksi internet
-        print(f"❌ ERROR: Gagal generate file audio {filename}. Pastikan Anda memiliki koneksi internet: {e}")
+AUDIO_TEXT_NO_FACE = "Wajah tidak terdeteksi. Silakan coba lagi."
+AUDIO_TEXT_UNREGISTERED = "Data wajah Anda belum terdaftar di sistem. Mohon hubungi admin."
+AUDIO_TEXT_SERVER_ERROR = "Kesalahan server terjadi. Mohon hubungi admin."
+AUDIO_TEXT_AMBIGUOUS = "Wajah belum dapat dipastikan. Silakan hadap kamera dan coba lagi."
+# Klip umum dipakai sementara klip bernama untuk intern baru masih disintesis
+AUDIO_TEXT_WELCOME_GENERIC = "Selamat datang. Absensi berhasil dicatat."
+AUDIO_TEXT_DUPLICATE_GENERIC = "Anda sudah absen hari ini. Selamat bekerja."
+
+def welcome_text(name: str) -> str:
+    return f"Selamat datang, {name}. Absensi berhasil dicatat."
+
+def duplicate_text(name: str) -> str:
+    return f"{name}, Anda sudah absen hari ini. Selamat bekerja."
+
+def prefetch_intern_audio(name: str):
+    """Menjadwalkan sintesis klip selamat datang & duplikat untuk satu intern (background)."""
+    TTS_ENGINE.prefetch(welcome_text(name))
+    TTS_ENGINE.prefetch(duplicate_text(name))
+
+def prefetch_common_audio():
+    """Menjadwalkan sintesis klip status umum dan klip semua intern yang sudah terindeks."""
+    for text in (AUDIO_TEXT_NO_FACE, AUDIO_TEXT_UNREGISTERED, AUDIO_TEXT_SERVER_ERROR, AUDIO_TEXT_AMBIGUOUS,
+                 AUDIO_TEXT_WELCOME_GENERIC, AUDIO_TEXT_DUPLICATE_GENERIC, *QUALITY_MESSAGES.values()):
+        TTS_ENGINE.prefetch(text)
+    for name in FACE_INDEX.names():
+        prefetch_intern_audio(name)
         
 # --- FUNGSI DATABASE HELPERS ---
 
 def initialize_sqlite_db():
     """Memastikan tabel interns dan attendance_logs ada di SQLite DB."""
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = connect_sqlite_db()
         cursor = conn.cursor()
         
         cursor.execute("""
@@ -113,20 +228,17 @@ def initialize_sqlite_db():
             ("Said", "Software Engineer")
         )
 
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS attendance_logs (
-                log_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                intern_id INTEGER,
-                intern_name TEXT NOT NULL,
-                instansi TEXT,
-                image_url TEXT, 
-                absent_at TEXT,
-                FOREIGN KEY (intern_id) REFERENCES interns(id)
-            );
-        """)
+        # Tabel attendance_logs + kolom log_date/absent_epoch ber-indeks (migrasi otomatis untuk DB lama)
+        backfilled = migrate_attendance_logs(conn)
+        # Tabel rollup harian/bulanan (dibangun dari log jika baru dibuat)
+        rollup_days = create_rollup_tables(conn)
+        if rollup_days:
+            print(f"✅ Rollup absensi dibangun dari log: {rollup_days} hari.")
         
         conn.commit()
         conn.close()
+        if backfilled:
+            print(f"✅ Migrasi attendance_logs: {backfilled} baris lama diisi log_date/absent_epoch.")
         print("✅ SQLite Database (attendance.db) berhasil diinisialisasi.")
         
         # Pastikan semua folder yang akan di-mount sudah ada
@@ -170,95 +282,386 @@ def get_or_create_intern(name: str, instansi: str = "Intern"):
         raise Exception(f"Gagal mengelola data intern: {e}")
 
 def connect_vector_db():
-    """Membuat koneksi ke Database Vektor (PostgreSQL)."""
+    """Mengambil koneksi Database Vektor (PostgreSQL) dari pool. conn.close() mengembalikannya ke pool."""
     try:
-        return psycopg2.connect(host=DB_HOST, database=DB_NAME, user=DB_USER, password=DB_PASSWORD)
+        return VECTOR_DB_POOL.getconn()
+    except PoolTimeoutError as e:
+        print(f"❌ Pool Database Vektor penuh: {e}")
+        raise Exception(f"Database Vektor sibuk, coba lagi. {e}")
     except psycopg2.Error as e:
         print(f"❌ Gagal koneksi ke Database Vektor: {e}")
         # Mengganti raise HTTPException dengan pesan yang lebih informatif untuk logging
         raise Exception("Database Vektor tidak terhubung/konfigurasi salah.")
 
+# Snapshot galeri (np.memmap read-only) dibagi semua worker; dibuat ulang jika isi PostgreSQL berubah
+GALLERY_SNAPSHOT_PATH = snapshot_path(ACTIVE_MODEL["model_name"])
+# Interval (detik) tiap worker membandingkan versi galerinya dengan PostgreSQL (0 = nonaktif)
+GALLERY_SYNC_INTERVAL_SECONDS = float(os.environ.get("GALLERY_SYNC_INTERVAL_SECONDS", "10"))
+# Versi intern_embeddings (gallery_version) yang sedang dimuat FACE_INDEX di worker ini
+GALLERY_STATE = {"version": None}
+
+def save_gallery_snapshot(source_version: str):
+    """Menulis isi FACE_INDEX ke snapshot galeri (kegagalan tulis tidak menghentikan server)."""
+    GALLERY_STATE["version"] = source_version
+    try:
+        matrix, names, instansi = FACE_INDEX.arrays()
+        size = write_snapshot(GALLERY_SNAPSHOT_PATH, matrix, names, instansi, embedding_metadata(), source_version)
+        print(f"💾 Snapshot galeri ditulis: {GALLERY_SNAPSHOT_PATH.name} ({size / 1e6:.1f} MB, versi {source_version}).")
+    except OSError as e:
+        print(f"⚠️ Gagal menulis snapshot galeri: {e}")
+
+def load_face_index():
+    """
+    Memuat indeks wajah di memori. Snapshot galeri dipakai jika versinya sama dengan isi
+    intern_embeddings (cek satu query COUNT/MAX); jika tidak, galeri dimuat dari PostgreSQL
+    lalu snapshot ditulis ulang untuk worker/restart berikutnya.
+    """
+    metadata = embedding_metadata()
+    snapshot = open_snapshot(GALLERY_SNAPSHOT_PATH, metadata)
+    try:
+        conn = connect_vector_db()
+        cursor = conn.cursor()
+        version = gallery_version(cursor, metadata)
+        if snapshot is not None and snapshot[3]["source_version"] == version:
+            conn.close()
+            FACE_INDEX.load_arrays(*snapshot[:3])
+            GALLERY_STATE["version"] = version
+            print(f"✅ Indeks wajah dimuat dari snapshot galeri (memmap): {len(FACE_INDEX)} vektor ({ACTIVE_MODEL['model_name']}).")
+            return len(FACE_INDEX)
+
+        total = FACE_INDEX.load_from_db(conn, metadata=metadata)
+        cursor.execute("SELECT COUNT(*) FROM intern_embeddings WHERE model_name IS DISTINCT FROM %s", (ACTIVE_MODEL["model_name"],))
+        skipped = cursor.fetchone()[0]
+        conn.close()
+        print(f"✅ Indeks wajah di memori dimuat: {total} vektor ({ACTIVE_MODEL['model_name']}).")
+        if skipped:
+            print(f"⚠️ {skipped} vektor dari model lain diabaikan. Jalankan 'python backend/migrate_embeddings.py'.")
+        save_gallery_snapshot(version)
+        return total
+    except Exception as e:
+        print(f"❌ Gagal memuat indeks wajah dari Database Vektor: {e}")
+        if snapshot is not None:
+            # PostgreSQL tidak tersedia: snapshot terakhir tetap lebih baik daripada indeks kosong
+            FACE_INDEX.load_arrays(*snapshot[:3])
+            GALLERY_STATE["version"] = snapshot[3]["source_version"]
+            print(f"⚠️ Memakai snapshot galeri terakhir ({len(FACE_INDEX)} vektor, versi {snapshot[3]['source_version']}).")
+            return len(FACE_INDEX)
+        return 0
+
+def sync_face_index() -> bool:
+    """
+    Menyamakan FACE_INDEX worker ini dengan intern_embeddings (register/delete di worker lain).
+    Satu query versi; jika berubah, snapshot galeri dipakai bila versinya sudah sama dengan
+    PostgreSQL, selain itu galeri dimuat ulang dari PostgreSQL dan snapshot ditulis ulang.
+    Mengembalikan True jika indeks dimuat ulang.
+    """
+    metadata = embedding_metadata()
+    conn = connect_vector_db()
+    try:
+        version = gallery_version(conn.cursor(), metadata)
+        if version == GALLERY_STATE["version"]:
+            return False
+        snapshot = open_snapshot(GALLERY_SNAPSHOT_PATH, metadata)
+        if snapshot is not None and snapshot[3]["source_version"] == version:
+            FACE_INDEX.load_arrays(*snapshot[:3])
+            GALLERY_STATE["version"] = version
+            print(f"🔄 Indeks wajah disinkronkan dari snapshot galeri: {len(FACE_INDEX)} vektor (versi {version}).")
+            return True
+        FACE_INDEX.load_from_db(conn, metadata=metadata)
+    finally:
+        conn.close()
+    print(f"🔄 Indeks wajah dimuat ulang dari PostgreSQL: {len(FACE_INDEX)} vektor (versi {version}).")
+    save_gallery_snapshot(version)
+    return True
+
+async def sync_face_index_async():
+    """sync_face_index di thread, diserialkan dengan /reload_db."""
+    try:
+        async with RELOAD_LOCK:
+            await asyncio.get_running_loop().run_in_executor(None, sync_face_index)
+    except Exception as e:
+        print(f"⚠️ Sinkronisasi indeks wajah gagal: {e}")
+
+async def gallery_sync_loop():
+    """Memeriksa versi galeri secara berkala agar setiap worker melihat perubahan dari worker lain."""
+    while True:
+        await asyncio.sleep(GALLERY_SYNC_INTERVAL_SECONDS)
+        await sync_face_index_async()
+
+def search_vector_db(embedding, k: int = MATCH_TOP_K):
+    """
+    Top-k identitas langsung di pgvector (prepared statement). Dipakai jika indeks memori kosong.
+    Returns list (name, instansi, distance), sama dengan FaceIndex.search_topk.
+    """
+    conn = connect_vector_db()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("EXECUTE nearest_faces(%s, %s, %s, %s, %s)", (Vector(embedding), *embedding_metadata(), k))
+        return [(name, instansi, float(distance)) for name, instansi, distance in cursor.fetchall()]
+    finally:
+        conn.close()
+
 def connect_sqlite_db():
-    """Helper untuk koneksi ke SQLite DB."""
+    """Helper untuk koneksi SQLite DB (koneksi WAL jangka panjang per thread). conn.close() mengembalikannya ke pool."""
     try:
-        return sqlite3.connect(DB_PATH)
+        return SQLITE_POOL.getconn()
     except Exception as e:
         print(f"❌ Gagal koneksi ke SQLite: {e}")
         raise HTTPException(status_code=500, detail="Database SQLite tidak terhubung.")
         
+def load_attended_names(day: date):
+    """Mengambil nama intern yang sudah absen pada tanggal tertentu (untuk membangun set harian)."""
+    conn = connect_sqlite_db()
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT DISTINCT intern_name FROM attendance_logs WHERE log_date = ?",
+        (day.isoformat(),)
+    )
+    names = [row[0] for row in cursor.fetchall()]
+    conn.close()
+    return names
+
+# Set "sudah absen hari ini" di memori; dibangun ulang saat startup dan saat tanggal berganti
+ATTENDANCE_TODAY = DailyAttendanceSet(load_attended_names)
+
 def check_duplicate_attendance(intern_name: str) -> bool:
-    """Memeriksa apakah intern sudah absen hari ini di SQLite."""
-    today_date = date.today().strftime('%Y-%m-%d')
+    """Memeriksa apakah intern sudah absen hari ini (O(1), dari set harian di memori)."""
     try:
-        conn = connect_sqlite_db()
-        cursor = conn.cursor()
-        cursor.execute(
-            "SELECT COUNT(*) FROM attendance_logs WHERE intern_name = ? AND absent_at LIKE ?",
-            (intern_name, f"{today_date}%")
-        )
-        count = cursor.fetchone()[0]
-        conn.close()
-        return count > 0
+        return ATTENDANCE_TODAY.contains(intern_name)
     except Exception as e:
         print(f"❌ Gagal memeriksa duplikasi absensi: {e}")
         return False
 
-def log_attendance(intern_name: str, instansi: str, image_url: str):
-    """Mencatat log absensi ke database SQLite dan mengembalikan ID intern."""
+def feed_event(log_id: int, name: str, instansi: str, absent_at: str, log_date: str, image_url: str) -> dict:
+    """Event feed live: format item yang sama dengan /attendance/today, dengan log_id sebagai ID event."""
+    return {
+        "id": log_id,
+        "log_id": log_id,
+        "name": name,
+        "instansi": instansi,
+        "timestamp": absent_at,
+        "log_date": log_date,
+        "distance": 0.0000,
+        "image_path": image_url,
+        "thumbnail_url": thumbnail_url(image_url),
+        "archive_url": archive_url(image_url)
+    }
+
+def persist_attendance_batch(records):
+    """
+    Worker write-behind: menyimpan snapshot gambar lalu menulis satu batch log absensi
+    dalam satu transaksi SQLite. Idempoten (write_id unik), aman untuk replay journal.
+    """
+    for record in records:
+        image_bytes = read_snapshot_original(record)
+        if image_bytes is not None:
+            # Thumbnail wajah + salinan arsip terkompresi (original sudah ditulis sebelum response)
+            IMAGE_STORE.save_snapshot(image_bytes, record["image_file"], record.get("face_box"))
+
+    conn = connect_sqlite_db()
+    committed = []
     try:
-        conn = connect_sqlite_db()
         cursor = conn.cursor()
-        
-        cursor.execute("SELECT id FROM interns WHERE name = ?", (intern_name,))
-        intern_id_tuple = cursor.fetchone()
-        
-        intern_id = intern_id_tuple[0] if intern_id_tuple else None
-        
-        cursor.execute(
-            "INSERT INTO attendance_logs (intern_id, intern_name, instansi, image_url, absent_at) VALUES (?, ?, ?, ?, datetime('now', 'localtime'))",
-            (intern_id, intern_name, instansi, image_url)
-        )
+        for record in records:
+            cursor.execute("SELECT id FROM interns WHERE name = ?", (record["intern_name"],))
+            intern_id_tuple = cursor.fetchone()
+            intern_id = intern_id_tuple[0] if intern_id_tuple else None
+
+            cursor.execute(
+                "INSERT OR IGNORE INTO attendance_logs (intern_id, intern_name, instansi, image_url, absent_at, log_date, absent_epoch, write_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (intern_id, record["intern_name"], record["instansi"], record["image_url"],
+                 record["absent_at"], record["log_date"], record["absent_epoch"], record["write_id"])
+            )
+            # Rollup diperbarui di transaksi yang sama dengan INSERT log (dilewati jika log sudah ada)
+            if cursor.rowcount:
+                record_attendance_rollup(cursor, record["log_date"], record["intern_name"], record["instansi"])
+                committed.append((cursor.lastrowid, record))
         conn.commit()
+    finally:
         conn.close()
-        return intern_id
+
+    # Push ke dashboard yang tersambung hanya setelah log benar-benar tersimpan
+    for log_id, record in committed:
+        ATTENDANCE_FEED.publish(feed_event(log_id, record["intern_name"], record["instansi"],
+                                          record["absent_at"], record["log_date"], record["image_url"]))
+
+def release_failed_attendance(records):
+    """Dipanggil jika batch gagal permanen: intern boleh mencoba absen lagi."""
+    for record in records:
+        print(f"❌ Gagal mencatat log absensi: {record['intern_name']} ({record['absent_at']})")
+        ATTENDANCE_TODAY.release(record["intern_name"])
+        # Log tidak tersimpan: original yang sudah ditulis sebelum response tidak punya pemilik lagi
+        if record.get("image_original"):
+            Path(record["image_original"]).unlink(missing_ok=True)
+
+def read_snapshot_original(record: dict):
+    """Byte original snapshot untuk dibuatkan thumbnail/arsip; None jika record tanpa gambar atau file hilang."""
+    if record.get("image_b64"):
+        # Journal dari versi lama masih menyimpan gambar sebagai base64
+        return base64.b64decode(record["image_b64"])
+    if not record.get("image_original"):
+        return None
+    try:
+        return Path(record["image_original"]).read_bytes()
+    except FileNotFoundError:
+        # Mis. sudah dipak oleh retensi sebelum journal diputar ulang
+        print(f"⚠️ Original snapshot tidak ditemukan: {record['image_original']}")
+        return None
+
+def claim_replayed_attendance(records):
+    """Record dari journal belum ada di SQLite saat set harian dibangun: tandai intern-nya sudah absen."""
+    today = date.today().isoformat()
+    for record in records:
+        if record["log_date"] == today:
+            ATTENDANCE_TODAY.try_claim(record["intern_name"])
+
+IMAGE_STORE = ImageStore(CAPTURED_IMAGES_DIR, original_retention_days=ORIGINAL_RETENTION_DAYS)
+ATTENDANCE_FEED = AttendanceFeed()
+
+WRITE_BEHIND = WriteBehindQueue(
+    str(WRITE_BEHIND_JOURNAL), persist_attendance_batch,
+    batch_size=WRITE_BEHIND_BATCH_SIZE, on_failure=release_failed_attendance
+)
+
+def log_attendance(intern_name: str, instansi: str, image_url: str, image_bytes: bytes = None, image_filename: str = None, face_box: dict = None):
+    """
+    Mengantrikan log absensi (dan snapshot gambar) ke pipeline write-behind.
+    Original gambar ditulis ke captured_images sebelum response (journal hanya berisi path-nya);
+    thumbnail/arsip, SQLite, dan fsync journal terjadi di worker background.
+    Mengembalikan write_id, atau None jika gagal diantrikan.
+    """
+    try:
+        absent_at, log_date, absent_epoch = attendance_timestamp()
+        record = {
+            "write_id": uuid.uuid4().hex,
+            "intern_name": intern_name,
+            "instansi": instansi,
+            "image_url": image_url,
+            "absent_at": absent_at,
+            "log_date": log_date,
+            "absent_epoch": absent_epoch,
+        }
+        if image_bytes is not None:
+            record["image_file"] = image_filename
+            # Original ditulis sekarang agar image_url di response langsung bisa dimuat kiosk
+            record["image_original"] = str(IMAGE_STORE.save_original(image_bytes, image_filename))
+            record["face_box"] = face_box
+        WRITE_BEHIND.submit(record)
+        return record["write_id"]
              
     except Exception as e:
         print(f"❌ Gagal mencatat log absensi: {e}")
+        # Log tidak tersimpan: batalkan tanda "sudah absen" agar intern bisa mencoba lagi
+        ATTENDANCE_TODAY.release(intern_name)
         return None
 
-def delete_face_files(name: str):
-    """Menghapus folder dan semua file gambar wajah untuk nama tertentu."""
-    face_folder = FACES_DIR / name
-    if face_folder.exists() and face_folder.is_dir():
+def face_folder_name(person_name: str) -> str:
+    """Nama folder FACES_DIR untuk seorang intern (dipakai /api/register-face): spasi dan '/' menjadi '_'."""
+    return person_name.strip().replace(' ', '_').replace('/', '_').replace('\\', '_')
+
+def delete_face_files(name: str, image_paths=()):
+    """
+    Menghapus folder gambar wajah milik nama tertentu: FACES_DIR/<name>, FACES_DIR/<nama folder
+    register-face>, dan folder FACES_DIR dari image_path baris yang dihapus.
+    Returns (ada folder yang dihapus, daftar folder yang gagal dihapus).
+    """
+    faces_root = FACES_DIR.resolve()
+    candidates = [FACES_DIR / name, FACES_DIR / face_folder_name(name)] + [Path(p).parent for p in image_paths]
+    # Hanya folder per intern tepat di bawah FACES_DIR (bukan FACES_DIR itu sendiri, '..', atau dataset lain)
+    folders = {folder.resolve() for folder in candidates if folder.resolve().parent == faces_root}
+
+    deleted, remaining = False, []
+    for face_folder in folders:
+        if not face_folder.is_dir():
+            continue
         try:
             shutil.rmtree(face_folder)
-            return True
+            deleted = True
         except Exception as e:
             print(f"❌ Gagal menghapus folder file wajah: {e}")
-            return False
-    return False
+        if face_folder.exists():
+            remaining.append(str(face_folder))
+    return deleted, remaining
 
-# --- HOOK UNTUK MEMBUKA BROWSER OTOMATIS ---
+# --- HOOK STARTUP: WARM-UP MODEL & MEMBUKA BROWSER OTOMATIS ---
 
-@app.on_event("startup")
-async def startup_event():
-    """Melakukan inisialisasi DB dan membuka browser saat startup."""
-    initialize_sqlite_db()
-    
-    # Membuka browser otomatis ke main.html
+# Status kesiapan: True hanya setelah model dan detektor selesai warm-up
+APP_STATE = {"ready": False, "warmup_seconds": None, "warmup_error": None}
+
+async def warm_up_and_announce():
+    """Warm-up model di pool inferensi, lalu menandai aplikasi siap dan membuka browser."""
+    try:
+        elapsed = await INFERENCE_POOL.run(warm_up_models)
+        APP_STATE["warmup_seconds"] = round(elapsed, 2)
+        print(f"✅ Warm-up model selesai dalam {elapsed:.2f}s.")
+    except Exception as e:
+        APP_STATE["warmup_error"] = str(e)
+        print(f"❌ Warm-up model gagal: {e}")
+    APP_STATE["ready"] = True
+
+    # Membuka browser otomatis ke main.html (di thread terpisah agar tidak memblokir event loop)
     try:
-        # Menunggu sebentar untuk memastikan server siap
-        time.sleep(1) 
         # Cukup buka root, nanti akan diredirect oleh endpoint baru di bawah
-        webbrowser.open("http://127.0.0.1:8000/") 
+        await asyncio.get_running_loop().run_in_executor(None, webbrowser.open, "http://127.0.0.1:8000/")
         print("\n=============================================")
         print("🌐 Aplikasi DeepFace Absensi siap.")
         print("Akses di: http://127.0.0.1:8000/")
         print("=============================================\n")
     except Exception as e:
         print(f"⚠️ Gagal membuka browser otomatis: {e}")
+
+async def image_retention_loop():
+    """Menjalankan retensi gambar absensi (pack original lama) saat startup lalu setiap 24 jam."""
+    while True:
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(None, IMAGE_STORE.apply_retention)
+            if result["packed"] or result["backfilled"]:
+                print(f"✅ Retensi gambar: {result['packed']} original dipak, {result['backfilled']} thumbnail/arsip dibuat.")
+        except Exception as e:
+            print(f"⚠️ Retensi gambar gagal: {e}")
+        await asyncio.sleep(IMAGE_RETENTION_INTERVAL_SECONDS)
+
+@app.on_event("startup")
+async def startup_event():
+    """Melakukan inisialisasi DB, memuat indeks wajah, dan memulai warm-up model di background."""
+    initialize_sqlite_db()
+    load_face_index()
+    try:
+        print(f"✅ Set absensi hari ini dimuat: {ATTENDANCE_TODAY.rebuild()} intern sudah absen.")
+    except Exception as e:
+        print(f"❌ Gagal memuat set absensi hari ini: {e}")
+    # Putar ulang penulisan yang tertunda dari journal (jika server sebelumnya crash);
+    # intern di record tsb diklaim di set harian agar tidak bisa absen dua kali sebelum batch tersimpan
+    ATTENDANCE_FEED.bind(asyncio.get_running_loop())
+    replayed = WRITE_BEHIND.start(on_replay=claim_replayed_attendance)
+    if replayed:
+        print(f"✅ Write-behind: {replayed} penulisan tertunda diputar ulang dari journal.")
+    prefetch_common_audio()
+    APP_STATE["warmup_task"] = asyncio.get_running_loop().create_task(warm_up_and_announce())
+    APP_STATE["retention_task"] = asyncio.get_running_loop().create_task(image_retention_loop())
+    if GALLERY_SYNC_INTERVAL_SECONDS > 0:
+        APP_STATE["gallery_sync_task"] = asyncio.get_running_loop().create_task(gallery_sync_loop())
+
+@app.get("/api/ready")
+async def readiness():
+    """Readiness probe: 503 sampai warm-up model selesai."""
+    body = {key: value for key, value in APP_STATE.items() if not key.endswith("_task")}
+    if not APP_STATE["ready"]:
+        raise HTTPException(status_code=503, detail=body)
+    return body
         
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Menghentikan pool inferensi saat server dimatikan."""
+    INFERENCE_POOL.shutdown()
+    if EMBEDDING_CACHE:
+        EMBEDDING_CACHE.flush()
+    TTS_ENGINE.shutdown()
+    WRITE_BEHIND.stop()
+    VECTOR_DB_POOL.closeall()
+    SQLITE_POOL.closeall()
+
 # --- ENDPOINT UTAMA (PERBAIKAN 404) ---
 
 @app.get("/")
@@ -270,6 +673,23 @@ async def redirect_to_main():
 
 # --- ENDPOINT BARU: REGISTRASI WAJAH (API JANGKA PANJANG) ---
 
+def insert_face_embedding(intern_id, person_name, instansi, image_path, embedding_vector, image_bytes, file_path_on_disk):
+    """Menyimpan satu embedding wajah baru ke database vektor (blocking, panggil dari executor)."""
+    conn = connect_vector_db()
+    try:
+        cursor = conn.cursor()
+        # Vector(...) dikonversi oleh adapter psycopg2 di vector_codec (literal float32 ringkas)
+        # content_hash & file_mtime sama dengan yang dihitung train.py, sehingga sync_directory
+        # menganggap file ini sudah terindeks dan tidak meng-embed ulang
+        cursor.execute("""
+            INSERT INTO intern_embeddings (intern_id, name, instansi, image_path, embedding, model_name, embedding_dim, normalization, content_hash, file_mtime)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """, (intern_id, person_name, instansi, image_path, Vector(embedding_vector), *embedding_metadata(),
+              content_hash(image_bytes), os.path.getmtime(file_path_on_disk)))
+        conn.commit()
+    finally:
+        conn.close()
+
 @app.post("/api/register-face")
 async def register_new_face(
     person_name: str = Form(..., description="Nama lengkap intern."),
@@ -280,7 +700,7 @@ async def register_new_face(
     [Jangka Panjang] Mendaftarkan wajah baru ke dalam sistem secara dinamis.
     1. Menyimpan data intern ke SQLite (jika belum ada).
     2. Menyimpan gambar ke disk (backend/faces).
-    3. Ekstrak Embedding (DeepFace.represent).
+    3. Ekstrak Embedding (model aktif dari model_registry).
     4. Menyimpan Embedding ke PostgreSQL/pgvector.
     """
     
@@ -291,7 +711,7 @@ async def register_new_face(
     
     # 1. Sanitize Nama dan Tentukan Path Penyimpanan
     # Hapus spasi dan ganti dengan underscore untuk nama folder
-    safe_name = person_name.strip().replace(' ', '_').replace('/', '_').replace('\\', '_')
+    safe_name = face_folder_name(person_name)
     if not safe_name:
         raise HTTPException(status_code=400, detail="Nama orang tidak boleh kosong.")
         
@@ -322,20 +742,27 @@ async def register_new_face(
         print(f"[ERROR] Gagal menyimpan file: {e}")
         raise HTTPException(status_code=500, detail="Gagal menyimpan file gambar di server.")
 
-    # 3. Ekstrak Embedding Wajah
+    # 3. Ekstrak Embedding Wajah (model yang sama dengan /recognize dan train.py)
     try:
-        # Menggunakan DeepFace.represent untuk memproses gambar yang baru disimpan
-        embedding_objs = DeepFace.represent(
-            img_path=full_path_str, 
-            model_name="Facenet512", 
-            enforce_detection=True
-        )
+        with open(file_path_on_disk, "rb") as f:
+            image_bytes = f.read()
+        emb_list = await INFERENCE_POOL.run(extract_face_features, image_bytes)
+        if not emb_list:
+            raise ValueError("Face could not be detected")
         
         # Ambil vektor embedding pertama (asumsi satu wajah per gambar)
-        embedding_vector = embedding_objs[0]["embedding"]
+        embedding_vector = normalize_embedding(emb_list[0])
         
         print(f"[DEEPFACE] Sukses mendapatkan embedding.")
 
+    except PoolBusyError as e:
+        os.remove(file_path_on_disk)
+        raise HTTPException(status_code=503, detail=str(e))
+    except FaceQualityError as e:
+        # Foto registrasi buruk tidak boleh masuk ke indeks
+        os.remove(file_path_on_disk)
+        print(f"[ERROR] Kualitas foto registrasi ditolak ({e.reason}): {e.metrics}")
+        raise HTTPException(status_code=422, detail={"reason": e.reason, "message": str(e), "metrics": e.metrics})
     except Exception as e:
         # Jika DeepFace gagal mendeteksi wajah, hapus file yang tadi disimpan
         os.remove(file_path_on_disk)
@@ -347,21 +774,18 @@ async def register_new_face(
 
     # 4. Simpan Data ke Database Vektor (PostgreSQL)
     try:
-        conn = connect_vector_db()
-        cursor = conn.cursor()
-        
-        # Konversi array float Python menjadi string array PostgreSQL
-        vector_string = "[" + ",".join(map(str, embedding_vector)) + "]"
-        
-        cursor.execute("""
-            INSERT INTO intern_embeddings (intern_id, name, instansi, embedding, file_path)
-            VALUES (%s, %s, %s, %s::vector, %s)
-        """, (intern_id, person_name, instansi, vector_string, full_path_str))
-        
-        conn.commit()
-        conn.close()
+        # Checkout pool bisa menunggu: INSERT dijalankan di thread, bukan di event loop
+        await asyncio.get_running_loop().run_in_executor(
+            None, insert_face_embedding, intern_id, person_name, instansi, full_path_str,
+            embedding_vector, image_bytes, file_path_on_disk,
+        )
         
         print(f"[DB] Sukses menyimpan data embedding untuk ID: {intern_id}")
+        # Penukaran indeks membangun ulang kelompok/prototipe/IVF: jalankan di thread, bukan di event loop
+        await asyncio.get_running_loop().run_in_executor(None, FACE_INDEX.add, person_name, instansi, embedding_vector)
+        # Snapshot galeri + versi ditulis ulang di background agar worker lain ikut memuat wajah baru
+        APP_STATE["gallery_refresh_task"] = asyncio.get_running_loop().create_task(sync_face_index_async())
+        prefetch_intern_audio(person_name)
 
     except Exception as e:
         # Jika database gagal, hapus juga file yang tadi disimpan
@@ -383,127 +807,258 @@ async def register_new_face(
 
 # --- ENDPOINTS ABSENSI (main.html) ---
 
-@app.post("/recognize")
-async def recognize_face(file: UploadFile = File(...)):
-    """Endpoint utama untuk deteksi wajah dan pencocokan cepat."""
-    start_time = time.time()
-    image_bytes = await file.read() 
-
+def match_and_record(new_embedding, image_bytes: bytes, face_box: dict, start_time: float) -> dict:
+    """
+    Mencocokkan satu embedding ke galeri lalu mencatat absensi jika dikenali.
+    Dipakai oleh /recognize dan mode streaming /ws/recognize; mengembalikan response dict.
+    """
     image_url_for_db = ""
-    
-    # 1. EKSTRAKSI VEKTOR WAJAH BARU
-    emb_list = extract_face_features(image_bytes) 
-    
-    if not emb_list:
-        generate_audio_file("S002.mp3", "Wajah tidak terdeteksi. Silakan coba lagi.")
-        return {"status": "error", "message": "Wajah tidak terdeteksi.", "track_id": "S002.mp3", "image_url": image_url_for_db}
-    
-    new_embedding = emb_list[0] 
 
-    # 2. PENCARIAN VEKTOR DI DATABASE VEKTOR
+    # 2. PENCARIAN VEKTOR DI INDEKS MEMORI (jarak kosinus, setara operator <=> pgvector)
     try:
-        conn = connect_vector_db()
-        cursor = conn.cursor()
-        
-        # Konversi array float Python menjadi string array PostgreSQL
-        vector_string = "[" + ",".join(map(str, new_embedding)) + "]"
-
-        # Menggunakan operator <=> (jarak kosinus) dari ekstensi pgvector
-        cursor.execute(f"""
-            SELECT name, instansi, embedding <=> '{vector_string}'::vector AS distance
-            FROM intern_embeddings
-            ORDER BY distance ASC
-            LIMIT 1
-        """)
-        
-        result = cursor.fetchone()
-        conn.close()
+        # Top-k identitas (best-of-N per intern) dalam satu pass, lalu keputusan ambang + margin ke runner-up
+        matches = FACE_INDEX.search_topk(new_embedding, MATCH_TOP_K) if len(FACE_INDEX) else search_vector_db(new_embedding)
+        decision = decide_match(matches, DISTANCE_THRESHOLD, MATCH_MARGIN)
 
-        if result:
-            name, instansi, distance = result
+        if decision:
+            name, instansi, distance = decision["name"], decision["instansi"], decision["distance"]
+            confidence = f"{decision['confidence']:.3f}"
             elapsed_time = time.time() - start_time
             
-            # 3. VERIFIKASI AMBANG BATAS AKURASI
-            if distance <= DISTANCE_THRESHOLD:
+            # 3. VERIFIKASI AMBANG BATAS AKURASI + MARGIN KE RUNNER-UP
+            if decision["accepted"]:
                 
-                # Check duplikasi absensi
-                if check_duplicate_attendance(name):
+                # Check duplikasi absensi: cek + tandai dalam satu langkah atomik (aman untuk banyak kiosk)
+                if not ATTENDANCE_TODAY.try_claim(name):
                     print(f"✅ DUPLIKAT ABSENSI: {name} | Latensi: {elapsed_time:.2f}s")
-                    audio_filename = f"duplicate_{name.replace(' ', '_')}.mp3"
-                    generate_audio_file(audio_filename, f"{name}, Anda sudah absen hari ini. Selamat bekerja.")
+                    audio_filename = TTS_ENGINE.announce(duplicate_text(name), AUDIO_TEXT_DUPLICATE_GENERIC)
                     
-                    return {"status": "duplicate", "name": name, "instansi": instansi, "distance": f"{distance:.4f}", "latency": f"{elapsed_time:.2f}s", "track_id": audio_filename, "image_url": image_url_for_db} 
+                    return {"status": "duplicate", "name": name, "instansi": instansi, "distance": f"{distance:.4f}", "confidence": confidence, "latency": f"{elapsed_time:.2f}s", "track_id": audio_filename, "image_url": image_url_for_db} 
                 
                 # --- LOGIKA PENYIMPANAN GAMBAR ABSENSI ---
                 timestamp = time.strftime("%Y%m%d_%H%M%S")
                 # Menggunakan nama yang sudah dibersihkan
                 clean_name = name.replace(' ', '_').replace('.', '').lower()
                 image_filename = f"{timestamp}_{clean_name}.jpg"
-                image_path = CAPTURED_IMAGES_DIR / image_filename
-                
-                with open(image_path, "wb") as f:
-                    f.write(image_bytes)
-                
                 image_url_for_db = f"/images/{image_filename}"
-                # --- END LOGIKA PENYIMPANAN GAMBAR ABSENSI ---
                 
-                # Absensi Berhasil: Catat ke DB
-                log_attendance(name, instansi, image_url_for_db) 
-                print(f"✅ DETEKSI BERHASIL: {name} | Jarak: {distance:.4f} | Latensi: {elapsed_time:.2f}s | Gambar disimpan: {image_filename}")
+                # Absensi Berhasil: snapshot + log diantrikan ke write-behind (tidak ditunggu)
+                log_attendance(name, instansi, image_url_for_db, image_bytes=image_bytes, image_filename=image_filename, face_box=face_box) 
+                # --- END LOGIKA PENYIMPANAN GAMBAR ABSENSI ---
+                print(f"✅ DETEKSI BERHASIL: {name} | Jarak: {distance:.4f} | Confidence: {confidence} | Latensi: {elapsed_time:.2f}s | Gambar diantrikan: {image_filename}")
                 
-                audio_filename = f"welcome_{clean_name}.mp3"
-                generate_audio_file(audio_filename, f"Selamat datang, {name}. Absensi berhasil dicatat.")
+                audio_filename = TTS_ENGINE.announce(welcome_text(name), AUDIO_TEXT_WELCOME_GENERIC)
                 
                 # Mengembalikan image_url dan jarak yang sudah diformat
-                return {"status": "success", "name": name, "instansi": instansi, "distance": f"{distance:.4f}", "latency": f"{elapsed_time:.2f}s", "track_id": audio_filename, "image_url": image_url_for_db}
+                return {"status": "success", "name": name, "instansi": instansi, "distance": f"{distance:.4f}", "confidence": confidence, "latency": f"{elapsed_time:.2f}s", "track_id": audio_filename, "image_url": image_url_for_db}
+            elif decision["reason"] == "ambiguous":
+                # ⚠️ Dekat dengan dua intern sekaligus: lebih baik minta ulang daripada salah mencatat absensi
+                print(f"⚠️ DETEKSI AMBIGU: {name} ({distance:.4f}) vs {decision['runner_up']} ({decision['runner_up_distance']:.4f}) "
+                      f"| Margin: {decision['margin']:.4f} < {MATCH_MARGIN} | Latensi: {elapsed_time:.2f}s")
+                return {"status": "ambiguous", "message": AUDIO_TEXT_AMBIGUOUS, "distance": f"{distance:.4f}", "confidence": confidence,
+                        "track_id": TTS_ENGINE.announce(AUDIO_TEXT_AMBIGUOUS), "image_url": image_url_for_db}
             else:
                 # ⚠️ Tidak Dikenali (Jarak Terlalu Jauh)
                 print(f"❌ DETEKSI GAGAL: Jarak Terlalu Jauh ({distance:.4f}) | Latensi: {elapsed_time:.2f}s")
-                generate_audio_file("S003.mp3", "Data wajah Anda belum terdaftar di sistem. Mohon hubungi admin.")
-                return {"status": "unrecognized", "message": "Data Wajah Anda Belum Terdaftar Di Sistem", "track_id": "S003.mp3", "image_url": image_url_for_db}
+                return {"status": "unrecognized", "message": "Data Wajah Anda Belum Terdaftar Di Sistem", "confidence": confidence, "track_id": TTS_ENGINE.announce(AUDIO_TEXT_UNREGISTERED), "image_url": image_url_for_db}
 
         else:
             # Database Vektor kosong
-            generate_audio_file("S003.mp3", "Data wajah Anda belum terdaftar di sistem. Mohon hubungi admin.")
-            return {"status": "error", "message": "Sistem kosong, lakukan indexing.", "track_id": "S003.mp3", "image_url": image_url_for_db}
+            return {"status": "error", "message": "Sistem kosong, lakukan indexing.", "track_id": TTS_ENGINE.announce(AUDIO_TEXT_UNREGISTERED), "image_url": image_url_for_db}
 
     except Exception as e:
         print(f"❌ ERROR PENCARIAN/ABSENSI: {e}")
         # Jika koneksi DB vektor gagal, akan ada pesan error yang lebih umum
-        generate_audio_file("S004.mp3", "Kesalahan server terjadi. Mohon hubungi admin.")
-        return {"status": "error", "message": f"Kesalahan server: {str(e)}", "track_id": "S004.mp3", "image_url": image_url_for_db}
+        return {"status": "error", "message": f"Kesalahan server: {str(e)}", "track_id": TTS_ENGINE.announce(AUDIO_TEXT_SERVER_ERROR), "image_url": image_url_for_db}
+
+async def match_and_record_async(new_embedding, image_bytes: bytes, face_box: dict, start_time: float) -> dict:
+    """
+    match_and_record di thread: pencarian (termasuk fallback pgvector), tulis original snapshot,
+    append journal, dan lookup cache TTS semuanya blocking dan tidak boleh berjalan di event loop.
+    """
+    return await asyncio.get_running_loop().run_in_executor(
+        None, match_and_record, new_embedding, image_bytes, face_box, start_time
+    )
+
+def parse_face_box(value: Optional[str]):
+    """'x,y,w,h' atau JSON {"x":..,"y":..,"w":..,"h":..} -> dict; None jika kosong/tidak valid."""
+    if not value:
+        return None
+    try:
+        if value.strip().startswith("{"):
+            box = json.loads(value)
+            return {key: int(box[key]) for key in ("x", "y", "w", "h")}
+        x, y, w, h = (int(float(part)) for part in value.split(","))
+        return {"x": x, "y": y, "w": w, "h": h}
+    except (ValueError, KeyError, TypeError):
+        print(f"⚠️ face_box dari klien diabaikan (format tidak valid): {value}")
+        return None
+
+def lookup_cached_embedding(image_bytes: bytes, client_box: dict, pre_cropped: bool) -> tuple:
+    """(cache_key, embedding atau None, region wajah atau None) untuk gambar ini dari EMBEDDING_CACHE."""
+    cache_key = embedding_cache_key(image_bytes, face_box=client_box, pre_cropped=pre_cropped)
+    cached, cached_box = EMBEDDING_CACHE.get(cache_key, len(image_bytes), with_box=True)
+    return cache_key, cached, cached_box
+
+@app.post("/recognize")
+async def recognize_face(
+    file: UploadFile = File(...),
+    face_box: Optional[str] = Form(None, description="Opsional: bounding box wajah 'x,y,w,h' dari klien (deteksi dilewati)."),
+    pre_cropped: bool = Form(False, description="True jika file sudah berupa crop wajah (deteksi dilewati).")
+):
+    """Endpoint utama untuk deteksi wajah dan pencocokan cepat."""
+    start_time = time.time()
+    image_bytes = await file.read() 
+
+    image_url_for_db = ""
+    client_box = parse_face_box(face_box)
+
+    # 0. CACHE EMBEDDING: byte gambar identik (mis. retry kiosk) tidak perlu deteksi + model lagi.
+    # Hash SHA-256 + lookup (bisa menyentuh memmap disk) dijalankan di thread, bukan di event loop.
+    cache_key, cached, cached_box = None, None, None
+    if EMBEDDING_CACHE:
+        cache_key, cached, cached_box = await asyncio.get_running_loop().run_in_executor(
+            None, lookup_cached_embedding, image_bytes, client_box, pre_cropped
+        )
+    if cached is not None:
+        # Region wajah hasil deteksi disimpan bersama embedding, jadi thumbnail tetap ter-crop ke wajah
+        return await match_and_record_async(cached, image_bytes, client_box or cached_box, start_time)
+    
+    # 1. EKSTRAKSI VEKTOR WAJAH BARU (deteksi di pool inferensi, embedding lewat micro-batcher)
+    try:
+        face_crops = await INFERENCE_POOL.run(
+            detect_and_align_faces, image_bytes, with_regions=True, face_box=client_box, pre_cropped=pre_cropped
+        )
+        face_box = face_crops[0][1] if face_crops else None
+        emb_list = [await EMBEDDING_BATCHER.submit(face_crops[0][0])] if face_crops else []
+        if emb_list and cache_key:
+            asyncio.get_running_loop().run_in_executor(None, EMBEDDING_CACHE.put, cache_key, emb_list[0], face_box)
+    except PoolBusyError as e:
+        return {"status": "busy", "message": str(e), "track_id": "", "image_url": image_url_for_db}
+    except FaceQualityError as e:
+        # Ditolak gerbang kualitas sebelum forward pass model: klien bisa langsung mengambil ulang
+        print(f"⚠️ Kualitas wajah ditolak ({e.reason}): {e.metrics}")
+        return {"status": "low_quality", "reason": e.reason, "message": str(e), "metrics": e.metrics,
+                "track_id": TTS_ENGINE.announce(str(e)), "image_url": image_url_for_db}
+    except Exception as e:
+        print(f"❌ ERROR Ekstraksi Fitur: {e}")
+        emb_list = []
+    
+    if not emb_list:
+        return {"status": "error", "message": "Wajah tidak terdeteksi.", "track_id": TTS_ENGINE.announce(AUDIO_TEXT_NO_FACE), "image_url": image_url_for_db}
+    
+    return await match_and_record_async(emb_list[0], image_bytes, face_box, start_time)
+
+@app.websocket("/ws/recognize") # Mode streaming main.html
+async def recognize_stream(websocket: WebSocket):
+    """
+    Absensi hands-free: klien mengirim frame JPEG resolusi rendah (pesan biner), server
+    membalas satu pesan JSON per frame sebelum klien mengirim frame berikutnya.
+    Wajah dideteksi & di-track setiap frame; embedding hanya dijalankan saat track baru
+    sudah stabil dan menghadap kamera, lalu identitasnya dipakai ulang sepanjang track.
+    """
+    await websocket.accept()
+    tracker = FaceTracker()
+    frames, embeddings = 0, 0
+    try:
+        while True:
+            frame_bytes = await websocket.receive_bytes()
+            frames += 1
+            start_time = time.time()
+            try:
+                detections = await INFERENCE_POOL.run(detect_faces_for_tracking, frame_bytes)
+            except PoolBusyError as e:
+                await websocket.send_json({"type": "busy", "frame": frames, "message": str(e)})
+                continue
+
+            visible = tracker.update(detections)
+            events = []
+            for track in tracker.tracks_to_embed():
+                try:
+                    embedding = await EMBEDDING_BATCHER.submit(track.detection["tensor"])
+                except PoolBusyError:
+                    break
+                embeddings += 1
+                result = await match_and_record_async(embedding, frame_bytes, track.box, start_time)
+                if tracker.record_result(track, result):
+                    events.append({**result, "track": track.track_id})
+
+            await websocket.send_json({
+                "type": "frame",
+                "frame": frames,
+                "tracks": [track.to_dict() for track in visible],
+                "events": events,
+                "stats": {"frames": frames, "embeddings": embeddings},
+            })
+    except WebSocketDisconnect:
+        pass
+    finally:
+        print(f"ℹ️ Stream absensi selesai: {frames} frame, {embeddings} embedding.")
 
 # --- ENDPOINTS DATA (data.html) ---
 
+def history_item(row) -> dict:
+    """Satu baris hasil fetch_page -> format item log yang dipakai data.html."""
+    log_id, name, instansi, time_str, _, image_url, _ = row
+    return {
+        "log_id": log_id,
+        "name": name,
+        "instansi": instansi,
+        "timestamp": time_str,
+        "image_path": image_url,
+        "thumbnail_url": thumbnail_url(image_url),
+        "archive_url": archive_url(image_url)
+    }
+
 @app.get("/attendance/today") # Digunakan oleh data.html
-async def get_today_attendance():
-    """Mendapatkan daftar log absensi lengkap hari ini (untuk data.html)."""
+async def get_today_attendance(response: Response, limit: Optional[int] = None, cursor: Optional[str] = None):
+    """
+    Mendapatkan daftar log absensi hari ini (untuk data.html).
+    Dengan ?limit=N hasilnya dipaginasi keyset; cursor halaman berikutnya ada di header X-Next-Cursor.
+    """
     today_date = date.today().strftime('%Y-%m-%d')
-    
+
+    if limit is not None:
+        try:
+            start_epoch, end_epoch = day_epoch_range(today_date)
+            conn = connect_sqlite_db()
+            try:
+                rows, next_cursor = fetch_page(conn, start_epoch, end_epoch, limit, cursor)
+            finally:
+                conn.close()
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        return [{**history_item(row), "distance": 0.0000} for row in rows]
+
     try:
         conn = connect_sqlite_db()
         cursor = conn.cursor()
         
         # Mengambil semua log absensi hari ini, diurutkan berdasarkan waktu terbaru
         cursor.execute("""
-            SELECT intern_name, instansi, absent_at, image_url
+            SELECT log_id, intern_name, instansi, absent_at, image_url
             FROM attendance_logs 
-            WHERE absent_at LIKE ?
-            ORDER BY absent_at DESC
-        """, (f"{today_date}%",))
+            WHERE log_date = ?
+            ORDER BY absent_epoch DESC, log_id DESC
+        """, (today_date,))
         
         results = cursor.fetchall()
         conn.close()
 
         attendance_list = []
-        for name, instansi, time_str, image_url in results: 
+        for log_id, name, instansi, time_str, image_url in results: 
             # Mengembalikan list yang sesuai dengan format yang diharapkan data.html
             attendance_list.append({
+                "log_id": log_id,
                 "name": name,
                 "instansi": instansi,
                 "timestamp": time_str,
                 "distance": 0.0000, # Placeholder (tidak disimpan di log DB)
-                "image_path": image_url 
+                "image_path": image_url,
+                "thumbnail_url": thumbnail_url(image_url),
+                "archive_url": archive_url(image_url)
             })
             
         return attendance_list # Return list directly
@@ -512,47 +1067,189 @@ async def get_today_attendance():
         print(f"❌ Error mengambil daftar absensi hari ini: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def load_feed_backfill(last_id: int, log_date: str) -> list:
+    """Event yang terlewat klien (log_id > last_id pada hari tsb), dibaca dari SQLite."""
+    conn = connect_sqlite_db()
+    try:
+        rows = conn.execute("""
+            SELECT log_id, intern_name, instansi, absent_at, log_date, image_url
+            FROM attendance_logs
+            WHERE log_id > ? AND log_date = ?
+            ORDER BY log_id ASC
+            LIMIT ?
+        """, (last_id, log_date, LIVE_FEED_BACKFILL_LIMIT)).fetchall()
+    finally:
+        conn.close()
+    return [feed_event(*row) for row in rows]
+
+def sse_message(event: dict) -> str:
+    return f"id: {event['id']}\nevent: attendance\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+@app.get("/api/attendance/stream") # Digunakan oleh data.html (EventSource)
+async def stream_attendance(request: Request, last_event_id: Optional[int] = None):
+    """
+    Server-Sent Events: push setiap log absensi baru begitu tersimpan.
+    Reconnect dengan header Last-Event-ID (otomatis oleh EventSource) atau ?last_event_id=
+    hanya menerima event yang terlewat; tanpa keduanya, hanya event baru yang dikirim.
+    """
+    header_id = request.headers.get("last-event-id")
+    if header_id and header_id.isdigit():
+        last_event_id = int(header_id)
+
+    # Subscribe dulu sebelum membaca backlog agar tidak ada event yang jatuh di antaranya
+    queue = ATTENDANCE_FEED.subscribe()
+
+    async def event_stream():
+        last_sent = last_event_id
+        try:
+            yield "retry: 3000\n\n"
+            if last_event_id is not None:
+                backlog = ATTENDANCE_FEED.since(last_event_id)
+                if backlog is None:
+                    backlog = await asyncio.get_running_loop().run_in_executor(
+                        None, load_feed_backfill, last_event_id, date.today().isoformat()
+                    )
+                for event in backlog:
+                    yield sse_message(event)
+                    last_sent = event["id"]
+
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=LIVE_FEED_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": heartbeat\n\n"
+                    continue
+                if event is None:
+                    # Klien terlalu lambat dan diputus oleh feed; EventSource akan reconnect
+                    return
+                if last_sent is not None and event["id"] <= last_sent:
+                    continue
+                yield sse_message(event)
+                last_sent = event["id"]
+        finally:
+            ATTENDANCE_FEED.unsubscribe(queue)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.get("/api/inference-stats")
+async def get_inference_stats():
+    """Mengembalikan kedalaman antrian dan waktu tunggu pool inferensi (untuk sizing server kiosk)."""
+    return {**INFERENCE_POOL.stats(), "batching": EMBEDDING_BATCHER.stats(), "face_index": FACE_INDEX.stats(),
+            "embedding_cache": EMBEDDING_CACHE.stats() if EMBEDDING_CACHE else None}
+
+@app.get("/api/db-pool-stats")
+async def get_db_pool_stats():
+    """Mengembalikan statistik waktu checkout koneksi dari pool PostgreSQL dan SQLite."""
+    return {"postgres": VECTOR_DB_POOL.stats.snapshot(), "sqlite": SQLITE_POOL.stats.snapshot(), "write_behind": WRITE_BEHIND.stats(), "live_feed": ATTENDANCE_FEED.stats()}
+
+@app.get("/api/image-store-stats")
+async def get_image_store_stats():
+    """Mengembalikan penggunaan disk per tier penyimpanan gambar absensi."""
+    return await asyncio.get_running_loop().run_in_executor(None, IMAGE_STORE.stats)
+
 # --- ENDPOINTS PENGATURAN (settings.html) ---
 
+# Hanya satu reload yang berjalan pada satu waktu; /recognize tetap memakai indeks lama selama rebuild
+RELOAD_LOCK = asyncio.Lock()
+
+def person_info_from_sqlite(folder_name: str):
+    """Mencari data intern (SQLite) untuk folder di FACES_DIR. Folder memakai '_' sebagai pengganti spasi."""
+    conn = connect_sqlite_db()
+    cursor = conn.cursor()
+    for candidate in (folder_name, folder_name.replace('_', ' ')):
+        cursor.execute("SELECT id, name, instansi FROM interns WHERE name = ?", (candidate,))
+        row = cursor.fetchone()
+        if row:
+            conn.close()
+            return {"intern_id": row[0], "name": row[1], "instansi": row[2], "kategori": None}
+    conn.close()
+    return {"intern_id": None, "name": folder_name.replace('_', ' '), "instansi": None, "kategori": None}
+
+def rebuild_face_index():
+    """
+    Memindai ulang FACES_DIR, meng-embed hanya delta-nya ke intern_embeddings,
+    lalu membangun indeks baru dan menukarnya secara atomik.
+    Dijalankan di thread terpisah (blocking: DB + model).
+    """
+    start = time.perf_counter()
+    conn = connect_vector_db()
+    try:
+        # workers=1: memakai model yang sudah di-warm-up di proses ini
+        stats = sync_directory(conn, FACES_DIR, person_info_from_sqlite, workers=1)
+        # Versi diambil sebelum memuat: baris yang masuk di antaranya membuat snapshot dianggap basi, bukan hilang
+        version = gallery_version(conn.cursor(), embedding_metadata())
+        total_vectors = FACE_INDEX.load_from_db(conn, metadata=embedding_metadata())
+    finally:
+        conn.close()
+    save_gallery_snapshot(version)
+    stats.update({
+        "total_vectors": total_vectors,
+        "generation": FACE_INDEX.generation,
+        "build_seconds": round(time.perf_counter() - start, 2),
+    })
+    return stats
+
 @app.post("/reload_db") # Digunakan oleh settings.html
 async def reload_db():
-    """Mensimulasikan operasi indexing/reload database wajah."""
+    """Sinkronisasi FACES_DIR ke database vektor (inkremental) dan hot-swap indeks wajah di memori."""
     try:
-        # ASUMSI: Proses indexing (memindai FACES_DIR, menghitung vektor, dan
-        # menyimpannya ke intern_embeddings) dilakukan di sini.
-        
-        conn = connect_vector_db()
-        cursor = conn.cursor()
-        cursor.execute("SELECT COUNT(DISTINCT name) FROM intern_embeddings")
-        total_unique_faces = cursor.fetchone()[0]
-        conn.close()
+        async with RELOAD_LOCK:
+            stats = await asyncio.get_running_loop().run_in_executor(None, rebuild_face_index)
 
-        print(f"✅ RELOAD SIMULASI BERHASIL. Total {total_unique_faces} wajah unik terindeks.")
+        print(f"✅ RELOAD BERHASIL: +{stats['added']} / -{stats['removed']} vektor | "
+              f"Generasi indeks: {stats['generation']} | Durasi: {stats['build_seconds']}s")
 
-        return {"status": "success", "message": "Database wajah berhasil dimuat ulang/disinkronisasi (Simulasi)", "total_faces": total_unique_faces}
+        return {
+            "status": "success",
+            "message": "Database wajah berhasil dimuat ulang/disinkronisasi.",
+            "vectors_added": stats["added"],
+            "vectors_removed": stats["removed"],
+            "vectors_replaced": stats["replaced"],
+            "total_vectors": stats["total_vectors"],
+            "build_seconds": stats["build_seconds"],
+            "generation": stats["generation"],
+        }
 
     except Exception as e:
-        print(f"❌ Error saat simulasi reload database: {e}")
+        print(f"❌ Error saat reload database: {e}")
         raise HTTPException(status_code=500, detail=f"Gagal reload database: {e}")
 
-@app.get("/list_faces") # Digunakan oleh settings.html
-async def list_registered_faces():
-    """Mendapatkan daftar wajah yang terdaftar di database vektor."""
+def fetch_registered_faces():
+    """Nama unik dan jumlah vektor per nama di database vektor (blocking, panggil dari executor)."""
+    conn = connect_vector_db()
     try:
-        conn = connect_vector_db()
         cursor = conn.cursor()
-        
-        # Mengambil nama unik dan jumlah foto yang diwakilinya
         cursor.execute("""
             SELECT name, COUNT(*) 
             FROM intern_embeddings
             GROUP BY name
             ORDER BY name ASC
         """)
-        
-        results = cursor.fetchall()
+        return cursor.fetchall()
+    finally:
         conn.close()
 
+def delete_face_embeddings(name: str) -> list:
+    """Menghapus semua vektor milik `name`; mengembalikan image_path-nya (blocking, panggil dari executor)."""
+    conn = connect_vector_db()
+    try:
+        cursor = conn.cursor()
+        # image_path dipakai untuk menemukan folder gambarnya
+        cursor.execute("DELETE FROM intern_embeddings WHERE name = %s RETURNING image_path", (name,))
+        image_paths = [row[0] for row in cursor.fetchall() if row[0]]
+        conn.commit()
+        return image_paths
+    finally:
+        conn.close()
+
+@app.get("/list_faces") # Digunakan oleh settings.html
+async def list_registered_faces():
+    """Mendapatkan daftar wajah yang terdaftar di database vektor."""
+    try:
+        # Checkout pool bisa menunggu: jalankan query di thread, bukan di event loop
+        results = await asyncio.get_running_loop().run_in_executor(None, fetch_registered_faces)
+
         # Jumlah foto di sini adalah jumlah vektor yang terindeks untuk nama tersebut
         faces_list = [{"name": name, "count": count} for name, count in results]
             
@@ -566,28 +1263,29 @@ async def list_registered_faces():
 async def delete_face(name: str):
     """Menghapus data wajah dari database vektor dan file dari disk."""
     try:
-        conn = connect_vector_db()
-        cursor = conn.cursor()
-        
-        # 1. Hapus dari Database Vektor
-        cursor.execute("DELETE FROM intern_embeddings WHERE name = %s", (name,))
-        deleted_count = cursor.rowcount
-        conn.commit()
-        conn.close()
-
-        # 2. Hapus file gambar dari folder FACES_DIR
-        file_deleted = delete_face_files(name) 
+        # 1. Hapus dari Database Vektor (di thread: checkout pool bisa menunggu)
+        image_paths = await asyncio.get_running_loop().run_in_executor(None, delete_face_embeddings, name)
+        deleted_count = len(image_paths)
+        await asyncio.get_running_loop().run_in_executor(None, FACE_INDEX.remove_name, name)
+
+        # 2. Hapus file gambar dari folder FACES_DIR (nama asli & nama folder register-face)
+        file_deleted, remaining = await asyncio.get_running_loop().run_in_executor(None, delete_face_files, name, image_paths)
+        if remaining:
+            # Reload akan meng-embed ulang folder yang tersisa dan intern dikenali lagi: jangan sinkronkan
+            raise HTTPException(status_code=500, detail=f"Folder gambar wajah gagal dihapus: {', '.join(remaining)}")
         
         if deleted_count > 0 or file_deleted:
             print(f"✅ Hapus Wajah Berhasil: {name}. Vektor dihapus: {deleted_count}. File dihapus: {file_deleted}")
             
-            # Memanggil reload DB (simulasi) setelah penghapusan penting agar sistem segera sinkron
+            # Memanggil reload DB setelah penghapusan penting agar sistem segera sinkron
             await reload_db() 
             
             return {"status": "success", "message": f"Data wajah '{name}' berhasil dihapus. Vektor: {deleted_count} dihapus."}
         else:
             return {"status": "error", "message": f"Data wajah '{name}' tidak ditemukan di database atau folder file."}
 
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"❌ Error menghapus data wajah: {e}")
         raise HTTPException(status_code=500, detail=f"Gagal menghapus data wajah: {e}")
@@ -602,13 +1300,14 @@ async def get_system_start_date():
         conn = connect_sqlite_db()
         cursor = conn.cursor()
         
-        cursor.execute("SELECT absent_at FROM attendance_logs ORDER BY absent_at ASC LIMIT 1")
+        # MIN(log_date) dijawab langsung dari primary key tabel rollup harian
+        cursor.execute("SELECT MIN(log_date) FROM attendance_daily_rollup")
         result = cursor.fetchone()
         conn.close()
         
         start_date = "N/A"
-        if result:
-            start_date = result[0].split(' ')[0]
+        if result and result[0]:
+            start_date = result[0]
             
         current_date_str = date.today().isoformat()
             
@@ -636,10 +1335,12 @@ async def get_attendance_dates_with_range():
 
         conn = connect_sqlite_db()
         cursor = conn.cursor()
+        # Satu baris per hari dari rollup harian (bukan scan seluruh log)
         cursor.execute("""
-            SELECT DISTINCT SUBSTR(absent_at, 1, 10) 
-            FROM attendance_logs
-        """)
+            SELECT log_date 
+            FROM attendance_daily_rollup
+            WHERE log_date >= ? AND total_checkins > 0
+        """, (start_date_str,))
         dates_with_logs = {row[0] for row in cursor.fetchall()}
         conn.close()
 
@@ -663,11 +1364,42 @@ async def get_attendance_dates_with_range():
 
 
 @app.get("/api/attendance-by-date/{date}")
-async def get_attendance_by_date(date: str):
-    """Mendapatkan log absensi unik berdasarkan tanggal tertentu."""
+async def get_attendance_by_date(date: str, limit: Optional[int] = None, cursor: Optional[str] = None):
+    """
+    Mendapatkan log absensi unik berdasarkan tanggal tertentu.
+    Dengan ?limit=N hasil yang sama (per intern) dipaginasi keyset (terbaru dulu) dan respons berisi next_cursor.
+    """
     if not date:
         raise HTTPException(status_code=400, detail="Parameter tanggal (date) diperlukan.")
-    
+
+    if limit is not None:
+        try:
+            day_epoch_range(date)  # Validasi format tanggal (ValueError -> 400)
+            conn = connect_sqlite_db()
+            try:
+                rows, next_cursor = fetch_grouped_page(conn, date, limit, cursor)
+                total = conn.execute(
+                    "SELECT unique_attendees FROM attendance_daily_rollup WHERE log_date = ?", (date,)
+                ).fetchone()
+            finally:
+                conn.close()
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        # Bentuk item sama dengan mode tanpa paginasi (satu entri per kelompok intern)
+        attendees = [
+            {
+                "name": name,
+                "instansi": instansi,
+                "recognition_time": time_str,
+                "status": "Hadir",
+                "photo": image_url,
+                "thumbnail": thumbnail_url(image_url),
+                "archive": archive_url(image_url)
+            }
+            for name, instansi, time_str, image_url, _, _ in rows
+        ]
+        return {"date": date, "attendees": attendees, "total_unique": total[0] if total else 0, "next_cursor": next_cursor}
+
     try:
         conn = connect_sqlite_db()
         cursor = conn.cursor()
@@ -675,10 +1407,10 @@ async def get_attendance_by_date(date: str):
         cursor.execute("""
             SELECT T1.intern_name, T1.instansi, MAX(T1.absent_at), T1.image_url
             FROM attendance_logs T1
-            WHERE T1.absent_at LIKE ?
+            WHERE T1.log_date = ?
             GROUP BY T1.intern_name, T1.instansi, T1.image_url
             ORDER BY MAX(T1.absent_at) DESC
-        """, (f"{date}%",))
+        """, (date,))
         
         results = cursor.fetchall()
         conn.close()
@@ -690,7 +1422,9 @@ async def get_attendance_by_date(date: str):
                 "instansi": instansi,
                 "recognition_time": time_str,
                 "status": "Hadir",
-                "photo": image_url # Kunci disesuaikan dengan frontend
+                "photo": image_url, # Kunci disesuaikan dengan frontend
+                "thumbnail": thumbnail_url(image_url),
+                "archive": archive_url(image_url)
             })
             
         return {"date": date, "attendees": attendance_list, "total_unique": len(attendance_list)}
@@ -701,6 +1435,37 @@ async def get_attendance_by_date(date: str):
         print(f"❌ Error mengambil log absensi per tanggal: {e}")
         return {"date": date, "attendees": [], "total_unique": 0, "error": str(e)}
 
+@app.get("/api/attendance/history")
+async def get_attendance_history(start: str, end: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None):
+    """Riwayat log absensi untuk rentang tanggal (inklusif), dipaginasi keyset: {items, next_cursor}."""
+    try:
+        start_epoch, end_epoch = day_epoch_range(start, end)
+        conn = connect_sqlite_db()
+        try:
+            rows, next_cursor = fetch_page(conn, start_epoch, end_epoch, limit, cursor)
+        finally:
+            conn.close()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"items": [history_item(row) for row in rows], "next_cursor": next_cursor}
+
+@app.get("/api/attendance/export")
+async def export_attendance(start: str, end: Optional[str] = None, format: str = "ndjson"):
+    """Ekspor log absensi rentang tanggal sebagai NDJSON atau CSV, di-stream dengan memori konstan."""
+    try:
+        start_epoch, end_epoch = day_epoch_range(start, end)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    rows = iter_rows(connect_sqlite_db, start_epoch, end_epoch)
+    filename = f"absensi_{start}_{end or start}"
+    if format == "csv":
+        return StreamingResponse(stream_csv(rows), media_type="text/csv",
+                                 headers={"Content-Disposition": f'attachment; filename="{filename}.csv"'})
+    if format == "ndjson":
+        return StreamingResponse(stream_ndjson(rows), media_type="application/x-ndjson",
+                                 headers={"Content-Disposition": f'attachment; filename="{filename}.ndjson"'})
+    raise HTTPException(status_code=400, detail="Format ekspor harus 'ndjson' atau 'csv'.")
+
 @app.get("/api/monthly-attendance/{year}/{month}")
 async def get_monthly_attendance(year: int, month: int):
     """Mendapatkan statistik dan detail absensi bulanan."""
@@ -708,32 +1473,29 @@ async def get_monthly_attendance(year: int, month: int):
         conn = connect_sqlite_db()
         cursor = conn.cursor()
         
-        search_pattern = f"{year}-{str(month).zfill(2)}%"
+        month_start, month_end = month_range(year, month)
         
-        # 1. Total Attendance and Unique Days
+        # 1. Total Attendance and Unique Days (satu baris dari rollup bulanan)
         cursor.execute("""
-            SELECT 
-                COUNT(*), 
-                COUNT(DISTINCT SUBSTR(absent_at, 1, 10))
-            FROM attendance_logs 
-            WHERE absent_at LIKE ?
-        """, (search_pattern,))
+            SELECT total_checkins, unique_days
+            FROM attendance_monthly_rollup 
+            WHERE month = ?
+        """, (month_start[:7],))
         
-        total_attendance, unique_days = cursor.fetchone()
+        total_attendance, unique_days = cursor.fetchone() or (0, 0)
         
         avg_daily_attendance = round(total_attendance / unique_days, 2) if unique_days > 0 else 0
         
-        # 2. Daily Stats (for Weekly Modal): Get unique attendance for each day
+        # 2. Daily Stats (for Weekly Modal): peserta unik per hari dari rollup harian
         cursor.execute("""
             SELECT 
-                SUBSTR(absent_at, 1, 10) AS log_date, 
+                log_date, 
                 intern_name, 
                 instansi
-            FROM attendance_logs 
-            WHERE absent_at LIKE ?
-            GROUP BY log_date, intern_name
+            FROM attendance_daily_attendees 
+            WHERE log_date >= ? AND log_date < ?
             ORDER BY log_date ASC
-        """, (search_pattern,))
+        """, (month_start, month_end))
         
         daily_log_results = cursor.fetchall()
         
@@ -0,0 +1,64 @@
+# backend/match_decision.py
+import os
+
+# --- KEPUTUSAN PENCOCOKAN: AMBANG ABSOLUT + MARGIN KE RUNNER-UP ---
+# Membandingkan jarak terbaik dengan DISTANCE_THRESHOLD saja membuat intern yang mirip
+# (kembar, saudara, pose serupa) bisa saling tertukar. Keputusan di sini memakai top-k
+# identitas dari FaceIndex.search_topk: identitas terbaik diterima hanya jika
+#   1. jaraknya <= threshold, DAN
+#   2. identitas kedua (runner-up) setidaknya `margin` lebih jauh.
+# Confidence (0..1) = rata-rata geometrik skor ambang & skor margin, sehingga kedua syarat ikut menentukan.
+
+MATCH_MARGIN = float(os.environ.get("MATCH_MARGIN", "0.05"))
+MATCH_TOP_K = int(os.environ.get("MATCH_TOP_K", "3"))
+
+
+def _clip(value: float) -> float:
+    return min(1.0, max(0.0, value))
+
+
+def match_confidence(distance: float, runner_up_distance, threshold: float, margin: float = MATCH_MARGIN) -> float:
+    """
+    Skor ambang: 1 pada jarak 0, 0 pada threshold. Skor margin: 0.5 tepat pada `margin`,
+    1 pada 2x margin atau jika tidak ada runner-up.
+    """
+    threshold_score = _clip((threshold - distance) / threshold) if threshold > 0 else 0.0
+    if runner_up_distance is None or margin <= 0:
+        margin_score = 1.0
+    else:
+        margin_score = _clip((runner_up_distance - distance) / (2 * margin))
+    return (threshold_score * margin_score) ** 0.5
+
+
+def decide_match(matches, threshold: float, margin: float = MATCH_MARGIN) -> dict:
+    """
+    Args:
+        matches: list (name, instansi, distance) per identitas, terurut dari yang terdekat.
+
+    Returns:
+        dict dengan accepted, reason ('match' | 'too_far' | 'ambiguous'), name, instansi, distance,
+        runner_up, runner_up_distance, margin, confidence. None jika matches kosong.
+    """
+    if not matches:
+        return None
+    name, instansi, distance = matches[0]
+    runner_up, _, runner_up_distance = matches[1] if len(matches) > 1 else (None, None, None)
+    gap = runner_up_distance - distance if runner_up_distance is not None else None
+
+    if distance > threshold:
+        reason = "too_far"
+    elif gap is not None and gap < margin:
+        reason = "ambiguous"
+    else:
+        reason = "match"
+    return {
+        "accepted": reason == "match",
+        "reason": reason,
+        "name": name,
+        "instansi": instansi,
+        "distance": distance,
+        "runner_up": runner_up,
+        "runner_up_distance": runner_up_distance,
+        "margin": gap,
+        "confidence": match_confidence(distance, runner_up_distance, threshold, margin),
+    }
@@ -0,0 +1,138 @@
+import os
+import sys
+import argparse
+from pathlib import Path
+from psycopg2.extras import execute_batch
+
+# --- MIGRASI EMBEDDING KE MODEL AKTIF ---
+# Jalankan dari root proyek setelah mengganti model di backend/model_registry.py
+# (atau environment variable FACE_MODEL):
+#     python backend/migrate_embeddings.py            # hanya vektor yang tidak kompatibel
+#     python backend/migrate_embeddings.py --all      # paksa re-embedding semua vektor
+#     python backend/migrate_embeddings.py --dry-run  # hanya laporan, tanpa perubahan
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from backend.model_registry import embedding_metadata
+from backend.train import (connect_vector_db, create_vector_index, drop_vector_index, add_missing_columns,
+                           embed_images_parallel, DB_TABLE_EMBEDDINGS)
+from backend.vector_codec import Vector
+
+UPDATE_BATCH_SIZE = 100
+
+
+def ensure_metadata_columns(conn):
+    """Menambahkan kolom metadata model ke tabel lama (skema train.py atau register-face versi lama)."""
+    cur = conn.cursor()
+    add_missing_columns(cur)
+
+    # Skema register-face lama memakai kolom file_path; salin ke image_path
+    cur.execute(
+        "SELECT 1 FROM information_schema.columns WHERE table_name = %s AND column_name = 'file_path'",
+        (DB_TABLE_EMBEDDINGS,)
+    )
+    if cur.fetchone():
+        cur.execute(f"UPDATE {DB_TABLE_EMBEDDINGS} SET image_path = file_path WHERE image_path IS NULL;")
+    conn.commit()
+
+
+def current_vector_dim(conn):
+    """Membaca dimensi kolom embedding (atttypmod pgvector = dimensi, -1 jika tanpa dimensi)."""
+    cur = conn.cursor()
+    cur.execute(
+        "SELECT atttypmod FROM pg_attribute WHERE attrelid = %s::regclass AND attname = 'embedding'",
+        (DB_TABLE_EMBEDDINGS,)
+    )
+    row = cur.fetchone()
+    return row[0] if row else -1
+
+
+def migrate(reembed_all: bool = False, dry_run: bool = False):
+    conn = connect_vector_db()
+    ensure_metadata_columns(conn)
+    cur = conn.cursor()
+
+    model_name, embedding_dim, normalization = embedding_metadata()
+    if reembed_all:
+        cur.execute(f"SELECT id, image_path FROM {DB_TABLE_EMBEDDINGS} ORDER BY id")
+    else:
+        cur.execute(
+            f"SELECT id, image_path FROM {DB_TABLE_EMBEDDINGS} "
+            "WHERE (model_name, embedding_dim, normalization) IS DISTINCT FROM (%s, %s, %s) ORDER BY id",
+            (model_name, embedding_dim, normalization)
+        )
+    rows = cur.fetchall()
+    print(f"🔁 {len(rows)} vektor perlu di-embed ulang ke {model_name} ({embedding_dim}d, {normalization}).")
+    if dry_run or not rows:
+        conn.close()
+        return
+
+    # Jika dimensi berubah, lepas sementara batas dimensi kolom agar vektor lama & baru bisa berdampingan
+    # Indeks ANN terikat pada dimensi kolom, jadi dilepas dulu dan dibangun ulang setelah migrasi
+    old_dim = current_vector_dim(conn)
+    if old_dim != embedding_dim:
+        drop_vector_index(conn)
+        cur.execute(f"ALTER TABLE {DB_TABLE_EMBEDDINGS} ALTER COLUMN embedding TYPE vector;")
+        conn.commit()
+
+    # Pipeline yang sama dengan train.py & /recognize (deteksi + align + gerbang kualitas + batch embedding),
+    # sehingga gambar tanpa wajah tidak lagi di-embed sebagai frame penuh
+    missing = [row_id for row_id, image_path in rows if not image_path or not os.path.exists(image_path)]
+    existing = [(row_id, image_path) for row_id, image_path in rows if image_path and os.path.exists(image_path)]
+    embeddings, elapsed = embed_images_parallel(sorted({image_path for _, image_path in existing}))
+    print(f"   -> Embedding selesai dalam {elapsed:.1f}s.")
+
+    updates, failed = [], []
+    for row_id, image_path in existing:
+        vector = embeddings.get(image_path)
+        if vector is None:
+            print(f"   ❌ Wajah tidak terdeteksi/ditolak, id={row_id} ({image_path})")
+            failed.append(row_id)
+            continue
+        updates.append((Vector(vector), model_name, embedding_dim, normalization, row_id))
+        if len(updates) >= UPDATE_BATCH_SIZE:
+            flush_updates(conn, updates)
+            updates = []
+    flush_updates(conn, updates)
+
+    # Vektor lama yang tidak bisa di-embed ulang dihapus agar tidak pernah dibandingkan lintas model
+    stale_ids = missing + failed
+    if stale_ids:
+        cur.execute(f"DELETE FROM {DB_TABLE_EMBEDDINGS} WHERE id = ANY(%s)", (stale_ids,))
+        conn.commit()
+
+    if old_dim != embedding_dim:
+        cur.execute(f"ALTER TABLE {DB_TABLE_EMBEDDINGS} ALTER COLUMN embedding TYPE vector({embedding_dim});")
+        conn.commit()
+        create_vector_index(conn)
+
+    conn.close()
+    print("\n" + "=" * 50)
+    print(f"🎉 MIGRASI SELESAI: {len(rows) - len(stale_ids)} vektor di-embed ulang.")
+    if missing:
+        print(f"⚠️ {len(missing)} vektor dihapus karena file gambar tidak ditemukan.")
+    if failed:
+        print(f"⚠️ {len(failed)} vektor dihapus karena wajah tidak terdeteksi/ditolak saat re-embedding.")
+    print("=" * 50)
+
+
+def flush_updates(conn, updates):
+    if not updates:
+        return
+    cur = conn.cursor()
+    execute_batch(
+        cur,
+        f"UPDATE {DB_TABLE_EMBEDDINGS} SET embedding = %s, model_name = %s, embedding_dim = %s, normalization = %s WHERE id = %s",
+        updates
+    )
+    conn.commit()
+    print(f"   -> {len(updates)} vektor diperbarui.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-embedding intern_embeddings ke model aktif.")
+    parser.add_argument("--all", action="store_true", help="Re-embed semua vektor, bukan hanya yang tidak kompatibel.")
+    parser.add_argument("--dry-run", action="store_true", help="Hanya tampilkan jumlah vektor yang perlu dimigrasi.")
+    args = parser.parse_args()
+    migrate(reembed_all=args.all, dry_run=args.dry_run)
@@ -0,0 +1,55 @@
+# backend/model_registry.py
+import os
+import numpy as np
+
+# --- REGISTRY MODEL EMBEDDING ---
+# Satu sumber kebenaran untuk model yang dipakai /api/register-face, train.py,
+# dan /recognize. Setiap vektor yang disimpan mencatat model_name, embedding_dim,
+# dan normalization agar vektor dari model berbeda tidak pernah dibandingkan.
+
+MODEL_SPECS = {
+    "ArcFace": {"model_name": "ArcFace", "embedding_dim": 512, "normalization": "l2", "detector_backend": "opencv"},
+    "Facenet512": {"model_name": "Facenet512", "embedding_dim": 512, "normalization": "l2", "detector_backend": "opencv"},
+    "Facenet": {"model_name": "Facenet", "embedding_dim": 128, "normalization": "l2", "detector_backend": "opencv"},
+    "VGG-Face": {"model_name": "VGG-Face", "embedding_dim": 4096, "normalization": "l2", "detector_backend": "opencv"},
+}
+
+# Model aktif dapat diganti lewat environment variable FACE_MODEL (default: ArcFace)
+ACTIVE_MODEL_NAME = os.environ.get("FACE_MODEL", "ArcFace")
+
+
+class ModelMismatchError(Exception):
+    """Dilempar ketika vektor dari model/dimensi/normalisasi berbeda akan dibandingkan."""
+    pass
+
+
+def get_model_spec(model_name: str = None) -> dict:
+    """Mengembalikan spesifikasi model (default: model aktif)."""
+    model_name = model_name or ACTIVE_MODEL_NAME
+    if model_name not in MODEL_SPECS:
+        raise ValueError(f"Model '{model_name}' tidak terdaftar di MODEL_SPECS.")
+    return MODEL_SPECS[model_name]
+
+
+ACTIVE_MODEL = get_model_spec(ACTIVE_MODEL_NAME)
+
+
+def normalize_embedding(embedding, spec: dict = None) -> list:
+    """Menerapkan normalisasi sesuai spesifikasi model sebelum vektor disimpan/dicari."""
+    spec = spec or ACTIVE_MODEL
+    vector = np.asarray(embedding, dtype=np.float32)
+    if vector.shape[-1] != spec["embedding_dim"]:
+        raise ModelMismatchError(
+            f"Dimensi embedding {vector.shape[-1]} tidak sesuai dengan {spec['model_name']} ({spec['embedding_dim']})."
+        )
+    if spec["normalization"] == "l2":
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector = vector / norm
+    return vector.tolist()
+
+
+def embedding_metadata(spec: dict = None) -> tuple:
+    """Tuple (model_name, embedding_dim, normalization) untuk disimpan bersama setiap vektor."""
+    spec = spec or ACTIVE_MODEL
+    return spec["model_name"], spec["embedding_dim"], spec["normalization"]
@@ -0,0 +1,71 @@
+# backend/prototypes.py
+import numpy as np
+
+# --- GALERI PROTOTIPE PER IDENTITAS ---
+# Setiap intern punya 15+ embedding dari folder faces/<nama>. Mode kompaksi meringkasnya
+# menjadi beberapa prototipe: satu centroid (rata-rata ternormalisasi) + k medoid
+# (embedding asli yang mewakili variasi pose/pencahayaan). Pencarian dilakukan ke prototipe
+# dulu; galeri penuh hanya dipindai jika hasilnya dekat dengan ambang keputusan.
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def k_medoids(vectors: np.ndarray, k: int, iterations: int = 10) -> np.ndarray:
+    """
+    K-medoids (jarak kosinus) untuk vektor yang sudah dinormalisasi L2.
+    Inisialisasi deterministik farthest-first, lalu iterasi assign/update sampai stabil.
+    Mengembalikan indeks baris medoid.
+    """
+    n = vectors.shape[0]
+    if n <= k:
+        return np.arange(n)
+    distances = 1.0 - vectors @ vectors.T
+
+    # Medoid awal: titik paling sentral, lalu titik terjauh dari medoid yang sudah dipilih
+    medoids = [int(np.argmin(distances.sum(axis=1)))]
+    while len(medoids) < k:
+        medoids.append(int(np.argmax(distances[:, medoids].min(axis=1))))
+    medoids = np.array(medoids)
+
+    for _ in range(iterations):
+        assignment = np.argmin(distances[:, medoids], axis=1)
+        updated = medoids.copy()
+        for cluster in range(k):
+            members = np.flatnonzero(assignment == cluster)
+            if members.size:
+                updated[cluster] = members[np.argmin(distances[np.ix_(members, members)].sum(axis=1))]
+        if np.array_equal(updated, medoids):
+            break
+        medoids = updated
+    return medoids
+
+
+def build_prototypes(matrix: np.ndarray, names: np.ndarray, instansi: np.ndarray, medoids: int = 2) -> tuple:
+    """
+    Membangun galeri prototipe dari galeri penuh (matrix sudah dinormalisasi L2).
+
+    Returns:
+        tuple (proto_matrix, proto_names, proto_instansi): per identitas 1 centroid + `medoids` medoid.
+    """
+    proto_vectors, proto_names, proto_instansi = [], [], []
+    for name in dict.fromkeys(names.tolist()):
+        rows = np.flatnonzero(names == name)
+        vectors = matrix[rows]
+        prototypes = [_normalize(vectors.mean(axis=0, keepdims=True))[0]]
+        if medoids > 0 and len(rows) > 1:
+            prototypes.extend(vectors[k_medoids(vectors, medoids)])
+        proto_vectors.extend(prototypes)
+        proto_names.extend([name] * len(prototypes))
+        proto_instansi.extend([instansi[rows[0]]] * len(prototypes))
+
+    if not proto_vectors:
+        return np.empty((0, matrix.shape[1]), dtype=np.float32), np.empty(0, dtype=object), np.empty(0, dtype=object)
+    return (
+        np.asarray(proto_vectors, dtype=np.float32),
+        np.array(proto_names, dtype=object),
+        np.array(proto_instansi, dtype=object),
+    )
@@ -1,9 +1,13 @@
 import os
+import re
 import csv 
 import sys
+import time
+import hashlib
+import argparse
 import psycopg2
 from pathlib import Path
-from deepface import DeepFace
+from concurrent.futures import ProcessPoolExecutor, as_completed
 # from datetime import date # Tidak digunakan, dapat dihapus
 
 # Pastikan DeepFace sudah terinstal: pip install deepface
@@ -14,12 +18,18 @@ from deepface import DeepFace
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
 sys.path.insert(0, str(PROJECT_ROOT))
 
+from backend.model_registry import ACTIVE_MODEL, normalize_embedding, embedding_metadata
+from backend.vector_codec import copy_rows_binary
+from backend.embedding_cache import shared_cache, cache_key
+from backend.face_index import FaceIndex
+from backend.gallery_snapshot import snapshot_path, gallery_version, write_snapshot
+
 # Path ke file CSV Master di root proyek
 CSV_MASTER_PATH = PROJECT_ROOT / "interns.csv" 
 # Path ke folder dataset Anda (ASUMSI STRUKTUR: data/dataset/<Nama Intern>/<Gambar>.jpg)
 DATASET_PATH = PROJECT_ROOT / "data" / "dataset"
-# Model yang digunakan (Misalnya: ArcFace, VGG-Face, dll.)
-MODEL = "ArcFace" 
+# Model yang digunakan diambil dari registry bersama (sama dengan /recognize dan /api/register-face)
+MODEL = ACTIVE_MODEL["model_name"]
 
 # --- KONFIGURASI DATABASE VEKTOR (PostgreSQL + pgvector) ---
 DB_HOST = "localhost"
@@ -27,35 +37,175 @@ DB_NAME = "vector_db"
 DB_USER = "admin"
 DB_PASSWORD = "deepfacepass" 
 DB_TABLE_EMBEDDINGS = "intern_embeddings"
+# Gambar yang ditolak (tanpa wajah / gerbang kualitas) per path + hash, agar tidak dideteksi ulang setiap sync
+DB_TABLE_REJECTED = f"{DB_TABLE_EMBEDDINGS}_rejected"
+
+# Kolom yang belum ada di tabel dari versi lama (train.py / register-face lama, sebelum metadata
+# model dan indexing inkremental). Ditambahkan dengan ADD COLUMN IF NOT EXISTS; baris lama berisi
+# NULL sampai diisi oleh backend/migrate_embeddings.py.
+EMBEDDING_TABLE_UPGRADE_COLUMNS = (
+    ("intern_id", "INTEGER"),
+    ("instansi", "VARCHAR(100)"),
+    ("kategori", "VARCHAR(100)"),
+    ("image_path", "VARCHAR(255)"),
+    ("model_name", "VARCHAR(50)"),
+    ("embedding_dim", "INTEGER"),
+    ("normalization", "VARCHAR(20)"),
+    ("content_hash", "VARCHAR(64)"),
+    ("file_mtime", "DOUBLE PRECISION"),
+)
+
+# --- KONFIGURASI INDEKS ANN pgvector ---
+# Tanpa indeks vektor, ORDER BY embedding <=> ... adalah sequential scan (O(N) per wajah).
+# VECTOR_INDEX_TYPE: "hnsw" (default; recall tinggi, bisa dibuat saat tabel kosong),
+# "ivfflat" (build lebih cepat & hemat memori, butuh data untuk melatih lists), atau "none".
+VECTOR_INDEX_TYPE = os.environ.get("VECTOR_INDEX_TYPE", "hnsw")
+VECTOR_INDEX_NAME = f"idx_{DB_TABLE_EMBEDDINGS}_embedding_ann"
+HNSW_M = int(os.environ.get("HNSW_M", "16"))
+HNSW_EF_CONSTRUCTION = int(os.environ.get("HNSW_EF_CONSTRUCTION", "64"))
+# ef_search / probes: kandidat yang diperiksa per query (recall vs latensi), di-SET per koneksi
+HNSW_EF_SEARCH = int(os.environ.get("HNSW_EF_SEARCH", "40"))
+IVFFLAT_PROBES = int(os.environ.get("IVFFLAT_PROBES", "10"))
+# Batas dimensi indeks pgvector untuk tipe vector (VGG-Face 4096d tetap sequential scan)
+PGVECTOR_MAX_INDEX_DIM = 2000
+
+# --- KONFIGURASI INDEXING ---
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+# Setiap worker memuat model sendiri, jadi jangan terlalu banyak (memori TensorFlow)
+INDEX_WORKERS = min(4, os.cpu_count() or 1)
+INDEX_BATCH_SIZE = 16
 
 # --- FUNGSI DATABASE VEKTOR ---
 
-def create_embeddings_table(conn):
-    """Memastikan tabel intern_embeddings ada dan skemanya benar."""
+def add_missing_columns(cur):
+    """Menambahkan kolom EMBEDDING_TABLE_UPGRADE_COLUMNS yang belum ada (idempoten, tanpa commit)."""
+    for column, column_type in EMBEDDING_TABLE_UPGRADE_COLUMNS:
+        cur.execute(f"ALTER TABLE {DB_TABLE_EMBEDDINGS} ADD COLUMN IF NOT EXISTS {column} {column_type};")
+
+def create_rejected_table(cur):
+    """Tabel gambar yang ditolak saat indexing (idempoten, tanpa commit)."""
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS {DB_TABLE_REJECTED} (
+            image_path VARCHAR(255) PRIMARY KEY,
+            content_hash VARCHAR(64) NOT NULL,
+            file_mtime DOUBLE PRECISION,
+            model_name VARCHAR(50) NOT NULL
+        );
+    """)
+
+def create_embeddings_table(conn, rebuild: bool = False):
+    """
+    Memastikan tabel intern_embeddings ada dan skemanya benar.
+
+    Secara default tabel TIDAK dihapus agar indexing bisa inkremental;
+    gunakan rebuild=True (python backend/train.py --rebuild) untuk membuat ulang dari nol.
+    """
     try:
         cur = conn.cursor()
-        print("    -> Memastikan skema database: Menghapus tabel lama jika ada...")
-        # Hapus tabel tabel lama, ini akan menghapus semua data 
-        cur.execute(f"DROP TABLE IF EXISTS {DB_TABLE_EMBEDDINGS};")
-        conn.commit()
+        if rebuild:
+            print("    -> Memastikan skema database: Menghapus tabel lama jika ada...")
+            # Hapus tabel tabel lama, ini akan menghapus semua data 
+            cur.execute(f"DROP TABLE IF EXISTS {DB_TABLE_EMBEDDINGS};")
+            cur.execute(f"DROP TABLE IF EXISTS {DB_TABLE_REJECTED};")
+            conn.commit()
         
-        # NOTE: Ukuran dimensi vector ArcFace adalah 512
+        # NOTE: Dimensi vector mengikuti model aktif di model_registry (ArcFace = 512).
+        # Skema ini juga dipakai oleh /api/register-face (intern_id) di main.py.
+        # content_hash & file_mtime dipakai untuk indexing inkremental.
         cur.execute(f"""
-            CREATE TABLE {DB_TABLE_EMBEDDINGS} (
+            CREATE TABLE IF NOT EXISTS {DB_TABLE_EMBEDDINGS} (
                 id SERIAL PRIMARY KEY,
+                intern_id INTEGER,
                 name VARCHAR(100) NOT NULL,
                 instansi VARCHAR(100),
                 kategori VARCHAR(100),
                 image_path VARCHAR(255) NOT NULL,
-                embedding vector(512) NOT NULL
+                embedding vector({ACTIVE_MODEL["embedding_dim"]}) NOT NULL,
+                model_name VARCHAR(50) NOT NULL,
+                embedding_dim INTEGER NOT NULL,
+                normalization VARCHAR(20) NOT NULL,
+                content_hash VARCHAR(64),
+                file_mtime DOUBLE PRECISION
             );
         """)
+        # Tabel lama belum memiliki kolom metadata model / indexing inkremental
+        add_missing_columns(cur)
+        cur.execute(f"SELECT COUNT(*) FROM {DB_TABLE_EMBEDDINGS} WHERE model_name IS NULL;")
+        legacy_rows = cur.fetchone()[0]
+        if legacy_rows:
+            print(f"⚠️ {legacy_rows} embedding lama tanpa metadata model (diabaikan saat pencarian). "
+                  f"Jalankan: python backend/migrate_embeddings.py")
+        cur.execute(f"CREATE INDEX IF NOT EXISTS idx_{DB_TABLE_EMBEDDINGS}_image_path ON {DB_TABLE_EMBEDDINGS} (image_path);")
+        create_rejected_table(cur)
         conn.commit()
-        print("    -> Tabel 'intern_embeddings' berhasil dibuat/dibuat ulang dengan skema yang benar.")
+        print("    -> Tabel 'intern_embeddings' siap dengan skema yang benar.")
     except Exception as e:
         print(f"❌ ERROR: Gagal membuat/memperbarui tabel database: {e}")
         sys.exit(1)
 
+def ivfflat_lists(rows: int) -> int:
+    """Panduan pgvector: lists = rows/1000 sampai 1 juta baris, sqrt(rows) di atasnya."""
+    if rows <= 1_000_000:
+        return max(1, rows // 1000)
+    return int(rows ** 0.5)
+
+def vector_search_settings(index_type: str = VECTOR_INDEX_TYPE) -> tuple:
+    """Statement SET per sesi untuk parameter pencarian indeks ANN (dipakai pool koneksi di main.py)."""
+    if index_type == "hnsw":
+        return (f"SET hnsw.ef_search = {HNSW_EF_SEARCH}",)
+    if index_type == "ivfflat":
+        return (f"SET ivfflat.probes = {IVFFLAT_PROBES}",)
+    return ()
+
+def drop_vector_index(conn):
+    """Menghapus indeks ANN (mis. sebelum dimensi kolom embedding diubah oleh migrate_embeddings.py)."""
+    cur = conn.cursor()
+    cur.execute(f"DROP INDEX IF EXISTS {VECTOR_INDEX_NAME};")
+    conn.commit()
+
+def create_vector_index(conn, index_type: str = VECTOR_INDEX_TYPE):
+    """
+    Membuat (atau menyesuaikan) indeks ANN pada kolom embedding dengan operator kosinus (<=>).
+
+    Dipanggil setelah data dimuat: HNSW lebih cepat dibangun sekali daripada per-INSERT,
+    dan IVFFlat butuh data untuk melatih centroid lists. Indeks dibuat ulang hanya jika
+    tipenya berubah atau (IVFFlat) jumlah lists ideal berubah lebih dari 2x.
+    """
+    if index_type == "none":
+        return
+    if index_type not in ("hnsw", "ivfflat"):
+        print(f"⚠️ VECTOR_INDEX_TYPE '{index_type}' tidak dikenal; indeks ANN tidak dibuat.")
+        return
+    if ACTIVE_MODEL["embedding_dim"] > PGVECTOR_MAX_INDEX_DIM:
+        print(f"⚠️ Dimensi {ACTIVE_MODEL['embedding_dim']} melebihi batas indeks pgvector; pencarian tetap sequential scan.")
+        return
+
+    cur = conn.cursor()
+    cur.execute("SELECT indexdef FROM pg_indexes WHERE indexname = %s", (VECTOR_INDEX_NAME,))
+    existing = cur.fetchone()
+    if index_type == "hnsw":
+        options = f"m = {HNSW_M}, ef_construction = {HNSW_EF_CONSTRUCTION}"
+        stale = existing is not None and "USING hnsw" not in existing[0]
+    else:
+        cur.execute(f"SELECT COUNT(*) FROM {DB_TABLE_EMBEDDINGS}")
+        lists = ivfflat_lists(cur.fetchone()[0])
+        options = f"lists = {lists}"
+        current = re.search(r"lists='?(\d+)", existing[0]) if existing else None
+        stale = existing is not None and (current is None or not lists / 2 <= int(current.group(1)) <= lists * 2)
+
+    if existing is not None and not stale:
+        return
+    if stale:
+        cur.execute(f"DROP INDEX IF EXISTS {VECTOR_INDEX_NAME};")
+    start = time.perf_counter()
+    cur.execute(f"""
+        CREATE INDEX {VECTOR_INDEX_NAME} ON {DB_TABLE_EMBEDDINGS}
+        USING {index_type} (embedding vector_cosine_ops) WITH ({options});
+    """)
+    cur.execute(f"ANALYZE {DB_TABLE_EMBEDDINGS};")
+    conn.commit()
+    print(f"    -> Indeks {index_type.upper()} ({options}) dibuat dalam {time.perf_counter() - start:.1f}s.")
+
 def connect_vector_db():
     """Membuat koneksi ke Database Vektor (PostgreSQL)."""
     try:
@@ -92,114 +242,336 @@ def load_master_data():
         sys.exit(1)
 
 
-# --- FUNGSI UTAMA INDEXING (Koreksi Logic Instansi & Database INSERT) ---
+# --- FUNGSI INDEXING INKREMENTAL ---
+
+def file_content_hash(path) -> str:
+    """SHA-256 dari isi file gambar (mendeteksi file yang berubah walau namanya sama)."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def scan_image_files(root_dir):
+    """Memindai root_dir/<Nama>/<gambar> dan mengembalikan {path: (person_name, mtime)}."""
+    scanned = {}
+    root_dir = Path(root_dir)
+    if not root_dir.exists():
+        return scanned
+    for person_name in os.listdir(root_dir):
+        person_dir = root_dir / person_name
+        if not os.path.isdir(person_dir) or person_name.startswith('.'):
+            continue
+        for filename in sorted(os.listdir(person_dir)):
+            if not filename.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            filepath = str(person_dir / filename)
+            scanned[filepath] = (person_name, os.path.getmtime(filepath))
+    return scanned
+
+
+def load_indexed_files(conn, root_dir):
+    """Mengembalikan {image_path: (content_hash, file_mtime)} untuk baris yang berasal dari root_dir."""
+    cur = conn.cursor()
+    cur.execute(
+        f"SELECT image_path, content_hash, file_mtime FROM {DB_TABLE_EMBEDDINGS} WHERE image_path LIKE %s",
+        (str(Path(root_dir)) + os.sep + "%",)
+    )
+    return {path: (content_hash, mtime) for path, content_hash, mtime in cur.fetchall()}
+
+
+def load_rejected_files(conn, root_dir):
+    """Mengembalikan {image_path: (content_hash, file_mtime)} untuk gambar root_dir yang ditolak model aktif."""
+    cur = conn.cursor()
+    create_rejected_table(cur)
+    cur.execute(
+        f"SELECT image_path, content_hash, file_mtime FROM {DB_TABLE_REJECTED} WHERE image_path LIKE %s AND model_name = %s",
+        (str(Path(root_dir)) + os.sep + "%", MODEL)
+    )
+    return {path: (content_hash, mtime) for path, content_hash, mtime in cur.fetchall()}
+
+
+def plan_changes(scanned, indexed):
+    """
+    Membandingkan isi folder dengan isi database.
+
+    Returns:
+        tuple (to_embed, to_delete, mtime_only):
+            to_embed   -> list (path, person_name, mtime, content_hash) untuk file baru/berubah
+            to_delete  -> list path yang barisnya harus dihapus (file hilang atau berubah)
+            mtime_only -> list (mtime, path) untuk file yang hanya berubah mtime-nya
+    """
+    to_embed, to_delete, mtime_only = [], [], []
+    for path, (person_name, mtime) in scanned.items():
+        if path in indexed and indexed[path][1] == mtime:
+            continue
+        content_hash = file_content_hash(path)
+        if path in indexed:
+            if indexed[path][0] == content_hash:
+                mtime_only.append((mtime, path))
+                continue
+            to_delete.append(path)
+        to_embed.append((path, person_name, mtime, content_hash))
+    to_delete.extend(path for path in indexed if path not in scanned)
+    return to_embed, to_delete, mtime_only
+
+
+def _embed_chunk(paths, model_name):
+    """
+    Worker (proses terpisah): deteksi wajah per gambar lalu satu panggilan model
+    untuk seluruh chunk. Mengembalikan list (path, embedding atau None).
+    """
+    from backend.utils import detect_and_align_faces, embed_face_batch
+    from backend.face_quality import FaceQualityError
+
+    crops, crop_paths, results = [], [], []
+    for path in paths:
+        try:
+            with open(path, "rb") as f:
+                faces = detect_and_align_faces(f.read(), model_name=model_name)
+        except FaceQualityError as e:
+            # Foto dataset buruk (buram/kecil/gelap/menyamping) tidak masuk indeks
+            print(f"   ⚠️ Ditolak gerbang kualitas ({e.reason}): {path}")
+            faces = []
+        except Exception as e:
+            print(f"   ❌ Gagal memproses {path}. Detail: {e}")
+            faces = []
+        if faces:
+            crops.append(faces[0])
+            crop_paths.append(path)
+        else:
+            results.append((path, None))
+
+    for path, embedding in zip(crop_paths, embed_face_batch(crops, model_name=model_name)):
+        results.append((path, normalize_embedding(embedding)))
+    return results
+
+
+def embed_images_parallel(paths, workers: int = INDEX_WORKERS, batch_size: int = INDEX_BATCH_SIZE):
+    """Embedding paralel (process pool, batch per worker) dengan laporan progres & throughput."""
+    chunks = [paths[i:i + batch_size] for i in range(0, len(paths), batch_size)]
+    total = len(paths)
+    done = 0
+    start = time.perf_counter()
+    results = {}
+
+    def report(chunk_results):
+        nonlocal done
+        for path, embedding in chunk_results:
+            results[path] = embedding
+        done += len(chunk_results)
+        elapsed = time.perf_counter() - start
+        print(f"   -> [{done}/{total}] {done / elapsed:.2f} gambar/detik")
+
+    if workers <= 1 or len(chunks) <= 1:
+        for chunk in chunks:
+            report(_embed_chunk(chunk, MODEL))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_embed_chunk, chunk, MODEL) for chunk in chunks]
+            for future in as_completed(futures):
+                report(future.result())
+
+    elapsed = time.perf_counter() - start
+    return results, elapsed
+
+
+COPY_COLUMNS = ("intern_id", "name", "instansi", "kategori", "image_path", "embedding",
+                "model_name", "embedding_dim", "normalization", "content_hash", "file_mtime")
+COPY_KINDS = ("int4", "text", "text", "text", "text", "vector", "text", "int4", "text", "text", "float8")
+
+
+def copy_embeddings(cur, rows):
+    """Menulis semua baris sekaligus dengan satu COPY biner (embedding sebagai float32, tanpa literal teks)."""
+    copy_rows_binary(cur, DB_TABLE_EMBEDDINGS, COPY_COLUMNS, COPY_KINDS, rows)
+
+
+def sync_directory(conn, root_dir, person_info, workers: int = INDEX_WORKERS, batch_size: int = INDEX_BATCH_SIZE):
+    """
+    Menyinkronkan intern_embeddings dengan isi root_dir secara inkremental.
+
+    Args:
+        person_info: fungsi person_name -> dict {'intern_id', 'instansi', 'kategori'} atau None
+                     (None = folder diabaikan). Kunci opsional 'name' mengganti nama yang disimpan
+                     (mis. folder 'Budi_Santoso' -> 'Budi Santoso').
+
+    Returns:
+        dict statistik: added, removed, unchanged, skipped (baru ditolak), rejected_unchanged
+        (ditolak sebelumnya, tidak dideteksi ulang), seconds, images_per_second.
+    """
+    scanned = scan_image_files(root_dir)
+    indexed = load_indexed_files(conn, root_dir)
+    rejected = load_rejected_files(conn, root_dir)
+    on_disk = set(scanned)
+
+    # Folder yang tidak dikenal diabaikan (barisnya juga tidak disentuh)
+    info_cache = {}
+    for person_name in {person for person, _ in scanned.values()}:
+        info_cache[person_name] = person_info(person_name)
+        if info_cache[person_name] is None:
+            print(f"   ⚠️ PERINGATAN: Nama folder '{person_name}' tidak ditemukan di data master. Folder diabaikan.")
+    scanned = {path: value for path, value in scanned.items() if info_cache[value[0]] is not None}
+
+    # Gambar yang sudah pernah ditolak dan tidak berubah (mtime sama, atau hanya mtime yang berubah
+    # dengan hash sama) tidak dideteksi ulang
+    candidates = {path: value for path, value in scanned.items()
+                  if path in indexed or path not in rejected or rejected[path][1] != value[1]}
+    to_embed, to_delete, mtime_only = plan_changes(candidates, indexed)
+    rejected_mtime_only = [(mtime, path) for path, _, mtime, content_hash in to_embed
+                           if path not in indexed and path in rejected and rejected[path][0] == content_hash]
+    unchanged_rejects = {path for _, path in rejected_mtime_only}
+    to_embed = [item for item in to_embed if item[0] not in unchanged_rejects]
+    still_rejected = len(scanned) - len(candidates) + len(rejected_mtime_only)
+    print(f"    -> {len(scanned)} gambar ditemukan: {len(to_embed)} baru/berubah, {len(to_delete)} dihapus/berubah, "
+          f"{still_rejected} pernah ditolak (dilewati).")
+
+    # Cache embedding (kunci = hash isi file, sama dengan /api/register-face): hanya miss yang di-embed
+    cache = shared_cache(MODEL)
+    keys, embeddings = {}, {}
+    if cache is not None:
+        for path, _, _, content_hash in to_embed:
+            keys[path] = cache_key(content_hash, MODEL, ACTIVE_MODEL["detector_backend"])
+            cached = cache.get(keys[path], os.path.getsize(path))
+            if cached is not None:
+                embeddings[path] = cached
+    to_compute = [item[0] for item in to_embed if item[0] not in embeddings]
+    if len(to_compute) < len(to_embed):
+        print(f"    -> {len(to_embed) - len(to_compute)} embedding diambil dari cache.")
+
+    computed, elapsed = embed_images_parallel(to_compute, workers, batch_size)
+    embeddings.update(computed)
+    if cache is not None:
+        for path, embedding in computed.items():
+            if embedding is not None:
+                cache.put(keys[path], embedding)
+        cache.flush()
+
+    model_metadata = embedding_metadata()
+    rows, new_rejects = [], []
+    for path, person_name, mtime, content_hash in to_embed:
+        embedding = embeddings.get(path)
+        if embedding is None:
+            print(f"   ⚠️ PERINGATAN: Wajah tidak terdeteksi di {path}. Gambar diabaikan.")
+            new_rejects.append((path, content_hash, mtime, MODEL))
+            continue
+        info = info_cache[person_name]
+        rows.append((info.get('intern_id'), info.get('name', person_name), info.get('instansi'), info.get('kategori'), path,
+                     embedding, *model_metadata, content_hash, mtime))
+
+    # Semua perubahan dalam satu transaksi: hapus baris lama lalu satu COPY untuk baris baru
+    cur = conn.cursor()
+    try:
+        if to_delete:
+            cur.execute(f"DELETE FROM {DB_TABLE_EMBEDDINGS} WHERE image_path = ANY(%s)", (to_delete,))
+        if mtime_only:
+            cur.executemany(f"UPDATE {DB_TABLE_EMBEDDINGS} SET file_mtime = %s WHERE image_path = %s", mtime_only)
+        if rows:
+            copy_embeddings(cur, rows)
+        # Catatan penolakan: hapus untuk file yang hilang atau kini berhasil di-embed, simpan yang baru
+        stale_rejects = [path for path in rejected if path not in on_disk] + [row[4] for row in rows]
+        if stale_rejects:
+            cur.execute(f"DELETE FROM {DB_TABLE_REJECTED} WHERE image_path = ANY(%s)", (stale_rejects,))
+        if rejected_mtime_only:
+            cur.executemany(f"UPDATE {DB_TABLE_REJECTED} SET file_mtime = %s WHERE image_path = %s", rejected_mtime_only)
+        if new_rejects:
+            cur.executemany(
+                f"INSERT INTO {DB_TABLE_REJECTED} (image_path, content_hash, file_mtime, model_name) VALUES (%s, %s, %s, %s) "
+                "ON CONFLICT (image_path) DO UPDATE SET content_hash = EXCLUDED.content_hash, "
+                "file_mtime = EXCLUDED.file_mtime, model_name = EXCLUDED.model_name",
+                new_rejects
+            )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    removed = len([path for path in to_delete if path not in scanned])
+    return {
+        "added": len(rows),
+        "removed": removed,
+        "replaced": len(to_delete) - removed,
+        "unchanged": len(scanned) - len(to_embed) - still_rejected,
+        "skipped": len(new_rejects),
+        "rejected_unchanged": still_rejected,
+        "seconds": round(elapsed, 2),
+        "images_per_second": round(len(to_compute) / elapsed, 2) if elapsed > 0 else 0.0,
+        "cache": cache.stats() if cache is not None else None,
+    }
+
+
+# --- SNAPSHOT GALERI ---
+
+def export_gallery_snapshot(conn):
+    """
+    Menulis snapshot galeri (np.memmap) untuk model aktif, dibaca read-only oleh setiap worker main.py.
+    Versi diambil sebelum membaca vektor: baris yang masuk di antaranya membuat snapshot dianggap basi.
+    """
+    metadata = embedding_metadata()
+    version = gallery_version(conn.cursor(), metadata, DB_TABLE_EMBEDDINGS)
+    index = FaceIndex(dim=ACTIVE_MODEL["embedding_dim"])
+    index.load_from_db(conn, DB_TABLE_EMBEDDINGS, metadata)
+    path = snapshot_path(MODEL)
+    size = write_snapshot(path, *index.arrays(), metadata, version)
+    print(f"    -> Snapshot galeri: {len(index)} vektor -> {path} ({size / 1e6:.1f} MB)")
+
 
-def index_dataset():
+# --- FUNGSI UTAMA INDEXING ---
+
+def index_dataset(rebuild: bool = False, workers: int = INDEX_WORKERS, batch_size: int = INDEX_BATCH_SIZE):
     conn = connect_vector_db()
     
     # Membuat/memastikan skema tabel benar (termasuk kolom 'kategori')
-    create_embeddings_table(conn) 
-    cur = conn.cursor()
+    create_embeddings_table(conn, rebuild=rebuild) 
     
     # MUAT DATA MASTER DARI CSV
     master_data = load_master_data() 
     
-    print("\n🧠 Memulai proses indexing fitur (DeepFace/{})...".format(MODEL))
-    
-    total_indexed_count = 0
+    print("\n🧠 Memulai proses indexing inkremental (DeepFace/{}, {} worker, batch {})...".format(MODEL, workers, batch_size))
     
-    # Iterasi melalui setiap folder (nama orang) di DATASET_PATH
-    for person_name in os.listdir(DATASET_PATH):
-        person_dir = DATASET_PATH / person_name
-        if not os.path.isdir(person_dir) or person_name.startswith('.'):
-            continue
-            
-        embeddings_to_insert = []
-        person_success_count = 0
-        
-        # Cek dan Ambil Data Instansi dan Kategori dari CSV Master
-        if person_name not in master_data:
-            print(f"   ⚠️ PERINGATAN: Nama folder '{person_name}' tidak ditemukan di interns.csv. Folder diabaikan.")
-            continue
-            
-        instansi_value = master_data[person_name]['instansi']
-        kategori_value = master_data[person_name]['kategori'] 
+    try:
+        stats = sync_directory(conn, DATASET_PATH, master_data.get, workers=workers, batch_size=batch_size)
+    except Exception as db_e:
+        print(f"❌ FATAL ERROR DB: Gagal menyimpan hasil indexing. Detail: {db_e}")
+        conn.close()
+        sys.exit(1)
 
-        print(f"\n   -> Memproses {person_name} (Instansi: {instansi_value}, Kategori: {kategori_value})...")
+    try:
+        create_vector_index(conn)
+    except psycopg2.Error as e:
+        conn.rollback()
+        print(f"⚠️ Gagal membuat indeks ANN ({VECTOR_INDEX_TYPE}): {e}")
 
-        # Iterasi melalui setiap gambar di folder orang tersebut
-        for filename in sorted(os.listdir(person_dir)):
-            if not filename.lower().endswith(('.jpg', '.jpeg', '.png')):
-                continue
-                
-            filepath = str(person_dir / filename)
-            
-            try:
-                # 1. GENERASI EMBEDDING WAJAH
-                print(f"   -> Memproses {person_name} ({filename})...")
-                
-                representations = DeepFace.represent(
-                    img_path=filepath, 
-                    model_name=MODEL,
-                    enforce_detection=False 
-                )
-                
-                if representations:
-                    # Ambil embedding vektor pertama
-                    embedding_vector = representations[0]["embedding"]
-                    # Format vektor ke string yang sesuai untuk PostgreSQL
-                    vector_string = "[" + ",".join(map(str, embedding_vector)) + "]"
-                    
-                    # Tambahkan data ke batch untuk insertion. Jumlah item = 5.
-                    embeddings_to_insert.append((person_name, instansi_value, kategori_value, filepath, vector_string)) 
-                    person_success_count += 1
-                else:
-                    print(f"   ⚠️ PERINGATAN: Tidak ada representasi yang dibuat untuk {filename}. Gambar diabaikan.")
-                    
-            except Exception as e:
-                # Cek jika errornya terkait DeepFace (misalnya, wajah tidak terdeteksi)
-                if 'Face could not be detected' in str(e):
-                    print(f"   ⚠️ PERINGATAN: Wajah tidak terdeteksi di {filename}. Gambar diabaikan.")
-                else:
-                    print(f"   ❌ Gagal memproses {filename}. Detail: {e}")
-
-        # 2. INSERT BATCH KE DATABASE SETELAH SELESAI SATU ORANG
-        if embeddings_to_insert:
-            # Query untuk batch insertion. HARUS ADA 5 %s SESUAI DENGAN JUMLAH KOLOM
-            # name: %s, instansi: %s, kategori: %s, image_path: %s, embedding: %s::vector
-            insert_query = f"INSERT INTO {DB_TABLE_EMBEDDINGS} (name, instansi, kategori, image_path, embedding) VALUES (%s, %s, %s, %s, %s::vector)"
-            
-            # Data sudah disiapkan dalam embeddings_to_insert dengan 5 elemen per tuple
-            
-            try:
-                # Menggunakan executemany untuk batch insert
-                cur.executemany(insert_query, embeddings_to_insert)
-                conn.commit()
-                total_indexed_count += person_success_count
-                print(f"✅ Selesai indexing {person_name}. Total {person_success_count} embeddings disimpan.")
-            except Exception as db_e:
-                conn.rollback()
-                # Print baris data yang gagal untuk debugging
-                print(f"❌ FATAL ERROR DB: Gagal menyimpan data untuk {person_name}. Detail: {db_e}")
-                
-        else:
-            print(f"✅ Selesai indexing {person_name}. Total 0 embeddings disimpan.")
+    try:
+        export_gallery_snapshot(conn)
+    except (OSError, psycopg2.Error) as e:
+        print(f"⚠️ Gagal menulis snapshot galeri: {e}")
             
     conn.close()
     
     print("\n" + "="*50)
-    if total_indexed_count > 0:
-        print(f"🎉 INDEXING LENGKAP! Total {total_indexed_count} wajah berhasil disimpan.")
-    else:
-        print("⚠️ INDEXING SELESAI, tetapi tidak ada wajah yang berhasil di-index.")
+    print(f"🎉 INDEXING LENGKAP! {stats['added']} ditambahkan, {stats['removed']} dihapus, "
+          f"{stats['unchanged']} tidak berubah, {stats['skipped']} diabaikan, "
+          f"{stats['rejected_unchanged']} ditolak sebelumnya.")
+    print(f"⏱️ Throughput: {stats['images_per_second']} gambar/detik ({stats['seconds']}s)")
+    if stats["cache"]:
+        cache = stats["cache"]
+        print(f"🗃️ Cache embedding: hit rate {cache['hit_rate']:.1%}, {cache['bytes_saved'] / 1e6:.1f} MB gambar tidak di-embed ulang")
     print("="*50)
+    return stats
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Indexing inkremental dataset wajah ke intern_embeddings.")
+    parser.add_argument("--rebuild", action="store_true", help="Hapus tabel dan index ulang semua gambar.")
+    parser.add_argument("--workers", type=int, default=INDEX_WORKERS, help="Jumlah proses embedding paralel.")
+    parser.add_argument("--batch-size", type=int, default=INDEX_BATCH_SIZE, help="Jumlah gambar per panggilan model.")
+    args = parser.parse_args()
+
     print("="*50)
     print("🤖 SCRIPT INDEXING & AUDIO GENERATION")
     print("="*50)
     # Panggil fungsi untuk indexing
-    index_dataset()
+    index_dataset(rebuild=args.rebuild, workers=args.workers, batch_size=args.batch_size)
     
     # TODO: Tambahkan fungsi generate_audio() di sini jika Anda memilikinya.
-    # Misalnya: generate_audio()
\ No newline at end of file
+    # Misalnya: generate_audio()
@@ -0,0 +1,229 @@
+# backend/tts_engine.py
+import os
+import abc
+import shutil
+import hashlib
+import threading
+import subprocess
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+# Import gTTS (online) - opsional
+try:
+    from gtts import gTTS
+except ImportError:
+    gTTS = None
+
+# Import pyttsx3 (offline) - opsional: pip install pyttsx3
+try:
+    import pyttsx3
+except ImportError:
+    pyttsx3 = None
+
+# --- ENGINE TTS DENGAN CACHE BERBASIS KONTEN ---
+# /recognize tidak pernah menunggu sintesis audio: engine hanya mengembalikan
+# track yang sudah ada di cache, dan menjadwalkan sintesis di background jika belum ada.
+# File cache diberi nama hash(voice + teks), sehingga teks yang sama tidak pernah
+# disintesis dua kali, dan ukuran total cache dibatasi (file paling lama tidak dipakai dihapus).
+
+
+class TTSBackend(abc.ABC):
+    """Antarmuka backend TTS. Subclass mengisi `name`, `extension`, `offline`, dan `synthesize`."""
+    name = "base"
+    extension = ".mp3"
+    offline = False  # True jika sintesis tidak butuh koneksi internet
+
+    def __init__(self, lang: str = "id"):
+        self.lang = lang
+
+    @property
+    def voice_id(self) -> str:
+        return f"{self.name}:{self.lang}"
+
+    def available(self) -> bool:
+        return True
+
+    @abc.abstractmethod
+    def synthesize(self, text: str, output_path: Path):
+        """Menulis audio untuk `text` ke output_path."""
+
+
+class GTTSBackend(TTSBackend):
+    """Google TTS (butuh koneksi internet)."""
+    name = "gtts"
+    extension = ".mp3"
+
+    def available(self) -> bool:
+        return gTTS is not None
+
+    def synthesize(self, text: str, output_path: Path):
+        gTTS(text=text, lang=self.lang).save(str(output_path))
+
+
+class EspeakBackend(TTSBackend):
+    """espeak-ng / espeak via command line (offline, tanpa dependensi Python)."""
+    name = "espeak"
+    extension = ".wav"
+    offline = True
+
+    def __init__(self, lang: str = "id"):
+        super().__init__(lang)
+        self.binary = shutil.which("espeak-ng") or shutil.which("espeak")
+
+    def available(self) -> bool:
+        return self.binary is not None
+
+    def synthesize(self, text: str, output_path: Path):
+        subprocess.run([self.binary, "-v", self.lang, "-w", str(output_path), text], check=True, timeout=30)
+
+
+class Pyttsx3Backend(TTSBackend):
+    """pyttsx3 (offline, memakai engine suara sistem operasi)."""
+    name = "pyttsx3"
+    extension = ".wav"
+    offline = True
+
+    def available(self) -> bool:
+        return pyttsx3 is not None
+
+    def synthesize(self, text: str, output_path: Path):
+        engine = pyttsx3.init()
+        engine.save_to_file(text, str(output_path))
+        engine.runAndWait()
+
+
+TTS_BACKENDS = {
+    GTTSBackend.name: GTTSBackend,
+    EspeakBackend.name: EspeakBackend,
+    Pyttsx3Backend.name: Pyttsx3Backend,
+}
+
+
+class AudioCache:
+    """Cache audio content-addressed dengan batas ukuran (eviksi LRU berdasarkan mtime)."""
+
+    def __init__(self, cache_dir: Path, max_bytes: int):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._sizes = {p.name: p.stat().st_size for p in self.cache_dir.iterdir() if p.is_file()}
+
+    @staticmethod
+    def key(text: str, voice_id: str) -> str:
+        return hashlib.sha256(f"{voice_id}\n{text}".encode("utf-8")).hexdigest()[:32]
+
+    def lookup(self, filename: str):
+        """Mengembalikan path file jika ada di cache (dan menandainya baru dipakai)."""
+        path = self.cache_dir / filename
+        if filename in self._sizes and path.exists():
+            os.utime(path)
+            return path
+        return None
+
+    def store(self, filename: str, tmp_path: Path):
+        """Memindahkan file hasil sintesis ke cache lalu menegakkan batas ukuran."""
+        path = self.cache_dir / filename
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._sizes[filename] = path.stat().st_size
+            self._evict()
+        return path
+
+    def _evict(self):
+        total = sum(self._sizes.values())
+        if total <= self.max_bytes:
+            return
+        entries = sorted(
+            ((self.cache_dir / name).stat().st_mtime if (self.cache_dir / name).exists() else 0, name)
+            for name in self._sizes
+        )
+        for _, name in entries:
+            if total <= self.max_bytes:
+                break
+            total -= self._sizes.pop(name)
+            try:
+                os.remove(self.cache_dir / name)
+            except FileNotFoundError:
+                pass
+
+    def stats(self) -> dict:
+        return {"files": len(self._sizes), "bytes": sum(self._sizes.values()), "max_bytes": self.max_bytes}
+
+
+class TTSEngine:
+    """
+    Engine pengumuman suara. Backend dicoba berurutan (mis. gTTS lalu espeak offline),
+    hasil disimpan di AudioCache. Semua sintesis berjalan di thread background.
+    """
+
+    def __init__(self, backends, cache: AudioCache, url_prefix: str = "cache"):
+        self.backends = [b for b in backends if b.available()]
+        self.cache = cache
+        self.url_prefix = url_prefix
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tts")
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def _filename(self, text: str, backend: TTSBackend) -> str:
+        return AudioCache.key(text, backend.voice_id) + backend.extension
+
+    def track_for(self, text: str):
+        """Track ID (relatif terhadap /audio) jika audio sudah ada di cache; None jika belum."""
+        for backend in self.backends:
+            if self.cache.lookup(self._filename(text, backend)):
+                return f"{self.url_prefix}/{self._filename(text, backend)}"
+        return None
+
+    def prefetch(self, text: str):
+        """Menjadwalkan sintesis di background (tidak memblokir). Aman dipanggil berulang."""
+        with self._lock:
+            if text in self._pending or self.track_for(text):
+                return
+            self._pending.add(text)
+        self._executor.submit(self._synthesize, text)
+
+    def announce(self, text: str, fallback_text: str = None):
+        """
+        Mengembalikan track yang siap diputar tanpa menunggu sintesis.
+        Jika teks belum ada di cache, sintesis dijadwalkan dan track fallback (jika ada) dikembalikan.
+        """
+        track = self.track_for(text)
+        if track:
+            return track
+        self.prefetch(text)
+        return self.track_for(fallback_text) if fallback_text else None
+
+    def _synthesize(self, text: str):
+        try:
+            for backend in self.backends:
+                filename = self._filename(text, backend)
+                tmp_path = self.cache.cache_dir / f".{filename}.tmp"
+                try:
+                    backend.synthesize(text, tmp_path)
+                    self.cache.store(filename, tmp_path)
+                    print(f"   -> ✅ TTS [{backend.name}] siap: '{text}'")
+                    return
+                except Exception as e:
+                    print(f"⚠️ TTS [{backend.name}] gagal untuk '{text}': {e}")
+                    if tmp_path.exists():
+                        os.remove(tmp_path)
+            print(f"❌ ERROR: Semua backend TTS gagal untuk '{text}'.")
+        finally:
+            with self._lock:
+                self._pending.discard(text)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+
+def build_tts_engine(backend_names, cache_dir: Path, max_bytes: int, lang: str = "id") -> TTSEngine:
+    """Membuat TTSEngine dari daftar nama backend (urutan = prioritas)."""
+    backends = [TTS_BACKENDS[name](lang=lang) for name in backend_names if name in TTS_BACKENDS]
+    engine = TTSEngine(backends, AudioCache(cache_dir, max_bytes))
+    if not engine.backends:
+        print("⚠️ Tidak ada backend TTS yang tersedia: pengumuman suara hanya memakai audio yang sudah ada di cache.")
+    elif not any(backend.offline for backend in engine.backends):
+        print("⚠️ Tidak ada backend TTS offline (pyttsx3/espeak): sintesis audio baru gagal jika internet terputus. "
+              "Pasang 'pip install pyttsx3' atau paket espeak-ng.")
+    return engine
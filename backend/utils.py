@@ -2,7 +2,15 @@
 import numpy as np
 import cv2 # PENTING: Diperlukan untuk membaca data 'bytes' menjadi array gambar (NumPy Array)
 from deepface import DeepFace
+from deepface.modules import preprocessing
 import os
+import time
+from .model_registry import ACTIVE_MODEL
+from .face_quality import assess_face, check_face, FaceQualityError
+from .embedding_cache import shared_cache, cache_key, content_hash
+
+DEFAULT_MODEL = ACTIVE_MODEL["model_name"]
+DEFAULT_DETECTOR = ACTIVE_MODEL["detector_backend"]
 
 # --- KONFIGURASI PENTING ---
 # Batas ambang jarak kosinus (Cosine Distance) untuk penentuan wajah dikenali (Threshold)
@@ -10,54 +18,261 @@ import os
 # Wajah dikenali jika jarak <= DISTANCE_THRESHOLD
 DISTANCE_THRESHOLD = 0.40 
 
+# Frame yang lebih besar dari ini (sisi terpanjang, piksel) diperkecil sebelum deteksi,
+# sehingga waktu decode+deteksi tidak ikut naik dengan resolusi kamera kiosk.
+MAX_DETECT_SIDE = int(os.environ.get("MAX_DETECT_SIDE", "640"))
+# Margin tambahan di sekitar bounding box dari klien (proporsi lebar/tinggi box)
+CLIENT_BOX_MARGIN = 0.15
+
+# --- SINGLETON MODEL ---
+# Model pengenal wajah dan detektor dibangun sekali per proses lalu dipakai ulang,
+# agar /recognize pertama setelah restart tidak membayar biaya konstruksi model.
+_RECOGNITION_MODELS = {}
+_DETECTOR_MODELS = {}
+
+def get_recognition_model(model_name=DEFAULT_MODEL):
+    """Mengembalikan model pengenal wajah (singleton per nama model)."""
+    if model_name not in _RECOGNITION_MODELS:
+        _RECOGNITION_MODELS[model_name] = DeepFace.build_model(model_name=model_name, task="facial_recognition")
+    return _RECOGNITION_MODELS[model_name]
+
+def get_detector_model(detector_backend=DEFAULT_DETECTOR):
+    """Mengembalikan model detektor wajah (singleton per backend)."""
+    if detector_backend not in _DETECTOR_MODELS:
+        _DETECTOR_MODELS[detector_backend] = DeepFace.build_model(model_name=detector_backend, task="face_detector")
+    return _DETECTOR_MODELS[detector_backend]
+
+def warm_up_models(model_name=DEFAULT_MODEL, detector_backend=DEFAULT_DETECTOR) -> float:
+    """
+    Membangun model + detektor dan menjalankan satu forward pass dummy
+    untuk memuat bobot dan men-trace graph TensorFlow.
+
+    Returns:
+        float: Durasi warm-up dalam detik.
+    """
+    start = time.perf_counter()
+    model = get_recognition_model(model_name)
+    get_detector_model(detector_backend)
+
+    width, height = model.input_shape
+    embed_face_batch([np.zeros((1, height, width, 3), dtype=np.float32)], model_name=model_name)
+
+    # Jalankan detektor sekali pada gambar kosong (tidak ada wajah, tidak dipaksa)
+    blank = np.zeros((height * 2, width * 2, 3), dtype=np.uint8)
+    DeepFace.extract_faces(img_path=blank, detector_backend=detector_backend, enforce_detection=False)
+    return time.perf_counter() - start
+
 # --- FUNGSI EKSTRAKSI FITUR ---
 
-def extract_face_features(image_bytes: bytes, model_name="ArcFace"):
+def embedding_cache_key(image_bytes: bytes, model_name=DEFAULT_MODEL, detector_backend=DEFAULT_DETECTOR, face_box=None, pre_cropped=False) -> bytes:
+    """Kunci cache embedding untuk gambar ini; sama dengan kunci yang dipakai train.py untuk file dataset."""
+    variant = "crop" if pre_cropped else ("box:{x},{y},{w},{h}".format(**face_box) if face_box else "")
+    return cache_key(content_hash(image_bytes), model_name, detector_backend, variant)
+
+def extract_face_features(image_bytes: bytes, model_name=DEFAULT_MODEL, detector_backend=DEFAULT_DETECTOR, face_box=None, pre_cropped=False, use_cache=True):
     """
     Ekstraksi fitur wajah (embedding) menggunakan model DeepFace dari data bytes gambar.
+    Hanya wajah terbesar yang di-embed (pemanggil selalu memakai emb_list[0]).
 
     Args:
         image_bytes (bytes): Data gambar yang diunggah dari frontend.
-        model_name (str): Nama model DeepFace yang akan digunakan (e.g., 'ArcFace').
+        model_name (str): Nama model DeepFace yang akan digunakan (default: model aktif di model_registry).
+        face_box (dict): Opsional {'x','y','w','h'} dari klien; deteksi dilewati.
+        pre_cropped (bool): True jika gambar sudah berupa crop wajah; deteksi dilewati.
+        use_cache (bool): Pakai cache embedding berbasis hash isi gambar (embedding_cache.py).
         
     Returns:
         list of list[float]: List dari embedding wajah yang terdeteksi. 
                              Mengembalikan list kosong ([]) jika tidak ada wajah.
     """
-    
+    cache = shared_cache(model_name) if use_cache else None
+    if cache is not None:
+        key = embedding_cache_key(image_bytes, model_name, detector_backend, face_box, pre_cropped)
+        cached = cache.get(key, len(image_bytes))
+        if cached is not None:
+            return [cached.tolist()]
+
+    crops = detect_and_align_faces(image_bytes, model_name, detector_backend, face_box=face_box, pre_cropped=pre_cropped)
+    try:
+        # Kita mengembalikan list of list (Python list) agar mudah diproses di main.py
+        embeddings = embed_face_batch(crops, model_name=model_name)
+    except Exception as e:
+        print(f"❌ ERROR Ekstraksi Fitur: {e}")
+        return []
+    if cache is not None and embeddings:
+        cache.put(key, embeddings[0])
+    return embeddings
+
+
+# --- FUNGSI DETEKSI & EMBEDDING TERPISAH (UNTUK MICRO-BATCHING) ---
+
+def decode_image(image_bytes: bytes):
+    """Bytes gambar -> array BGR OpenCV (None jika format tidak didukung)."""
+    return cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
+
+
+def downscale_for_detection(img, max_side=MAX_DETECT_SIDE):
+    """Memperkecil frame agar sisi terpanjang <= max_side. Returns (gambar, skala asli/kecil)."""
+    height, width = img.shape[:2]
+    longest = max(height, width)
+    if longest <= max_side:
+        return img, 1.0
+    scale = max_side / longest
+    small = cv2.resize(img, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA)
+    return small, 1.0 / scale
+
+
+def crop_box(img, face_box: dict, margin=CLIENT_BOX_MARGIN):
+    """Crop {'x','y','w','h'} (+margin) dari gambar, dibatasi ke tepi gambar. None jika box tidak valid."""
+    height, width = img.shape[:2]
+    x, y, w, h = (int(face_box.get(key, 0)) for key in ("x", "y", "w", "h"))
+    if w <= 0 or h <= 0:
+        return None
+    mx, my = int(w * margin), int(h * margin)
+    x0, y0 = max(0, x - mx), max(0, y - my)
+    x1, y1 = min(width, x + w + mx), min(height, y + h + my)
+    if x1 <= x0 or y1 <= y0:
+        return None
+    return img[y0:y1, x0:x1]
+
+
+def to_model_input(face_bgr, model_name=DEFAULT_MODEL):
+    """Crop wajah BGR (uint8 atau [0,1]) -> tensor (1, H, W, 3) ternormalisasi untuk model."""
+    target_size = get_recognition_model(model_name).input_shape
+    face = preprocessing.resize_image(img=face_bgr, target_size=(target_size[1], target_size[0]))
+    return preprocessing.normalize_input(img=face, normalization="base")
+
+
+def _eyes_of(area: dict):
+    """Landmark mata dari facial_area DeepFace (None jika detektor tidak menyediakannya)."""
+    if area.get("left_eye") and area.get("right_eye"):
+        return tuple((int(point[0]), int(point[1])) for point in (area["left_eye"], area["right_eye"]))
+    return None
+
+
+def detect_and_align_faces(image_bytes: bytes, model_name=DEFAULT_MODEL, detector_backend=DEFAULT_DETECTOR,
+                           with_regions=False, face_box=None, pre_cropped=False, check_quality=True):
+    """
+    Deteksi + alignment wajah lalu resize/normalisasi ke ukuran input model,
+    tanpa menjalankan model embedding.
+
+    - pre_cropped=True: gambar sudah berupa crop wajah dari klien, deteksi dilewati.
+    - face_box={'x','y','w','h'}: crop dari box klien, deteksi dilewati.
+    - Selain itu frame diperkecil ke MAX_DETECT_SIDE, dideteksi sekali, dan hanya
+      wajah terbesar yang diproses.
+    - check_quality=True: wajah diperiksa (blur, ukuran, kecerahan, pose) sebelum
+      disiapkan untuk model; melempar FaceQualityError (dengan .reason) jika ditolak.
+
+    Returns:
+        list of np.ndarray: Tensor wajah berbentuk (1, H, W, 3) (paling banyak satu, wajah terbesar).
+                            Mengembalikan list kosong ([]) jika tidak ada wajah.
+                            Jika with_regions=True, setiap item adalah tuple (tensor, facial_area)
+                            dengan facial_area = {'x', 'y', 'w', 'h'} pada gambar asli.
+    """
     try:
-        # 1. Konversi bytes (dari upload FastAPI) ke array numpy mentah
-        np_array = np.frombuffer(image_bytes, np.uint8)
-        # 2. Decode array bytes menjadi array gambar yang dapat dibaca OpenCV (cv2.imread)
-        img_array = cv2.imdecode(np_array, cv2.IMREAD_COLOR)
+        img_array = decode_image(image_bytes)
 
         if img_array is None:
-             print("❌ Gagal membaca bytes gambar. Mungkin format file tidak didukung.")
-             return []
-
-        # 3. DeepFace.represent: menerima numpy array (img_array)
-        results = DeepFace.represent(
-            img_path=img_array, # Menerima NumPy array, bukan path file
-            model_name=model_name,
-            enforce_detection=True, # Memaksa deteksi wajah
-            detector_backend='opencv' 
+            print("❌ Gagal membaca bytes gambar. Mungkin format file tidak didukung.")
+            return []
+
+        if pre_cropped or face_box:
+            face = img_array if pre_cropped else crop_box(img_array, face_box)
+            if face is None:
+                print("⚠️ Peringatan: Bounding box wajah dari klien tidak valid.")
+                return []
+            if pre_cropped:
+                height, width = img_array.shape[:2]
+                region = {"x": 0, "y": 0, "w": width, "h": height}
+            else:
+                region = {key: int(face_box.get(key, 0)) for key in ("x", "y", "w", "h")}
+            if check_quality:
+                check_face(face, face_size=min(region["w"], region["h"]))
+            tensor = to_model_input(face, model_name)
+            return [(tensor, region)] if with_regions else [tensor]
+
+        small, scale = downscale_for_detection(img_array)
+        face_objs = DeepFace.extract_faces(
+            img_path=small,
+            detector_backend=detector_backend,
+            enforce_detection=True,
+            align=True
         )
+    except FaceQualityError:
+        # Subkelas ValueError: harus diteruskan ke pemanggil (status low_quality + alasan), bukan "tidak terdeteksi"
+        raise
     except ValueError as ve:
-        # Menangani kesalahan spesifik DeepFace saat enforce_detection=True dan wajah tidak ditemukan
         print(f"⚠️ Peringatan: DeepFace gagal mendeteksi wajah atau membaca gambar. Detail: {ve}")
         return []
     except Exception as e:
-        # Menangani error umum lainnya
-        print(f"❌ ERROR Ekstraksi Fitur: {e}")
+        print(f"❌ ERROR Deteksi Wajah: {e}")
         return []
 
+    if not face_objs:
+        return []
+    # Hanya wajah terbesar (orang yang berdiri paling dekat ke kiosk)
+    face_obj = max(face_objs, key=lambda obj: obj.get("facial_area", {}).get("w", 0) * obj.get("facial_area", {}).get("h", 0))
+    area = face_obj.get("facial_area", {})
+    # extract_faces mengembalikan RGB [0,1]; model DeepFace mengharapkan BGR (sama seperti DeepFace.represent)
+    face = face_obj["face"][:, :, ::-1]
+    # Koordinat dikembalikan ke resolusi gambar asli (MIN_FACE_SIZE didefinisikan dalam piksel gambar asli)
+    region = {key: int(round(area.get(key, 0) * scale)) for key in ("x", "y", "w", "h")}
+    if check_quality:
+        # Pose dinilai pada box & landmark resolusi deteksi (rasio, tidak bergantung skala)
+        check_face(face, face_size=min(region["w"], region["h"]), box=area, eyes=_eyes_of(area))
+    tensor = to_model_input(face, model_name)
+    return [(tensor, region)] if with_regions else [tensor]
+
+
+def detect_faces_for_tracking(image_bytes: bytes, model_name=DEFAULT_MODEL, detector_backend=DEFAULT_DETECTOR, min_confidence=0.5):
+    """
+    Deteksi semua wajah pada satu frame stream (resolusi rendah) tanpa menjalankan embedding.
 
-    if not results:
+    Returns:
+        list of dict: {'box': {'x','y','w','h'}, 'eyes': ((lx, ly), (rx, ry)) atau None,
+                       'quality': hasil assess_face (blur/ukuran/kecerahan/pose),
+                       'tensor': (1, H, W, 3) siap untuk embed_face_batch}, koordinat pada frame asli.
+                       List kosong jika tidak ada wajah.
+    """
+    img_array = decode_image(image_bytes)
+    if img_array is None:
         return []
+    small, scale = downscale_for_detection(img_array)
+    try:
+        face_objs = DeepFace.extract_faces(img_path=small, detector_backend=detector_backend, enforce_detection=False, align=True)
+    except ValueError:
+        return []
+
+    detections = []
+    for face_obj in face_objs:
+        # enforce_detection=False mengembalikan seluruh frame dengan confidence 0 jika tidak ada wajah
+        if face_obj.get("confidence", 1) < min_confidence:
+            continue
+        area = face_obj.get("facial_area", {})
+        box = {key: int(round(area.get(key, 0) * scale)) for key in ("x", "y", "w", "h")}
+        eyes = _eyes_of(area)
+        if eyes:
+            eyes = tuple((int(x * scale), int(y * scale)) for x, y in eyes)
+        face = face_obj["face"][:, :, ::-1]
+        quality = assess_face(face, face_size=min(box["w"], box["h"]), box=area, eyes=_eyes_of(area))
+        detections.append({"box": box, "eyes": eyes, "quality": quality, "tensor": to_model_input(face, model_name)})
+    return detections
+
 
-    # Ambil embedding dari semua wajah yang dideteksi (meskipun main.py hanya akan menggunakan yang pertama)
-    embeddings_list = [res["embedding"] for res in results]
-    
-    # Kita mengembalikan list of list (Python list) agar mudah diproses di main.py 
-    # sebelum dikonversi ke string vector PostgreSQL.
-    return embeddings_list
+def embed_face_batch(crops, model_name=DEFAULT_MODEL):
+    """
+    Menjalankan model embedding sekali untuk satu batch tensor wajah.
+
+    Args:
+        crops (list of np.ndarray): Hasil detect_and_align_faces, masing-masing (1, H, W, 3).
+
+    Returns:
+        list of list[float]: Satu embedding per crop, urutan sama dengan input.
+    """
+    if not crops:
+        return []
+    batch = np.concatenate(crops, axis=0)
+    model = get_recognition_model(model_name)
+    embeddings = model.model(batch, training=False)
+    embeddings = embeddings.numpy() if hasattr(embeddings, "numpy") else np.asarray(embeddings)
+    return embeddings.tolist()
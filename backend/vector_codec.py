@@ -0,0 +1,151 @@
+# backend/vector_codec.py
+import io
+import struct
+
+import numpy as np
+from psycopg2.extensions import register_adapter, AsIs
+
+# --- CODEC VEKTOR pgvector ---
+# Satu tempat untuk semua konversi embedding <-> PostgreSQL, menggantikan
+# "[" + ",".join(map(str, embedding)) + "]" yang tersebar di main.py, train.py, dan migrate_embeddings.py.
+#
+# - Parameter query (satu vektor): bungkus dengan Vector(embedding). Adapter psycopg2 yang terdaftar
+#   menghasilkan literal float32 ringkas ('%.9g', presisi penuh float32) langsung ke SQL sebagai
+#   '[...]'::vector. psycopg2 hanya mendukung protokol teks untuk parameter, jadi jalur biner
+#   dipakai di operasi massal di bawah ini.
+# - Massal (indexing & memuat galeri): COPY ... (FORMAT binary). Format biner pgvector adalah
+#   int16 dim, int16 unused, lalu dim x float32 big-endian, sehingga pembacaan cukup
+#   np.frombuffer tanpa parsing teks.
+
+PGCOPY_SIGNATURE = b"PGCOPY\n\xff\r\n\x00"
+PGCOPY_HEADER = PGCOPY_SIGNATURE + struct.pack("!ii", 0, 0)
+PGCOPY_TRAILER = struct.pack("!h", -1)
+VECTOR_WIRE_DTYPE = np.dtype(">f4")
+
+
+class Vector:
+    """Pembungkus embedding untuk parameter query psycopg2 (dikonversi oleh adapter terdaftar)."""
+
+    __slots__ = ("array",)
+
+    def __init__(self, values):
+        self.array = np.asarray(values, dtype=np.float32).ravel()
+
+    def __len__(self):
+        return self.array.shape[0]
+
+
+def encode_text(values) -> str:
+    """Embedding -> literal teks pgvector '[v1,v2,...]' dengan presisi float32 (satu operasi format)."""
+    array = np.asarray(values, dtype=np.float32).ravel()
+    return "[" + (",".join(["%.9g"] * array.shape[0]) % tuple(array.tolist())) + "]"
+
+
+def decode_text(text: str) -> np.ndarray:
+    """Literal teks pgvector '[0.1,0.2,...]' -> array float32."""
+    return np.fromstring(text.strip()[1:-1], dtype=np.float32, sep=",")
+
+
+def _adapt_vector(vector: Vector):
+    return AsIs("'%s'::vector" % encode_text(vector.array))
+
+
+register_adapter(Vector, _adapt_vector)
+
+
+def encode_binary(values) -> bytes:
+    """Embedding -> representasi biner pgvector (untuk COPY FORMAT binary)."""
+    array = np.asarray(values, dtype=np.float32).ravel()
+    return struct.pack("!HH", array.shape[0], 0) + array.astype(VECTOR_WIRE_DTYPE).tobytes()
+
+
+def decode_binary(buffer, offset: int = 0) -> np.ndarray:
+    """Biner pgvector -> view float32 big-endian tanpa salinan (np.frombuffer)."""
+    dim = struct.unpack_from("!H", buffer, offset)[0]
+    return np.frombuffer(buffer, dtype=VECTOR_WIRE_DTYPE, count=dim, offset=offset + 4)
+
+
+# --- COPY BINER ---
+
+def _encode_field(value, kind: str) -> bytes:
+    if value is None:
+        return struct.pack("!i", -1)
+    if kind == "int4":
+        return struct.pack("!ii", 4, int(value))
+    if kind == "int8":
+        return struct.pack("!iq", 8, int(value))
+    if kind == "float8":
+        return struct.pack("!id", 8, float(value))
+    if kind == "text":
+        data = str(value).encode("utf-8")
+        return struct.pack("!i", len(data)) + data
+    if kind == "vector":
+        data = encode_binary(value)
+        return struct.pack("!i", len(data)) + data
+    raise ValueError(f"Tipe kolom COPY tidak didukung: {kind}")
+
+
+def encode_copy_binary(rows, kinds) -> bytes:
+    """Iterable baris -> payload COPY FORMAT binary. kinds: tipe per kolom (int4/int8/float8/text/vector)."""
+    parts = [PGCOPY_HEADER]
+    field_count = struct.pack("!h", len(kinds))
+    for row in rows:
+        parts.append(field_count)
+        parts.extend(_encode_field(value, kind) for value, kind in zip(row, kinds))
+    parts.append(PGCOPY_TRAILER)
+    return b"".join(parts)
+
+
+def copy_rows_binary(cur, table: str, columns, kinds, rows):
+    """INSERT massal dengan satu COPY FORMAT binary (embedding dikirim sebagai float32 biner)."""
+    payload = encode_copy_binary(rows, kinds)
+    cur.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT binary)", io.BytesIO(payload))
+
+
+def _decode_field(buffer, offset: int, length: int, kind: str):
+    if kind == "vector":
+        return decode_binary(buffer, offset)
+    if kind == "text":
+        return bytes(buffer[offset:offset + length]).decode("utf-8")
+    if kind == "int4":
+        return struct.unpack_from("!i", buffer, offset)[0]
+    if kind == "int8":
+        return struct.unpack_from("!q", buffer, offset)[0]
+    if kind == "float8":
+        return struct.unpack_from("!d", buffer, offset)[0]
+    raise ValueError(f"Tipe kolom COPY tidak didukung: {kind}")
+
+
+def decode_copy_binary(buffer, kinds) -> list:
+    """Payload COPY FORMAT binary -> list tuple. Kolom vector berupa view ke buffer (tanpa salinan)."""
+    buffer = memoryview(buffer)
+    if bytes(buffer[:len(PGCOPY_SIGNATURE)]) != PGCOPY_SIGNATURE:
+        raise ValueError("Payload bukan format COPY biner PostgreSQL.")
+    offset = len(PGCOPY_SIGNATURE) + 4
+    extension_length = struct.unpack_from("!i", buffer, offset)[0]
+    offset += 4 + extension_length
+
+    rows = []
+    while True:
+        field_count = struct.unpack_from("!h", buffer, offset)[0]
+        offset += 2
+        if field_count == -1:
+            return rows
+        row = []
+        for kind in kinds[:field_count]:
+            length = struct.unpack_from("!i", buffer, offset)[0]
+            offset += 4
+            if length == -1:
+                row.append(None)
+                continue
+            row.append(_decode_field(buffer, offset, length, kind))
+            offset += length
+        rows.append(tuple(row))
+
+
+def read_rows_binary(cur, query: str, params=None, kinds=()) -> list:
+    """Menjalankan SELECT lewat COPY (...) TO STDOUT (FORMAT binary) lalu men-decode hasilnya."""
+    sql = cur.mogrify(query, params).decode("utf-8") if params else query
+    buffer = io.BytesIO()
+    cur.copy_expert(f"COPY ({sql}) TO STDOUT WITH (FORMAT binary)", buffer)
+    return decode_copy_binary(buffer.getbuffer(), kinds)
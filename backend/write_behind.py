@@ -0,0 +1,186 @@
+# backend/write_behind.py
+import os
+import json
+import time
+import queue
+import threading
+
+# --- PIPELINE WRITE-BEHIND DENGAN JOURNAL ---
+# Penulisan yang tidak perlu ditunggu oleh response (snapshot gambar + log absensi)
+# dicatat dulu ke journal append-only, lalu diproses thread background dalam batch
+# (satu transaksi per batch). Jika proses crash, record yang belum di-ack di journal
+# diputar ulang saat startup berikutnya.
+#
+# Format journal (satu JSON per baris):
+#   {"seq": 12, ...record...}   -> record baru
+#   {"ack": 12}                 -> semua record dengan seq <= 12 sudah tersimpan
+
+
+class WriteBehindQueue:
+    """Antrian tulis asinkron dengan batching dan journal untuk pemulihan crash."""
+
+    def __init__(self, journal_path, apply_batch, batch_size: int = 50, flush_interval: float = 0.2,
+                 fsync: bool = True, max_retries: int = 5, on_failure=None):
+        """
+        Args:
+            apply_batch: fungsi list[record] -> None, harus idempoten (record bisa diputar ulang).
+            on_failure: fungsi opsional list[record] -> None, dipanggil jika batch gagal permanen.
+        """
+        self.journal_path = journal_path
+        self.apply_batch = apply_batch
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.max_retries = max_retries
+        self.on_failure = on_failure
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._journal = None
+        self._seq = 0
+        self._acked = 0
+        self._written = 0
+        self._batches = 0
+        self._failed = 0
+
+    # --- JOURNAL ---
+
+    def _append(self, entry: dict):
+        # Dipanggil di bawah self._lock. Hanya write + flush (ke page cache OS): fsync dilakukan
+        # worker sekali per batch (group commit), sehingga submit() tidak menunggu disk.
+        self._journal.write(json.dumps(entry, separators=(",", ":")) + "\n")
+        self._journal.flush()
+
+    def _sync(self):
+        """fsync journal sekali untuk seluruh record yang masuk sejak batch sebelumnya."""
+        if self.fsync and self._journal is not None:
+            os.fsync(self._journal.fileno())
+
+    def _replay(self):
+        """Membaca journal lama, mengembalikan record yang belum di-ack, lalu memadatkan journal."""
+        pending, acked, max_seq = [], 0, 0
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Baris terakhir bisa terpotong jika crash saat menulis
+                        continue
+                    if "ack" in entry:
+                        acked = max(acked, entry["ack"])
+                    else:
+                        pending.append(entry)
+                        max_seq = max(max_seq, entry["seq"])
+        pending = [r for r in pending if r["seq"] > acked]
+        self._seq = self._acked = max(max_seq, acked)
+        if pending:
+            self._acked = pending[0]["seq"] - 1
+
+        # Tulis ulang journal hanya berisi record yang masih tertunda
+        os.makedirs(os.path.dirname(self.journal_path) or ".", exist_ok=True)
+        tmp_path = f"{self.journal_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for record in pending:
+                f.write(json.dumps(record, separators=(",", ":")) + "\n")
+        os.replace(tmp_path, self.journal_path)
+        return pending
+
+    def _ack(self, seq: int):
+        with self._lock:
+            self._acked = seq
+            if self._acked >= self._seq and self._queue.empty():
+                # Semua record sudah tersimpan: journal bisa dikosongkan
+                self._journal.seek(0)
+                self._journal.truncate()
+            else:
+                self._append({"ack": seq})
+
+    # --- API ---
+
+    def start(self, on_replay=None) -> int:
+        """
+        Memutar ulang journal lalu menjalankan thread worker. Mengembalikan jumlah record yang diputar ulang.
+        on_replay (opsional, list[record] -> None) dipanggil dengan record tertunda sebelum worker berjalan,
+        mis. untuk menandai state di memori yang belum melihat record tsb di database.
+        """
+        pending = self._replay()
+        if on_replay is not None and pending:
+            on_replay(pending)
+        self._journal = open(self.journal_path, "a", encoding="utf-8")
+        for record in pending:
+            self._queue.put(record)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+        return len(pending)
+
+    def submit(self, record: dict) -> int:
+        """Mencatat record ke journal dan mengantrikannya. Tidak menunggu penulisan ke database."""
+        with self._lock:
+            self._seq += 1
+            record = {**record, "seq": self._seq}
+            self._append(record)
+            self._queue.put(record)
+        return record["seq"]
+
+    def stop(self, timeout: float = 10.0):
+        """Menghentikan worker setelah antrian dikosongkan (sebisa mungkin dalam batas waktu)."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        if self._journal is not None:
+            with self._lock:
+                self._journal.close()
+                self._journal = None
+
+    def stats(self) -> dict:
+        return {
+            "pending": self._queue.qsize(),
+            "written": self._written,
+            "batches": self._batches,
+            "failed": self._failed,
+            "last_seq": self._seq,
+            "acked_seq": self._acked,
+        }
+
+    # --- WORKER ---
+
+    def _collect(self):
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not (self._stop.is_set() and self._queue.empty()):
+            batch = self._collect()
+            if not batch:
+                continue
+            self._sync()
+            for attempt in range(1, self.max_retries + 1):
+                try:
+                    self.apply_batch(batch)
+                    self._written += len(batch)
+                    self._batches += 1
+                    break
+                except Exception as e:
+                    print(f"⚠️ Write-behind gagal (percobaan {attempt}/{self.max_retries}): {e}")
+                    if attempt == self.max_retries:
+                        self._failed += len(batch)
+                        if self.on_failure is not None:
+                            self.on_failure(batch)
+                    else:
+                        time.sleep(min(0.1 * 2 ** attempt, 5.0))
+            self._ack(batch[-1]["seq"])
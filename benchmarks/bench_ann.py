@@ -0,0 +1,146 @@
+# benchmarks/bench_ann.py
+"""
+Benchmark recall vs latensi pencarian ANN pada galeri sintetis 512-d.
+
+Jalankan dari root proyek:
+    python benchmarks/bench_ann.py                           # 10k & 100k vektor (NumPy IVF vs brute-force)
+    python benchmarks/bench_ann.py --sizes 10000,100000,1000000
+    python benchmarks/bench_ann.py --sizes 100000 --pgvector # + indeks HNSW pgvector (sweep ef_search)
+
+Galeri berisi cluster per identitas (PER_IDENTITY vektor di sekitar satu pusat), mirip embedding
+wajah nyata; query adalah sampel baru dari identitas yang ada. Ground truth = brute-force top-1.
+recall@1 = proporsi query yang tetangga terdekatnya sama persis dengan brute-force.
+Galeri 1 juta vektor butuh ~2 GB RAM (float32) dan k-means-nya memakan waktu beberapa puluh detik.
+"""
+import sys
+import time
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from backend.ivf_index import IVFIndex, default_nlist
+from backend.face_index import normalize_rows
+
+# --- KONFIGURASI BENCHMARK ---
+DIM = 512
+PER_IDENTITY = 10
+QUERIES = 300
+NPROBES = (1, 2, 4, 8, 16, 32, 64)
+EF_SEARCHES = (10, 20, 40, 80, 160)
+BENCH_TABLE = "bench_ann"
+
+DB_HOST = "localhost"
+DB_NAME = "vector_db"
+DB_USER = "macbookpro"
+DB_PASSWORD = "deepfacepass"
+
+
+def synthetic_gallery(size: int, seed: int = 7) -> tuple:
+    """Galeri (size, DIM) ternormalisasi + query dari identitas yang sama. Dibuat per potongan agar hemat memori."""
+    rng = np.random.default_rng(seed)
+    identities = max(1, size // PER_IDENTITY)
+    centers = rng.standard_normal((identities, DIM), dtype=np.float32)
+    matrix = np.empty((size, DIM), dtype=np.float32)
+    for start in range(0, size, 65536):
+        end = min(size, start + 65536)
+        owners = np.arange(start, end) % identities
+        matrix[start:end] = normalize_rows(centers[owners] + 0.8 * rng.standard_normal((end - start, DIM), dtype=np.float32))
+    owners = rng.integers(0, identities, QUERIES)
+    queries = normalize_rows(centers[owners] + 0.8 * rng.standard_normal((QUERIES, DIM), dtype=np.float32))
+    return matrix, queries
+
+
+def percentiles(samples) -> tuple:
+    return float(np.percentile(samples, 50)), float(np.percentile(samples, 99))
+
+
+def brute_force(matrix, queries) -> tuple:
+    truth, samples = [], []
+    for query in queries:
+        t0 = time.perf_counter()
+        truth.append(int(np.argmax(matrix @ query)))
+        samples.append((time.perf_counter() - t0) * 1e3)
+    return np.array(truth), samples
+
+
+def bench_ivf(matrix, queries, truth):
+    t0 = time.perf_counter()
+    index = IVFIndex(nlist=default_nlist(matrix.shape[0])).build(matrix)
+    print(f"  IVF build: nlist={index.nlist}, {time.perf_counter() - t0:.1f}s")
+    for nprobe in NPROBES:
+        if nprobe > index.nlist:
+            break
+        hits, samples = 0, []
+        for query, expected in zip(queries, truth):
+            t0 = time.perf_counter()
+            ids, _ = index.search(query, k=1, nprobe=nprobe)
+            samples.append((time.perf_counter() - t0) * 1e3)
+            hits += int(ids.shape[0] > 0 and ids[0] == expected)
+        p50, p99 = percentiles(samples)
+        print(f"  {'ivf nprobe=' + str(nprobe):<22} | {hits / len(queries):>8.3f} | {p50:>8.3f} | {p99:>8.3f}")
+
+
+def bench_pgvector(matrix, queries, truth):
+    """Memuat galeri ke tabel sementara, membangun HNSW, lalu menyapu hnsw.ef_search."""
+    import psycopg2
+    from backend.train import HNSW_M, HNSW_EF_CONSTRUCTION
+    from backend.vector_codec import Vector, copy_rows_binary
+
+    try:
+        conn = psycopg2.connect(host=DB_HOST, database=DB_NAME, user=DB_USER, password=DB_PASSWORD)
+    except psycopg2.Error as e:
+        print(f"  ⚠️ pgvector dilewati: PostgreSQL tidak dapat dihubungi ({e})")
+        return
+    cur = conn.cursor()
+    cur.execute(f"DROP TABLE IF EXISTS {BENCH_TABLE}")
+    cur.execute(f"CREATE TABLE {BENCH_TABLE} (id INTEGER PRIMARY KEY, embedding vector({DIM}))")
+    copy_rows_binary(cur, BENCH_TABLE, ("id", "embedding"), ("int4", "vector"), enumerate(matrix))
+    t0 = time.perf_counter()
+    cur.execute(f"CREATE INDEX ON {BENCH_TABLE} USING hnsw (embedding vector_cosine_ops) "
+                f"WITH (m = {HNSW_M}, ef_construction = {HNSW_EF_CONSTRUCTION})")
+    cur.execute(f"ANALYZE {BENCH_TABLE}")
+    conn.commit()
+    print(f"  HNSW build: m={HNSW_M}, ef_construction={HNSW_EF_CONSTRUCTION}, {time.perf_counter() - t0:.1f}s")
+
+    for ef_search in EF_SEARCHES:
+        cur.execute(f"SET hnsw.ef_search = {ef_search}")
+        hits, samples = 0, []
+        for query, expected in zip(queries, truth):
+            t0 = time.perf_counter()
+            cur.execute(f"SELECT id FROM {BENCH_TABLE} ORDER BY embedding <=> %s LIMIT 1", (Vector(query),))
+            row = cur.fetchone()
+            samples.append((time.perf_counter() - t0) * 1e3)
+            hits += int(row is not None and row[0] == expected)
+        p50, p99 = percentiles(samples)
+        print(f"  {'hnsw ef_search=' + str(ef_search):<22} | {hits / len(queries):>8.3f} | {p50:>8.3f} | {p99:>8.3f}")
+
+    cur.execute(f"DROP TABLE {BENCH_TABLE}")
+    conn.commit()
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall vs latensi ANN (IVF NumPy & HNSW pgvector).")
+    parser.add_argument("--sizes", default="10000,100000", help="Ukuran galeri, dipisah koma.")
+    parser.add_argument("--pgvector", action="store_true", help="Ikut ukur indeks HNSW di PostgreSQL.")
+    args = parser.parse_args()
+
+    for size in (int(s) for s in args.sizes.split(",")):
+        print(f"\n⏳ Galeri sintetis {size:,} x {DIM}d, {QUERIES} query")
+        matrix, queries = synthetic_gallery(size)
+        truth, samples = brute_force(matrix, queries)
+        p50, p99 = percentiles(samples)
+        print(f"  {'metode':<22} | {'recall@1':>8} | {'p50 ms':>8} | {'p99 ms':>8}")
+        print("  " + "-" * 56)
+        print(f"  {'brute-force':<22} | {1.0:>8.3f} | {p50:>8.3f} | {p99:>8.3f}")
+        bench_ivf(matrix, queries, truth)
+        if args.pgvector:
+            bench_pgvector(matrix, queries, truth)
+
+
+if __name__ == "__main__":
+    main()
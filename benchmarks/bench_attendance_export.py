@@ -0,0 +1,131 @@
+# benchmarks/bench_attendance_export.py
+"""
+Benchmark riwayat absensi: fetchall() + list of dict (cara lama) vs ekspor streaming
+per potongan keyset, serta biaya satu halaman OFFSET vs keyset di posisi yang dalam.
+
+Jalankan dari root proyek:
+    python benchmarks/bench_attendance_export.py [jumlah_baris]
+Default 1.000.000 baris log sintetis selama 60 hari. Memori diukur dengan tracemalloc (puncak).
+"""
+import os
+import sys
+import time
+import random
+import sqlite3
+import tempfile
+import tracemalloc
+from pathlib import Path
+from datetime import datetime, timedelta
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from backend.attendance_schema import migrate_attendance_logs, attendance_timestamp
+from backend.attendance_history import day_epoch_range, fetch_page, iter_rows, stream_ndjson, stream_csv, encode_cursor
+
+TOTAL_ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+DAYS = 60
+PAGE_SIZE = 100
+START = datetime(2025, 1, 1, 7, 0, 0)
+
+
+class _Conn:
+    """Koneksi yang close()-nya no-op, meniru PooledConnection dari SqlitePool."""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def execute(self, *args):
+        return self._conn.execute(*args)
+
+    def close(self):
+        pass
+
+
+def synthetic_rows(total):
+    rng = random.Random(11)
+    span_seconds = DAYS * 24 * 3600
+    for i in range(total):
+        absent_at, log_date, epoch = attendance_timestamp(START + timedelta(seconds=rng.randrange(span_seconds)))
+        yield (f"Intern {i % 300}", "Bench", f"/images/{log_date.replace('-', '')}_{i}.jpg", absent_at, log_date, epoch)
+
+
+def measure(fn):
+    # Waktu diukur tanpa tracemalloc (overhead tracing besar); puncak memori di putaran kedua
+    t0 = time.perf_counter()
+    result = fn()
+    seconds = time.perf_counter() - t0
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, seconds, peak / (1024 * 1024)
+
+
+def main():
+    end_date = (START + timedelta(days=DAYS)).date().isoformat()
+    start_epoch, end_epoch = day_epoch_range(START.date().isoformat(), end_date)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(os.path.join(tmp, "bench.db"))
+        migrate_attendance_logs(conn)
+        print(f"⏳ Mengisi {TOTAL_ROWS:,} baris log sintetis...")
+        conn.executemany(
+            "INSERT INTO attendance_logs (intern_name, instansi, image_url, absent_at, log_date, absent_epoch) VALUES (?, ?, ?, ?, ?, ?)",
+            synthetic_rows(TOTAL_ROWS)
+        )
+        conn.commit()
+        conn.execute("ANALYZE")
+        pooled = _Conn(conn)
+
+        def legacy_export():
+            rows = conn.execute(
+                "SELECT log_id, intern_name, instansi, absent_at, log_date, image_url FROM attendance_logs "
+                "WHERE absent_epoch >= ? AND absent_epoch < ? ORDER BY absent_epoch DESC, log_id DESC",
+                (start_epoch, end_epoch)
+            ).fetchall()
+            items = [{"log_id": r[0], "name": r[1], "instansi": r[2], "timestamp": r[3], "date": r[4], "image_path": r[5]} for r in rows]
+            return len(items)
+
+        def streamed(encoder):
+            def run():
+                total = 0
+                for chunk in encoder(iter_rows(lambda: pooled, start_epoch, end_epoch)):
+                    total += len(chunk)
+                return total
+            return run
+
+        results = {
+            "fetchall + list[dict]": measure(legacy_export),
+            "stream NDJSON": measure(streamed(stream_ndjson)),
+            "stream CSV": measure(streamed(stream_csv)),
+        }
+
+        # Halaman di posisi dalam (mis. 90% dari rentang): OFFSET memindai semua baris sebelumnya
+        deep_offset = int(TOTAL_ROWS * 0.9)
+        t0 = time.perf_counter()
+        conn.execute(
+            "SELECT log_id, intern_name, instansi, absent_at, log_date, image_url, absent_epoch FROM attendance_logs "
+            "WHERE absent_epoch >= ? AND absent_epoch < ? ORDER BY absent_epoch DESC, log_id DESC LIMIT ? OFFSET ?",
+            (start_epoch, end_epoch, PAGE_SIZE, deep_offset)
+        ).fetchall()
+        offset_ms = (time.perf_counter() - t0) * 1000
+
+        anchor = conn.execute(
+            "SELECT absent_epoch, log_id FROM attendance_logs ORDER BY absent_epoch DESC, log_id DESC LIMIT 1 OFFSET ?",
+            (deep_offset - 1,)
+        ).fetchone()
+        t0 = time.perf_counter()
+        fetch_page(conn, start_epoch, end_epoch, PAGE_SIZE, encode_cursor(*anchor))
+        keyset_ms = (time.perf_counter() - t0) * 1000
+        conn.close()
+
+    print(f"\n{'mode':<24} | {'waktu (s)':>9} | {'puncak memori (MB)':>18}")
+    print("-" * 58)
+    for name, (_, seconds, peak_mb) in results.items():
+        print(f"{name:<24} | {seconds:>9.2f} | {peak_mb:>18.1f}")
+    print(f"\nHalaman {PAGE_SIZE} baris di offset {deep_offset:,}: OFFSET {offset_ms:.2f} ms vs keyset {keyset_ms:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
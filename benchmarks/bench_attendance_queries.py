@@ -0,0 +1,107 @@
+# benchmarks/bench_attendance_queries.py
+"""
+Benchmark query laporan attendance_logs: skema lama (LIKE/SUBSTR, tanpa indeks)
+vs skema baru (log_date + indeks komposit, range scan).
+
+Jalankan dari root proyek:
+    python benchmarks/bench_attendance_queries.py [jumlah_baris]
+Default 2.000.000 baris log sintetis selama 3 tahun.
+"""
+import os
+import sys
+import time
+import random
+import sqlite3
+import tempfile
+from pathlib import Path
+from datetime import datetime, timedelta
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from backend.attendance_schema import migrate_attendance_logs, month_range
+
+TOTAL_ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+INTERNS = 300
+YEARS = 3
+REPEAT = 5
+
+LEGACY_DDL = """
+    CREATE TABLE attendance_logs (
+        log_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        intern_id INTEGER,
+        intern_name TEXT NOT NULL,
+        instansi TEXT,
+        image_url TEXT,
+        absent_at TEXT
+    );
+"""
+
+
+def synthetic_rows(total):
+    rng = random.Random(7)
+    start = datetime(2023, 1, 2, 7, 0, 0)
+    span_seconds = YEARS * 365 * 24 * 3600
+    for _ in range(total):
+        intern_id = rng.randrange(1, INTERNS + 1)
+        ts = start + timedelta(seconds=rng.randrange(span_seconds))
+        yield (intern_id, f"Intern {intern_id}", "Bench", f"/images/{intern_id}.jpg", ts.strftime("%Y-%m-%d %H:%M:%S"))
+
+
+def timed(cursor, sql, params):
+    best = float("inf")
+    for _ in range(REPEAT):
+        t0 = time.perf_counter()
+        cursor.execute(sql, params).fetchall()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+
+def main():
+    day = "2024-06-14"
+    year, month = 2024, 6
+    month_start, month_end = month_range(year, month)
+    like_day, like_month = f"{day}%", f"{year}-{month:02d}%"
+
+    legacy_queries = {
+        "today": ("SELECT intern_name, instansi, absent_at, image_url FROM attendance_logs WHERE absent_at LIKE ? ORDER BY absent_at DESC", (like_day,)),
+        "by-date": ("SELECT intern_name, instansi, MAX(absent_at), image_url FROM attendance_logs WHERE absent_at LIKE ? GROUP BY intern_name, instansi, image_url", (like_day,)),
+        "monthly": ("SELECT COUNT(*), COUNT(DISTINCT SUBSTR(absent_at, 1, 10)) FROM attendance_logs WHERE absent_at LIKE ?", (like_month,)),
+        "dates": ("SELECT DISTINCT SUBSTR(absent_at, 1, 10) FROM attendance_logs", ()),
+    }
+    new_queries = {
+        "today": ("SELECT intern_name, instansi, absent_at, image_url FROM attendance_logs WHERE log_date = ? ORDER BY absent_epoch DESC, log_id DESC", (day,)),
+        "by-date": ("SELECT intern_name, instansi, MAX(absent_at), image_url FROM attendance_logs WHERE log_date = ? GROUP BY intern_name, instansi, image_url", (day,)),
+        "monthly": ("SELECT COUNT(*), COUNT(DISTINCT log_date) FROM attendance_logs WHERE log_date >= ? AND log_date < ?", (month_start, month_end)),
+        "dates": ("SELECT DISTINCT log_date FROM attendance_logs", ()),
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(os.path.join(tmp, "bench.db"))
+        conn.execute(LEGACY_DDL)
+        print(f"⏳ Mengisi {TOTAL_ROWS:,} baris log sintetis...")
+        conn.executemany(
+            "INSERT INTO attendance_logs (intern_id, intern_name, instansi, image_url, absent_at) VALUES (?, ?, ?, ?, ?)",
+            synthetic_rows(TOTAL_ROWS)
+        )
+        conn.commit()
+        cursor = conn.cursor()
+
+        legacy = {name: timed(cursor, sql, params) for name, (sql, params) in legacy_queries.items()}
+
+        t0 = time.perf_counter()
+        migrate_attendance_logs(conn)
+        print(f"🔧 Migrasi + backfill + indeks: {time.perf_counter() - t0:.1f}s")
+        cursor.execute("ANALYZE")
+
+        new = {name: timed(cursor, sql, params) for name, (sql, params) in new_queries.items()}
+        conn.close()
+
+    print(f"\n{'query':<10} | {'lama (ms)':>10} | {'baru (ms)':>10} | {'speed-up':>8}")
+    print("-" * 48)
+    for name in legacy_queries:
+        print(f"{name:<10} | {legacy[name]:>10.2f} | {new[name]:>10.2f} | {legacy[name] / max(new[name], 1e-6):>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
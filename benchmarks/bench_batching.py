@@ -0,0 +1,50 @@
+# benchmarks/bench_batching.py
+"""
+Benchmark throughput model embedding (ArcFace, CPU) untuk ukuran batch 1 s/d 32.
+
+Jalankan dari root proyek:
+    python benchmarks/bench_batching.py
+"""
+import os
+import sys
+import time
+from pathlib import Path
+
+os.environ.setdefault("CUDA_VISIBLE_DEVICES", "-1")  # Paksa CPU
+
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from deepface import DeepFace
+from backend.utils import embed_face_batch
+
+MODEL = "ArcFace"
+BATCH_SIZES = [1, 2, 4, 8, 16, 32]
+TOTAL_FACES = 256
+
+
+def main():
+    width, height = DeepFace.build_model(MODEL).input_shape
+    rng = np.random.default_rng(0)
+    crops = [rng.random((1, height, width, 3), dtype=np.float32) for _ in range(TOTAL_FACES)]
+
+    # Pemanasan graph agar tracing tidak ikut terukur
+    for size in BATCH_SIZES:
+        embed_face_batch(crops[:size], model_name=MODEL)
+
+    print(f"{'batch':>6} | {'wajah/detik':>12} | {'ms/batch':>9}")
+    print("-" * 34)
+    for size in BATCH_SIZES:
+        t0 = time.perf_counter()
+        batches = 0
+        for start in range(0, TOTAL_FACES, size):
+            embed_face_batch(crops[start:start + size], model_name=MODEL)
+            batches += 1
+        elapsed = time.perf_counter() - t0
+        print(f"{size:>6} | {TOTAL_FACES / elapsed:>12.1f} | {elapsed / batches * 1000:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+# benchmarks/bench_face_index.py
+"""
+Benchmark latensi pencarian wajah: indeks NumPy di memori vs query pgvector per request.
+Jalur memori diukur dua kali: argmax top-1 (jalur lama) vs top-k per identitas (search_topk),
+untuk memastikan agregasi best-of-N tidak menambah biaya berarti di atas perkalian matriks.
+
+Jalankan dari root proyek:
+    python benchmarks/bench_face_index.py
+Jalur SQL dilewati otomatis jika PostgreSQL tidak dapat dihubungi.
+"""
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from backend.face_index import FaceIndex, normalize_rows
+
+# --- KONFIGURASI BENCHMARK ---
+SIZES = [10, 1_000, 100_000]
+DIM = 512
+QUERIES = 200
+PER_IDENTITY = 15
+TOP_K = 3
+BENCH_TABLE = "bench_intern_embeddings"
+
+DB_HOST = "localhost"
+DB_NAME = "vector_db"
+DB_USER = "macbookpro"
+DB_PASSWORD = "deepfacepass"
+
+
+def percentiles(samples_ms):
+    return np.percentile(samples_ms, 50), np.percentile(samples_ms, 99)
+
+
+def bench_memory(vectors, queries):
+    """Returns {jalur: (p50, p99)} untuk argmax top-1 dan search_topk."""
+    index = FaceIndex(dim=DIM)
+    index.load((f"p{i // PER_IDENTITY}", "bench", v) for i, v in enumerate(vectors))
+    matrix = normalize_rows(vectors)
+    paths = {
+        "argmax": lambda q: int(np.argmax(matrix @ normalize_rows(q)[0])),
+        f"top-{TOP_K}": lambda q: index.search_topk(q, TOP_K),
+    }
+    results = {}
+    for label, search in paths.items():
+        samples = []
+        for q in queries:
+            t0 = time.perf_counter()
+            search(q)
+            samples.append((time.perf_counter() - t0) * 1000)
+        results[label] = percentiles(samples)
+    return results
+
+
+def bench_sql(vectors, queries):
+    """Meniru jalur lama recognize_face: koneksi baru + ORDER BY <=> LIMIT 1 per query."""
+    import psycopg2
+    from psycopg2.extras import execute_values
+
+    def connect():
+        return psycopg2.connect(host=DB_HOST, database=DB_NAME, user=DB_USER, password=DB_PASSWORD)
+
+    conn = connect()
+    cur = conn.cursor()
+    cur.execute(f"DROP TABLE IF EXISTS {BENCH_TABLE}")
+    cur.execute(f"CREATE TABLE {BENCH_TABLE} (id SERIAL PRIMARY KEY, name VARCHAR(100), instansi VARCHAR(100), embedding vector({DIM}))")
+    execute_values(
+        cur,
+        f"INSERT INTO {BENCH_TABLE} (name, instansi, embedding) VALUES %s",
+        [(f"p{i}", "bench", "[" + ",".join(map(str, v)) + "]") for i, v in enumerate(vectors)],
+        template="(%s, %s, %s::vector)",
+        page_size=1000,
+    )
+    conn.commit()
+    conn.close()
+
+    samples = []
+    for q in queries:
+        t0 = time.perf_counter()
+        conn = connect()
+        cur = conn.cursor()
+        vector_string = "[" + ",".join(map(str, q)) + "]"
+        cur.execute(f"""
+            SELECT name, instansi, embedding <=> '{vector_string}'::vector AS distance
+            FROM {BENCH_TABLE}
+            ORDER BY distance ASC
+            LIMIT 1
+        """)
+        cur.fetchone()
+        conn.close()
+        samples.append((time.perf_counter() - t0) * 1000)
+
+    conn = connect()
+    conn.cursor().execute(f"DROP TABLE IF EXISTS {BENCH_TABLE}")
+    conn.commit()
+    conn.close()
+    return percentiles(samples)
+
+
+def main():
+    rng = np.random.default_rng(42)
+    queries = rng.standard_normal((QUERIES, DIM)).astype(np.float32)
+    print(f"{'N':>8} | {'jalur':<8} | {'p50 (ms)':>9} | {'p99 (ms)':>9}")
+    print("-" * 44)
+    sql_available = True
+    for n in SIZES:
+        vectors = rng.standard_normal((n, DIM)).astype(np.float32)
+        for label, (p50, p99) in bench_memory(vectors, queries).items():
+            print(f"{n:>8} | {label:<8} | {p50:>9.3f} | {p99:>9.3f}")
+        if not sql_available:
+            continue
+        try:
+            p50, p99 = bench_sql(vectors, queries)
+            print(f"{n:>8} | {'pgvector':<8} | {p50:>9.3f} | {p99:>9.3f}")
+        except Exception as e:
+            sql_available = False
+            print(f"⚠️ Jalur SQL dilewati (PostgreSQL tidak tersedia): {e}")
+
+
+if __name__ == "__main__":
+    main()
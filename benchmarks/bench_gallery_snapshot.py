@@ -0,0 +1,72 @@
+# benchmarks/bench_gallery_snapshot.py
+"""
+Benchmark cold start galeri: membuka snapshot np.memmap vs membaca salinan penuh ke memori.
+
+Jalankan dari root proyek:
+    python benchmarks/bench_gallery_snapshot.py                 # 10k & 100k vektor
+    python benchmarks/bench_gallery_snapshot.py --sizes 1000000
+
+Per ukuran galeri: waktu tulis snapshot, waktu buka (memmap vs np.fromfile ke memori),
+dan latensi pencarian pertama/berikutnya (pencarian pertama memicu page fault di memmap).
+"""
+import sys
+import time
+import tempfile
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from backend.face_index import FaceIndex, normalize_rows
+from backend.gallery_snapshot import write_snapshot, open_snapshot
+
+DIM = 512
+METADATA = ("ArcFace", DIM, "l2")
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - t0) * 1e3
+
+
+def bench(size: int, workdir: Path):
+    rng = np.random.default_rng(5)
+    matrix = normalize_rows(rng.standard_normal((size, DIM), dtype=np.float32))
+    names = np.array([f"p{i // 10}" for i in range(size)], dtype=object)
+    instansi = np.array(["bench"] * size, dtype=object)
+    path = workdir / f"bench_{size}.gallery"
+
+    nbytes, write_ms = timed(lambda: write_snapshot(path, matrix, names, instansi, METADATA, "bench"))
+    snapshot, open_ms = timed(lambda: open_snapshot(path, METADATA))
+    copy, copy_ms = timed(lambda: np.fromfile(path, dtype="<f4", count=size * DIM,
+                                              offset=snapshot[3]["matrix_offset"]).reshape(size, DIM))
+
+    index = FaceIndex(dim=DIM)
+    _, load_ms = timed(lambda: index.load_arrays(*snapshot[:3]))
+    query = matrix[size // 2]
+    _, first_ms = timed(lambda: index.search(query))
+    _, warm_ms = timed(lambda: index.search(query))
+    assert np.array_equal(np.asarray(snapshot[0]), copy)
+
+    print(f"{size:>9,} | {nbytes / 1e6:>8.1f} | {write_ms:>8.1f} | {open_ms + load_ms:>9.2f} | {copy_ms:>9.1f} | "
+          f"{first_ms:>9.2f} | {warm_ms:>9.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold start snapshot galeri (memmap) vs salinan penuh.")
+    parser.add_argument("--sizes", default="10000,100000", help="Ukuran galeri, dipisah koma.")
+    args = parser.parse_args()
+
+    print(f"{'vektor':>9} | {'MB':>8} | {'tulis ms':>8} | {'memmap ms':>9} | {'salin ms':>9} | {'cari-1 ms':>9} | {'cari-2 ms':>9}")
+    print("-" * 80)
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in (int(s) for s in args.sizes.split(",")):
+            bench(size, Path(workdir))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+# benchmarks/bench_vector_codec.py
+"""
+Microbenchmark codec vektor: literal teks lama ("[" + ",".join(map(str, v)) + "]")
+vs vector_codec (literal float32 ringkas & format biner pgvector).
+
+Jalankan dari root proyek:
+    python benchmarks/bench_vector_codec.py
+Bagian transfer (memuat galeri dari PostgreSQL: embedding::text vs COPY biner) dilewati
+otomatis jika PostgreSQL tidak dapat dihubungi.
+"""
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from backend.vector_codec import encode_text, decode_text, encode_binary, decode_binary, copy_rows_binary, read_rows_binary
+
+# --- KONFIGURASI BENCHMARK ---
+DIM = 512
+ITERATIONS = 2_000
+TRANSFER_ROWS = 20_000
+BENCH_TABLE = "bench_vector_codec"
+
+DB_HOST = "localhost"
+DB_NAME = "vector_db"
+DB_USER = "macbookpro"
+DB_PASSWORD = "deepfacepass"
+
+
+def legacy_encode(vector):
+    return "[" + ",".join(map(str, vector)) + "]"
+
+
+def legacy_decode(text):
+    return np.array(text.strip("[]").split(","), dtype=np.float32)
+
+
+def per_call_us(fn, arg):
+    t0 = time.perf_counter()
+    for _ in range(ITERATIONS):
+        fn(arg)
+    return (time.perf_counter() - t0) / ITERATIONS * 1e6
+
+
+def bench_codec():
+    vector = np.random.default_rng(0).standard_normal(DIM).astype(np.float32)
+    as_list = vector.tolist()  # jalur lama menerima list float Python dari DeepFace
+    legacy_text, compact_text, binary = legacy_encode(as_list), encode_text(vector), encode_binary(vector)
+
+    assert np.allclose(decode_text(compact_text), vector) and np.array_equal(decode_binary(binary), vector)
+    print(f"{'operasi':<34} | {'µs/vektor':>10} | {'bytes':>7}")
+    print("-" * 58)
+    rows = [
+        ("encode teks lama (map(str))", per_call_us(legacy_encode, as_list), len(legacy_text)),
+        ("encode teks ringkas (%.9g)", per_call_us(encode_text, vector), len(compact_text)),
+        ("encode biner pgvector", per_call_us(encode_binary, vector), len(binary)),
+        ("decode teks lama (split)", per_call_us(legacy_decode, legacy_text), len(legacy_text)),
+        ("decode teks (np.fromstring)", per_call_us(decode_text, compact_text), len(compact_text)),
+        ("decode biner (np.frombuffer)", per_call_us(decode_binary, binary), len(binary)),
+    ]
+    for name, micros, size in rows:
+        print(f"{name:<34} | {micros:>10.2f} | {size:>7}")
+
+
+def bench_transfer():
+    import psycopg2
+
+    conn = psycopg2.connect(host=DB_HOST, database=DB_NAME, user=DB_USER, password=DB_PASSWORD)
+    cur = conn.cursor()
+    cur.execute(f"DROP TABLE IF EXISTS {BENCH_TABLE}")
+    cur.execute(f"CREATE TABLE {BENCH_TABLE} (id SERIAL PRIMARY KEY, name VARCHAR(100), instansi VARCHAR(100), embedding vector({DIM}))")
+    vectors = np.random.default_rng(1).standard_normal((TRANSFER_ROWS, DIM)).astype(np.float32)
+
+    t0 = time.perf_counter()
+    copy_rows_binary(cur, BENCH_TABLE, ("name", "instansi", "embedding"), ("text", "text", "vector"),
+                     ((f"p{i}", "bench", v) for i, v in enumerate(vectors)))
+    conn.commit()
+    write_binary = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    cur.execute(f"SELECT name, instansi, embedding::text FROM {BENCH_TABLE}")
+    text_rows = [(n, i, legacy_decode(v)) for n, i, v in cur.fetchall()]
+    read_text = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    binary_rows = read_rows_binary(cur, f"SELECT name, instansi, embedding FROM {BENCH_TABLE}", kinds=("text", "text", "vector"))
+    read_binary = time.perf_counter() - t0
+    assert len(text_rows) == len(binary_rows) == TRANSFER_ROWS
+
+    cur.execute(f"DROP TABLE {BENCH_TABLE}")
+    conn.commit()
+    conn.close()
+    print(f"\nTransfer {TRANSFER_ROWS:,} vektor {DIM}-d:")
+    print(f"   COPY biner tulis           : {write_binary:.2f}s")
+    print(f"   SELECT embedding::text baca: {read_text:.2f}s")
+    print(f"   COPY biner baca            : {read_binary:.2f}s ({read_text / max(read_binary, 1e-9):.1f}x)")
+
+
+def main():
+    bench_codec()
+    try:
+        bench_transfer()
+    except Exception as e:
+        print(f"\n⚠️ Benchmark transfer PostgreSQL dilewati: {e}")
+
+
+if __name__ == "__main__":
+    main()
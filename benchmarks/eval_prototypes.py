@@ -0,0 +1,140 @@
+# benchmarks/eval_prototypes.py
+"""
+Evaluasi akurasi & latensi galeri prototipe (centroid + k medoid) vs galeri penuh.
+
+Data nyata (butuh DeepFace, dijalankan dari root proyek):
+    python benchmarks/eval_prototypes.py
+  - Galeri: backend/faces/<nama>/*, setiap gambar ke-HOLDOUT_EVERY per intern ditahan sebagai probe.
+  - Probe tambahan: backend/captured_images/<timestamp>_<nama>.jpg (label dari nama file).
+Data sintetis (hanya NumPy), untuk melihat latensi pada galeri besar:
+    python benchmarks/eval_prototypes.py --synthetic 2000
+
+Metrik per konfigurasi: akurasi (dikenali dengan nama benar), false accept, false reject,
+persentase fallback ke galeri penuh, dan latensi p50/p99 per pencarian.
+"""
+import re
+import sys
+import time
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from backend.face_index import FaceIndex
+
+FACES_DIR = PROJECT_ROOT / "backend" / "faces"
+CAPTURED_DIR = PROJECT_ROOT / "backend" / "captured_images"
+HOLDOUT_EVERY = 5
+DIM = 512
+# (label, prototype_medoids): None = galeri penuh (perilaku default)
+CONFIGS = [("penuh", None), ("centroid", 0), ("centroid+1", 1), ("centroid+2", 2), ("centroid+3", 3)]
+
+
+def clean_name(name: str) -> str:
+    """Sama dengan penamaan file snapshot di /recognize."""
+    return name.replace(' ', '_').replace('.', '').lower()
+
+
+def load_real_data():
+    from backend.train import scan_image_files, embed_images_parallel
+
+    scanned = scan_image_files(FACES_DIR)
+    by_person = {}
+    for path, (person, _) in sorted(scanned.items()):
+        by_person.setdefault(person, []).append(path)
+
+    gallery_paths, probe_paths = [], []
+    for person, paths in by_person.items():
+        for i, path in enumerate(paths):
+            (probe_paths if i % HOLDOUT_EVERY == HOLDOUT_EVERY - 1 else gallery_paths).append((path, person))
+
+    known = {clean_name(person): person for person in by_person}
+    if CAPTURED_DIR.exists():
+        for path in sorted(CAPTURED_DIR.glob("*.jpg")):
+            match = re.match(r"^\d{8}_\d{6}_(.+)\.jpg$", path.name)
+            if match and match.group(1) in known:
+                probe_paths.append((str(path), known[match.group(1)]))
+
+    print(f"⏳ Embedding {len(gallery_paths)} gambar galeri + {len(probe_paths)} probe...")
+    embeddings, _ = embed_images_parallel([p for p, _ in gallery_paths + probe_paths])
+    gallery = [(person, embeddings[p]) for p, person in gallery_paths if embeddings.get(p) is not None]
+    probes = [(person, embeddings[p]) for p, person in probe_paths if embeddings.get(p) is not None]
+    return gallery, probes
+
+
+def load_synthetic_data(identities: int, per_identity: int = 15, probes_per_identity: int = 2, seed: int = 3):
+    """Cluster per identitas dengan beberapa 'mode pose'; probe diambil dari distribusi yang sama."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((identities, DIM)).astype(np.float32)
+    gallery, probes = [], []
+    for i, center in enumerate(centers):
+        modes = center + 0.6 * rng.standard_normal((3, DIM)).astype(np.float32)
+        for j in range(per_identity + probes_per_identity):
+            vector = modes[j % 3] + 0.5 * rng.standard_normal(DIM).astype(np.float32)
+            (gallery if j < per_identity else probes).append((f"p{i}", vector))
+    # Probe orang tak terdaftar: seharusnya ditolak
+    for _ in range(max(1, identities // 10)):
+        probes.append((None, rng.standard_normal(DIM).astype(np.float32) * 1.5))
+    return gallery, probes
+
+
+def evaluate(gallery, probes, medoids, threshold, margin):
+    index = FaceIndex(dim=DIM, prototype_medoids=medoids, fallback_band=(threshold - margin, threshold + margin))
+    index.load((person, "eval", vector) for person, vector in gallery)
+
+    correct = false_accept = false_reject = 0
+    samples = []
+    for person, vector in probes:
+        t0 = time.perf_counter()
+        name, _, distance = index.search(vector)
+        samples.append((time.perf_counter() - t0) * 1e6)
+        accepted = distance <= threshold
+        if accepted and name == person:
+            correct += 1
+        elif accepted:
+            false_accept += 1
+        elif person is not None:
+            false_reject += 1
+        else:
+            correct += 1  # orang tak terdaftar ditolak dengan benar
+    stats = index.stats()
+    total = len(probes)
+    return {
+        "vectors": stats["prototypes"] or stats["vectors"],
+        "accuracy": correct / total,
+        "false_accept": false_accept / total,
+        "false_reject": false_reject / total,
+        "fallback": stats["full_scans"] / total if medoids is not None else 1.0,
+        "p50_us": float(np.percentile(samples, 50)),
+        "p99_us": float(np.percentile(samples, 99)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluasi galeri prototipe vs galeri penuh.")
+    parser.add_argument("--synthetic", type=int, default=0, help="Jumlah identitas sintetis (0 = pakai data nyata).")
+    parser.add_argument("--threshold", type=float, default=0.40, help="Ambang jarak (default = DISTANCE_THRESHOLD di utils.py).")
+    parser.add_argument("--margin", type=float, default=0.10, help="Lebar fallback_band di sekitar ambang.")
+    args = parser.parse_args()
+
+    gallery, probes = load_synthetic_data(args.synthetic) if args.synthetic else load_real_data()
+    if not gallery or not probes:
+        print("❌ Galeri atau probe kosong. Periksa folder backend/faces dan backend/captured_images.")
+        return
+    global DIM
+    DIM = len(gallery[0][1])
+
+    print(f"\nGaleri {len(gallery)} vektor, {len(probes)} probe, ambang {args.threshold}, margin {args.margin}")
+    print(f"{'konfigurasi':<12} | {'vektor':>7} | {'akurasi':>7} | {'FA':>6} | {'FR':>6} | {'fallback':>8} | {'p50 µs':>8} | {'p99 µs':>8}")
+    print("-" * 86)
+    for label, medoids in CONFIGS:
+        r = evaluate(gallery, probes, medoids, args.threshold, args.margin)
+        print(f"{label:<12} | {r['vectors']:>7} | {r['accuracy']:>7.3f} | {r['false_accept']:>6.3f} | {r['false_reject']:>6.3f} | "
+              f"{r['fallback']:>8.1%} | {r['p50_us']:>8.1f} | {r['p99_us']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()